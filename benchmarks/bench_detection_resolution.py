@@ -0,0 +1,88 @@
+# bench_detection_resolution.py
+#
+# Precisión frente a velocidad del detector S3FD con resolución de detección reducida.
+# Compara las cajas obtenidas con `det_long_edge` contra las de resolución completa (IoU)
+# e imprime una tabla en Markdown.
+#
+# Uso:
+#   python benchmarks/bench_detection_resolution.py --video assets/video/data_video_sun_5s.mp4 \
+#       --detector models/face_detection.xml --long_edges 960 640 480 320
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ov_inference import LandmarksType, OVFaceAlignment
+
+
+def read_frames(video_path, max_frames):
+    video_stream = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        still_reading, frame = video_stream.read()
+        if not still_reading:
+            break
+        frames.append(frame)
+    video_stream.release()
+    return frames
+
+
+def box_iou(a, b):
+    if a is None or b is None:
+        return 0.0
+    xx1, yy1 = max(a[0], b[0]), max(a[1], b[1])
+    xx2, yy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, xx2 - xx1) * max(0, yy2 - yy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def run_detector(frames, detector_path, device, batch_size, long_edge):
+    detector = OVFaceAlignment(LandmarksType._2D, device=device, path_to_detector=detector_path, det_long_edge=long_edge)
+    # Primera llamada fuera del cronómetro para no medir la inicialización
+    detector.get_detections_for_batch(np.array(frames[:batch_size]))
+
+    boxes = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        boxes.extend(detector.get_detections_for_batch(np.array(frames[i : i + batch_size])))
+    return boxes, (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabla de precisión/velocidad de la detección a resolución reducida.")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--detector", default="models/face_detection.xml")
+    parser.add_argument("--device", default="CPU")
+    parser.add_argument("--long_edges", type=int, nargs="+", default=[960, 640, 480, 320, 240])
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--max_frames", type=int, default=128)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.max_frames)
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames de {w}x{h}\n")
+
+    reference, t_full = run_detector(frames, args.detector, args.device, args.batch_size, None)
+
+    print("| long edge | ms/frame | speedup | IoU media | IoU mínima | caras perdidas |")
+    print("|---|---|---|---|---|---|")
+    print(f"| {max(h, w)} (completa) | {t_full * 1e3:.1f} | 1.0x | 1.000 | 1.000 | 0 |")
+    for long_edge in args.long_edges:
+        if long_edge >= max(h, w):
+            continue
+        boxes, t = run_detector(frames, args.detector, args.device, args.batch_size, long_edge)
+        ious = np.array([box_iou(a, b) for a, b in zip(reference, boxes)])
+        missed = sum(b is None for b in boxes)
+        print(f"| {long_edge} | {t * 1e3:.1f} | {t_full / t:.1f}x | {ious.mean():.3f} | {ious.min():.3f} | {missed} |")
+
+
+if __name__ == "__main__":
+    main()
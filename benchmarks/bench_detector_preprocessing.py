@@ -0,0 +1,71 @@
+# bench_detector_preprocessing.py
+#
+# Latencia y tráfico de memoria del preprocesado de S3FD: NumPy/torch en Python
+# (`face_detection.xml`) frente a preprocesado dentro del grafo (`face_detection_u8.xml`).
+#
+# Uso:
+#   python benchmarks/bench_detector_preprocessing.py --detector models/face_detection.xml \
+#       --detector_u8 models/face_detection_u8.xml --resolution 1280x720 --batch_size 16
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from model_registry import get_registry
+from ov_inference import batch_detect, batch_detect_u8
+
+
+def legacy_path(net, frames):
+    return batch_detect(net, frames[..., ::-1].copy(), device="cpu")
+
+
+def u8_path(net, frames):
+    return batch_detect_u8(net, frames)
+
+
+def measure(fn, net, frames, repeats):
+    fn(net, frames)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(net, frames)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(net, frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el preprocesado de S3FD en Python con el embebido en el IR.")
+    parser.add_argument("--detector", default="models/face_detection.xml")
+    parser.add_argument("--detector_u8", default="models/face_detection_u8.xml")
+    parser.add_argument("--resolution", default="1280x720", help="Resolución de los fotogramas, ANCHOxALTO.")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    width, height = map(int, args.resolution.split("x"))
+    frames = np.random.default_rng(0).integers(0, 256, (args.batch_size, height, width, 3), dtype=np.uint8)
+    input_mb = frames.nbytes / 2**20
+
+    print(f"Lote de {args.batch_size} fotogramas {width}x{height} ({input_mb:.1f} MB en u8)\n")
+    print("| modelo | ms/lote | pico de memoria en Python (MB) | pico / entrada |")
+    print("|---|---|---|---|")
+    for name, path, fn in (("f32 + preprocesado NumPy", args.detector, legacy_path), ("u8 + PrePostProcessor", args.detector_u8, u8_path)):
+        net = get_registry().get(path, "CPU")
+        latency, peak = measure(fn, net, frames, args.repeats)
+        print(f"| {name} | {latency * 1e3:.1f} | {peak / 2**20:.1f} | {peak / frames.nbytes:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_encoder.py
+#
+# Tiempo de codificación de la salida: AVI DIVX temporal + recodificación con ffmpeg
+# (camino original de `ov_inference`) frente a `FFmpegPipeWriter` con cada preset.
+#
+# Uso:
+#   python benchmarks/bench_encoder.py --resolution 960x540 --seconds 10 --fps 25
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from video_encoder import ENCODER_PRESETS, FFmpegPipeWriter
+
+
+def synthetic_frames(n_frames, width, height, seed=0):
+    """
+    Fotogramas con fondo estático, una "cara" que se mueve y una zona de ruido,
+    para que el codificador tenga tanto zonas fáciles como difíciles.
+    """
+    rng = np.random.default_rng(seed)
+    background = cv2.resize(rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8), (width, height), interpolation=cv2.INTER_CUBIC)
+    frames = []
+    for i in range(n_frames):
+        frame = background.copy()
+        cx, cy = width // 2 + int(20 * np.sin(i / 10)), height // 2 + int(10 * np.cos(i / 7))
+        cv2.ellipse(frame, (cx, cy), (width // 8, height // 5), 0, 0, 360, (80, 120, 200), -1)
+        frame[cy + 20 : cy + 50, cx - 40 : cx + 40] = rng.integers(0, 256, (30, 80, 3), dtype=np.uint8)
+        frames.append(frame)
+    return frames
+
+
+def synthetic_wav(path, seconds, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+
+def legacy_encode(frames, fps, audio_path, outfile, temp_dir):
+    avi_path = Path(temp_dir) / "result.avi"
+    height, width = frames[0].shape[:2]
+    out = cv2.VideoWriter(str(avi_path), cv2.VideoWriter_fourcc(*"DIVX"), fps, (width, height))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(audio_path), "-i", str(avi_path), "-strict", "-2", "-q:v", "1", str(outfile)]
+    subprocess.run(command, check=True)
+
+
+def pipe_encode(frames, fps, audio_path, outfile, temp_dir, preset):
+    height, width = frames[0].shape[:2]
+    with FFmpegPipeWriter(outfile, fps, (width, height), audio_path, preset, temp_dir=temp_dir) as out:
+        for frame in frames:
+            out.write(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el AVI temporal + recodificación con la codificación por tubería.")
+    parser.add_argument("--resolution", default="960x540", help="Resolución de los fotogramas, ANCHOxALTO.")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--presets", nargs="+", default=list(ENCODER_PRESETS))
+    args = parser.parse_args()
+
+    width, height = map(int, args.resolution.split("x"))
+    n_frames = int(args.seconds * args.fps)
+    frames = synthetic_frames(n_frames, width, height)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio_path = Path(temp_dir) / "audio.wav"
+        synthetic_wav(audio_path, args.seconds)
+
+        print(f"{n_frames} fotogramas {width}x{height} a {args.fps:g} fps ({args.seconds:g} s de video)\n")
+        print("| salida | tiempo (s) | fps de codificación | tiempo real | tamaño (MB) |")
+        print("|---|---|---|---|---|")
+        runs = [("DIVX .avi + ffmpeg -q:v 1", lambda out: legacy_encode(frames, args.fps, audio_path, out, temp_dir))]
+        runs += [(f"tubería, {p}", lambda out, p=p: pipe_encode(frames, args.fps, audio_path, out, temp_dir, p)) for p in args.presets]
+        for i, (name, run) in enumerate(runs):
+            outfile = Path(temp_dir) / f"out_{i}.mp4"
+            start = time.perf_counter()
+            run(outfile)
+            elapsed = time.perf_counter() - start
+            size_mb = outfile.stat().st_size / 2**20
+            print(f"| {name} | {elapsed:.2f} | {n_frames / elapsed:.0f} | {args.seconds / elapsed:.1f}x | {size_mb:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# bench_importtime.py
+#
+# Presupuesto de arranque en frío: importa cada punto de entrada en un intérprete
+# nuevo con `python -X importtime`, resume qué paquetes se llevan el tiempo y
+# comprueba dos cosas por módulo: que la importación cabe en su presupuesto y que
+# no carga backends que deberían cargarse bajo demanda (transformers, langchain,
+# torch...). Imprime tablas en Markdown y termina con código 1 si algo falla.
+#
+# Uso:
+#   python benchmarks/bench_importtime.py
+#   python benchmarks/bench_importtime.py --modules interfaceV2 --top 20 --out importtime.json
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Segundos de importación admitidos por punto de entrada, con margen; ajústalos a la máquina donde se ejecute la suite
+COLD_START_BUDGETS = {
+    "interfaceV2": 4.0,
+    "run_inference": 3.0,
+    "ov_inference": 2.5,
+    "whisper_audio_transcriber": 0.5,
+    "call_openai_api": 0.5,
+}
+# Paquetes que cada punto de entrada no debe importar al arrancar
+LAZY_BACKENDS = {
+    "interfaceV2": ("transformers", "langchain", "openai", "torch", "openvino", "librosa", "sounddevice"),
+    "run_inference": ("torch", "transformers", "langchain"),
+    "ov_inference": ("torch", "transformers", "langchain"),
+    "whisper_audio_transcriber": ("transformers", "librosa", "requests", "torch"),
+    "call_openai_api": ("langchain", "openai", "dotenv"),
+}
+
+
+def parse_importtime(stderr):
+    """
+    Lee la salida de `-X importtime`.
+
+    Returns:
+        list: `(paquete, propio_s, acumulado_s, profundidad)` en el orden de la salida
+        (cada paquete aparece después de los que importa).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return rows
+
+
+def importtime(module, src_dir=SRC_DIR):
+    """
+    Importa `module` con `-X importtime` en un intérprete nuevo.
+
+    Returns:
+        dict: `seconds` (acumulado del módulo), `packages` (segundos propios por paquete
+        de primer nivel, de mayor a menor), `modules` (todos los importados) o `error`.
+    """
+    code = "import sys; sys.path.insert(0, {!r}); import {}".format(str(src_dir), module)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        return {"error": errors[-1] if errors else "código {}".format(result.returncode)}
+
+    packages = defaultdict(float)
+    for name, self_s, _, _ in rows:
+        packages[name.split(".")[0]] += self_s
+    seconds = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), sum(r[1] for r in rows))
+    return {
+        "seconds": seconds,
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])),
+        "modules": sorted({name for name, *_ in rows}),
+    }
+
+
+def check(module, measurement, budget=None):
+    """
+    Compara una medida con el presupuesto y la lista de backends perezosos del módulo.
+
+    Returns:
+        list: Problemas encontrados (vacía si todo está bien).
+    """
+    if "error" in measurement:
+        return ["no se pudo importar: {}".format(measurement["error"])]
+    problems = []
+    budget = COLD_START_BUDGETS.get(module) if budget is None else budget
+    if budget is not None and measurement["seconds"] > budget:
+        problems.append("{:.2f} s supera el presupuesto de {:.2f} s".format(measurement["seconds"], budget))
+    loaded = {name.split(".")[0] for name in measurement["modules"]}
+    eager = [name for name in LAZY_BACKENDS.get(module, ()) if name in loaded]
+    if eager:
+        problems.append("importa al arrancar: {}".format(", ".join(eager)))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de -X importtime y presupuesto de arranque en frío de los puntos de entrada.")
+    parser.add_argument("--modules", nargs="+", default=list(COLD_START_BUDGETS))
+    parser.add_argument("--budget", type=float, default=None, help="Presupuesto en segundos para todos los módulos (por defecto, COLD_START_BUDGETS).")
+    parser.add_argument("--top", type=int, default=10, help="Paquetes más lentos que se listan por módulo.")
+    parser.add_argument("--out", default=None, help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    report, failed = {}, False
+    for module in args.modules:
+        measurement = importtime(module)
+        problems = check(module, measurement, args.budget)
+        failed |= bool(problems)
+        report[module] = dict(measurement, problems=problems)
+
+        print("\n## {}\n".format(module))
+        if "error" not in measurement:
+            budget = args.budget if args.budget is not None else COLD_START_BUDGETS.get(module)
+            print("Importación: {:.3f} s (presupuesto: {})\n".format(measurement["seconds"], "-" if budget is None else "{:.2f} s".format(budget)))
+            print("| paquete | tiempo propio (s) |")
+            print("|---|---|")
+            for name, seconds in list(measurement["packages"].items())[: args.top]:
+                print("| {} | {:.3f} |".format(name, seconds))
+        for problem in problems:
+            print("FALLO: {}".format(problem))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_mel_stream.py
+#
+# Tiempo hasta el primer lote de mel cuando el audio llega por partes (p. ej. de un
+# TTS): esperar al archivo completo y calcular `melspectrogram` (camino original)
+# frente a `MelStream`, que publica los fragmentos a medida que llegan los bloques.
+#
+# Uso:
+#   python benchmarks/bench_mel_stream.py --seconds 30 --speed 4 --batch_size 128
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from mel_stream import SAMPLE_RATE, MelStream, melspectrogram
+from mel_windows import MelWindows
+
+
+def tts_blocks(wav, speed, block_seconds):
+    """
+    Simula un TTS que genera el audio `speed` veces más rápido que el tiempo real.
+    """
+    block = int(block_seconds * SAMPLE_RATE)
+    start = time.perf_counter()
+    for i in range(0, len(wav), block):
+        # Cada bloque está listo cuando el TTS ha producido su audio
+        delay = start + (i + block) / SAMPLE_RATE / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield wav[i : i + block]
+
+
+def batch_path(wav, fps, batch_size, speed, block_seconds):
+    start = time.perf_counter()
+    received = np.concatenate(list(tts_blocks(wav, speed, block_seconds)))
+    mel_chunks = MelWindows(melspectrogram(received), fps)
+    first = time.perf_counter() - start
+    for _ in range(0, len(mel_chunks), batch_size):
+        pass
+    return first, time.perf_counter() - start
+
+
+def streaming_path(wav, fps, batch_size, speed, block_seconds):
+    start = time.perf_counter()
+    mel_chunks = MelStream(tts_blocks(wav, speed, block_seconds), fps).windows
+    first = None
+    for _ in mel_chunks.batches(batch_size):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el tiempo hasta el primer lote de mel con el audio por partes.")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Duración del audio.")
+    parser.add_argument("--speed", type=float, default=4.0, help="Veces más rápido que el tiempo real al que llega el audio.")
+    parser.add_argument("--block_seconds", type=float, default=0.1)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--batch_size", type=int, default=128)
+    args = parser.parse_args()
+
+    wav = (np.random.default_rng(0).standard_normal(int(args.seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+    print("Audio de {:g} s generado a {:g}x tiempo real ({:.2f} s)\n".format(args.seconds, args.speed, args.seconds / args.speed))
+    print("| método | primer lote (s) | todos los lotes (s) |")
+    print("|---|---|---|")
+    for name, run in (("archivo completo + melspectrogram", batch_path), ("MelStream (incremental)", streaming_path)):
+        first, total = run(wav, args.fps, args.batch_size, args.speed, args.block_seconds)
+        print("| {} | {:.3f} | {:.3f} |".format(name, first, total))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench_mel_windows.py
+#
+# Troceado del mel y formación de lotes: bucle `while` con slices float64 y
+# `np.asarray` por lote (camino original) frente a `MelWindows` (vista con
+# strides float32 y un gather por lote).
+#
+# Uso:
+#   python benchmarks/bench_mel_windows.py --minutes 60 --fps 25 --batch_size 128
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from mel_windows import MEL_FRAMES_PER_SECOND, MelWindows
+
+
+def legacy_chunks(mel, fps, mel_step_size=16):
+    mel_chunks = []
+    mel_idx_multiplier = 80.0 / fps
+    i = 0
+    while 1:
+        start_idx = int(i * mel_idx_multiplier)
+        if start_idx + mel_step_size > len(mel[0]):
+            mel_chunks.append(mel[:, len(mel[0]) - mel_step_size :])
+            break
+        mel_chunks.append(mel[:, start_idx : start_idx + mel_step_size])
+        i += 1
+    return mel_chunks
+
+
+def legacy_batch(mel_chunks, start, batch_size):
+    mel_batch = np.asarray(mel_chunks[start : start + batch_size])
+    mel_batch = np.reshape(mel_batch, [len(mel_batch), mel_batch.shape[1], mel_batch.shape[2], 1])
+    # Conversión que hacía el bucle de inferencia antes de llamar al modelo
+    return np.ascontiguousarray(np.transpose(mel_batch, (0, 3, 1, 2)), dtype=np.float32)
+
+
+def windowed_batch(mel_chunks, start, batch_size):
+    mel_batch = mel_chunks[start : start + batch_size]
+    mel_batch = np.reshape(mel_batch, [len(mel_batch), mel_batch.shape[1], mel_batch.shape[2], 1])
+    return np.ascontiguousarray(np.transpose(mel_batch, (0, 3, 1, 2)), dtype=np.float32)
+
+
+def measure(make_chunks, make_batch, mel, fps, batch_size, repeats):
+    """
+    Devuelve el tiempo de troceado, el de formar todos los lotes, los bytes que
+    siguen vivos durante el render (mel + fragmentos) y el número de fragmentos.
+    """
+    chunk_time = batch_time = float("inf")
+    for _ in range(repeats):
+        mel_copy = mel.copy()
+        start = time.perf_counter()
+        mel_chunks = make_chunks(mel_copy, fps)
+        chunk_time = min(chunk_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, len(mel_chunks), batch_size):
+            make_batch(mel_chunks, i, batch_size)
+        batch_time = min(batch_time, time.perf_counter() - start)
+
+    # Memoria residente: el mel de entrada solo sigue vivo si los fragmentos lo referencian
+    del mel_chunks, mel_copy
+    tracemalloc.start()
+    mel_chunks = make_chunks(mel.copy(), fps)
+    resident, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunk_time, batch_time, resident, len(mel_chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el troceado del mel con bucle frente a MelWindows.")
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--batch_size", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    n_mel_frames = int(args.minutes * 60 * MEL_FRAMES_PER_SECOND)
+    # audio.melspectrogram devuelve float64
+    mel = np.random.default_rng(0).uniform(-4, 4, (80, n_mel_frames))
+    print(f"Mel de {args.minutes:g} min: {mel.shape}, {mel.nbytes / 2**20:.0f} MB en float64\n")
+    print("| método | fragmentos | troceado (s) | lotes (s) | memoria residente (MB) |")
+    print("|---|---|---|---|---|")
+    runs = (
+        ("bucle + np.asarray por lote", legacy_chunks, legacy_batch),
+        ("MelWindows (strided, float32)", lambda m, fps: MelWindows(m, fps), windowed_batch),
+    )
+    for name, make_chunks, make_batch in runs:
+        chunk_time, batch_time, resident, n_chunks = measure(make_chunks, make_batch, mel, args.fps, args.batch_size, args.repeats)
+        print(f"| {name} | {n_chunks} | {chunk_time:.3f} | {batch_time:.3f} | {resident / 2**20:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
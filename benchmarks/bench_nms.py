@@ -0,0 +1,66 @@
+# bench_nms.py
+#
+# Microbenchmark: `nms` por fotograma (implementación original) frente a `batch_nms`.
+#
+# Uso:
+#   python benchmarks/bench_nms.py --frames 16 32 64 --candidates 2000
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ov_inference import nms
+from sfd_postprocess import batch_nms
+
+
+def synthetic_candidates(n_frames, n_candidates, seed=0):
+    """
+    Genera candidatas `(C, N, 5)` parecidas a las de S3FD: grupos de cajas solapadas alrededor de pocas caras.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(100, 900, (n_candidates, 1, 2))
+    sizes = rng.uniform(40, 300, (n_candidates, 1, 2))
+    jitter = rng.normal(0, 10, (n_candidates, n_frames, 4))
+    boxes = np.concatenate([centers - sizes / 2, centers + sizes / 2], axis=2) + jitter
+    scores = rng.beta(0.5, 3.0, (n_candidates, n_frames, 1))
+    return np.concatenate([boxes, scores], axis=2).astype(np.float32)
+
+
+def legacy_nms(bboxlists):
+    keeps = [nms(bboxlists[:, i, :], 0.3) for i in range(bboxlists.shape[1])]
+    bboxlists = [bboxlists[keep, i, :] for i, keep in enumerate(keeps)]
+    return [[x for x in bboxlist if x[-1] > 0.5] for bboxlist in bboxlists]
+
+
+def timeit(fn, arg, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara nms por fotograma con batch_nms.")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'frames':>8} {'nms (ms)':>12} {'batch_nms (ms)':>16} {'speedup':>9}")
+    for n_frames in args.frames:
+        bboxlists = synthetic_candidates(n_frames, args.candidates)
+        t_legacy = timeit(legacy_nms, bboxlists, args.repeats)
+        t_batch = timeit(batch_nms, bboxlists, args.repeats)
+        print(f"{n_frames:>8} {t_legacy * 1e3:>12.2f} {t_batch * 1e3:>16.2f} {t_legacy / t_batch:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
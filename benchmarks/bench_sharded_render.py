@@ -0,0 +1,96 @@
+# bench_sharded_render.py
+#
+# Escalado del render repartido entre procesos (`ov_inference(shards=N)`): tiempo total
+# de un audio largo con 1, 2, 4 y 8 procesos frente al render en un solo proceso, e
+# imprime una tabla en Markdown. Si no se indica `--audio`, se genera ruido de
+# `--seconds` segundos.
+#
+# Uso:
+#   python benchmarks/bench_sharded_render.py --video assets/video/data_video_sun_5s.mp4 \
+#       --wav2lip models/wav2lip.xml --detector models/face_detection.xml --seconds 120 --workers 1 2 4 8
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.io import wavfile
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ov_inference import ov_inference
+from sharded_render import available_cpus
+
+
+def frame_count(path):
+    video_stream = cv2.VideoCapture(str(path))
+    n = 0
+    while video_stream.grab():
+        n += 1
+    video_stream.release()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tabla de escalado del render repartido entre procesos.")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--audio", default=None, help="Audio de entrada (por defecto, ruido de --seconds segundos).")
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--wav2lip", default="models/wav2lip.xml")
+    parser.add_argument("--detector", default="models/face_detection.xml")
+    parser.add_argument("--avatar_pack", default=None)
+    parser.add_argument("--box", type=int, nargs=4, default=[-1, -1, -1, -1], help="Caja fija (y1 y2 x1 x2) para no medir la detección.")
+    parser.add_argument("--resize_factor", type=int, default=1)
+    parser.add_argument("--batch_size", type=int, default=128)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--preset", default="fast")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_shards_")
+    audio_path = args.audio
+    if audio_path is None:
+        audio_path = os.path.join(temp_dir, "audio.wav")
+        rng = np.random.default_rng(0)
+        wavfile.write(audio_path, 16000, (rng.standard_normal(int(args.seconds * 16000)) * 3000).astype(np.int16))
+
+    rows = []
+    for workers in args.workers:
+        outfile = os.path.join(temp_dir, "out_{}.mp4".format(workers))
+        start = time.perf_counter()
+        ov_inference(
+            args.video,
+            audio_path,
+            face_detection_path=args.detector,
+            wav2lip_path=args.wav2lip,
+            wav2lip_batch_size=args.batch_size,
+            outfile=outfile,
+            resize_factor=args.resize_factor,
+            box=args.box,
+            avatar_pack=args.avatar_pack,
+            # Con un proceso es el render normal en streaming, con el que se compara
+            stream_frames=True,
+            encoder_preset=args.preset,
+            temp_dir=temp_dir,
+            shards=workers,
+        )
+        rows.append((workers, time.perf_counter() - start, frame_count(outfile)))
+
+    # El render de ov_inference imprime su propio progreso; la tabla va al final
+    base_workers, base_time, _ = rows[0]
+    print("\n{} CPUs disponibles\n".format(len(available_cpus())))
+    print("| procesos | total (s) | fps | speedup | eficiencia |")
+    print("|---|---|---|---|---|")
+    for workers, elapsed, frames in rows:
+        speedup = base_time / elapsed
+        print("| {} | {:.2f} | {:.1f} | {:.2f}x | {:.0%} |".format(workers, elapsed, frames / elapsed, speedup, speedup * base_workers / workers))
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_startup.py
+#
+# Coste de arranque de los módulos de inferencia: tiempo de importación y memoria
+# residente (RSS) de un intérprete nuevo justo después del `import`, y si se ha
+# cargado torch por el camino. Cada medida se hace en un proceso aparte, como los
+# `run_inference.py` que lanza `interfaceV2`, e imprime una tabla en Markdown.
+#
+# Uso:
+#   python benchmarks/bench_startup.py --repeat 5
+#   python benchmarks/bench_startup.py --modules ov_inference run_inference torch
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Se ejecuta en el proceso hijo: importa el módulo y devuelve tiempos y memoria en JSON
+_PROBE = """
+import json, sys, time
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+if {module!r}:
+    __import__({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss": rss_bytes(), "torch": "torch" in sys.modules}}))
+"""
+
+
+def probe(module, src_dir=SRC_DIR):
+    """
+    Importa `module` en un intérprete nuevo ("" para el intérprete vacío).
+
+    Returns:
+        dict: `seconds` (importación), `total_seconds` (arranque del proceso incluido),
+        `rss` (bytes tras importar), `torch` (si quedó cargado) o `error`.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", _PROBE.format(src=str(src_dir), module=module)], capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "código {}".format(result.returncode)}
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement["total_seconds"] = total
+    return measurement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación y memoria de arranque de los módulos de inferencia.")
+    parser.add_argument("--modules", nargs="+", default=["ov_inference", "run_inference", "torch"], help="Módulos a importar (torch como referencia).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="Archivo JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    rows = {}
+    for module in [""] + args.modules:
+        runs = [probe(module) for _ in range(args.repeat)]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            rows[module or "(python)"] = {"error": errors[0]}
+            continue
+        rows[module or "(python)"] = {
+            "import_s": statistics.median(r["seconds"] for r in runs),
+            "process_s": statistics.median(r["total_seconds"] for r in runs),
+            "rss_mb": statistics.median(r["rss"] for r in runs) / 2**20,
+            "torch": runs[0]["torch"],
+        }
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=1)
+
+    print("| módulo | importación (s) | proceso (s) | RSS (MB) | torch cargado |")
+    print("|---|---|---|---|---|")
+    for name, row in rows.items():
+        if "error" in row:
+            print("| {} | error: {} | | | |".format(name, row["error"]))
+            continue
+        print("| {} | {:.3f} | {:.3f} | {:.0f} | {} |".format(name, row["import_s"], row["process_s"], row["rss_mb"], "sí" if row["torch"] else "no"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# bench_suite.py
+#
+# Suite de benchmarks sin red ni archivos reales: genera (o reutiliza) un video con
+# una cara sintética, un audio y modelos con pesos aleatorios (ver `fixtures.py`) y
+# mide por separado cada etapa del render. Guarda los resultados en JSON y, con
+# `--baseline`, los compara con una ejecución anterior e imprime una tabla en
+# Markdown; termina con código 1 si alguna etapa es más lenta que la tolerancia.
+#
+# Uso:
+#   python benchmarks/bench_suite.py --resolution 640x360 --seconds 10 --out bench.json
+#   python benchmarks/bench_suite.py --resolution 640x360 --seconds 10 --baseline bench.json --tolerance 0.15
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.io import wavfile
+
+# Añade `src` al `sys.path` para importar los módulos del proyecto
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from fixtures import make_fixtures, parse_resolution
+
+CASES = ("nms", "batch_nms", "batch_detect", "face_detect_ov", "datagen", "wav2lip_loop", "encode", "mux")
+
+
+def measure(fn, repeat, min_time=0.05):
+    """
+    Ejecuta `fn` una vez sin medir y luego `repeat` repeticiones medidas.
+
+    Las funciones muy rápidas se ejecutan varias veces por repetición (hasta
+    `min_time` segundos), como `timeit`, para que el ruido del reloj no domine.
+
+    Returns:
+        list: Segundos por llamada de cada repetición.
+    """
+    start = time.perf_counter()
+    fn()
+    number = max(1, int(np.ceil(min_time / max(time.perf_counter() - start, 1e-9))))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def summarize(times, units, unit):
+    median = statistics.median(times)
+    return {
+        "seconds": median,
+        "min_seconds": min(times),
+        "repeat": len(times),
+        "units": units,
+        "unit": unit,
+        "per_second": units / median if median else float("inf"),
+    }
+
+
+def read_frames(video_path):
+    video_stream = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        still_reading, frame = video_stream.read()
+        if not still_reading:
+            break
+        frames.append(frame)
+    video_stream.release()
+    return frames
+
+
+def run_suite(fixtures, cases, repeat, batch_size, face_det_batch_size, device, preset, work_dir):
+    from lipsync_pipeline import LipSyncPipeline
+    from mel_stream import melspectrogram
+    from mel_windows import MelWindows
+    from model_registry import get_registry
+    from ov_inference import batch_detect, datagen, face_detect_ov, is_fused_wav2lip, nms
+    from sfd_postprocess import batch_nms
+    from video_encoder import FFmpegPipeWriter, mux_audio
+    from voice_activity import gate_batches
+
+    frames = read_frames(fixtures["video"])
+    fps = cv2.VideoCapture(fixtures["video"]).get(cv2.CAP_PROP_FPS)
+    frame_h, frame_w = frames[0].shape[:2]
+    _, wav = wavfile.read(fixtures["audio"])
+    mel_chunks = MelWindows(melspectrogram(wav), fps)
+    box = fixtures["box"]
+    results = {}
+
+    rng = np.random.default_rng(0)
+    if "nms" in cases or "batch_nms" in cases:
+        # Detecciones candidatas alrededor de unas pocas caras, como las de S3FD antes del NMS
+        centers = rng.uniform(100, 500, size=(8, 2))
+        xy = centers[rng.integers(0, 8, 2000)] + rng.normal(0, 10, (2000, 2))
+        wh = rng.uniform(60, 120, (2000, 2))
+        dets = np.hstack([xy - wh / 2, xy + wh / 2, rng.uniform(0.05, 1, (2000, 1))]).astype(np.float32)
+        if "nms" in cases:
+            results["nms"] = summarize(measure(lambda: nms(dets, 0.3), repeat), len(dets), "detecciones")
+        if "batch_nms" in cases:
+            batch = np.stack([dets] * face_det_batch_size)
+            results["batch_nms"] = summarize(measure(lambda: batch_nms(batch, 0.3), repeat), batch.shape[0] * batch.shape[1], "detecciones")
+
+    if "batch_detect" in cases:
+        detector = get_registry().get(fixtures["face_detection"], device)
+        images = np.array(frames[:face_det_batch_size])[..., ::-1]
+        results["batch_detect"] = summarize(measure(lambda: batch_detect(detector, images, "cpu"), repeat), len(images), "fotogramas")
+
+    if "face_detect_ov" in cases:
+        times = measure(lambda: face_detect_ov(frames, device, face_det_batch_size, [0, 10, 0, 0], False, fixtures["face_detection"]), repeat)
+        results["face_detect_ov"] = summarize(times, len(frames), "fotogramas")
+
+    def batches(fused):
+        return datagen(
+            frames, mel_chunks, box, False, face_det_batch_size, [0, 10, 0, 0], False, 96, batch_size, fixtures["face_detection"], fused=fused
+        )
+
+    if "datagen" in cases:
+        results["datagen"] = summarize(measure(lambda: sum(1 for _ in batches(False)), repeat), len(mel_chunks), "fotogramas")
+
+    if "wav2lip_loop" in cases:
+        model = get_registry().get(fixtures["wav2lip"], device)
+        fused = is_fused_wav2lip(model)
+        # Lotes ya preparados, para medir solo la inferencia y la composición
+        prepared = list(gate_batches(batches(fused), None))
+
+        def loop():
+            LipSyncPipeline(model, fused, lambda mouths, frames, plan: None).run(prepared, total=len(prepared))
+
+        results["wav2lip_loop"] = summarize(measure(loop, repeat), len(mel_chunks), "fotogramas")
+
+    video_only = Path(work_dir) / "video_only.mp4"
+    if "encode" in cases or "mux" in cases:
+
+        def encode():
+            with FFmpegPipeWriter(video_only, fps, (frame_w, frame_h), None, preset, temp_dir=work_dir) as out:
+                for frame in frames:
+                    out.write(frame)
+
+        times = measure(encode, repeat if "encode" in cases else 0)
+        if "encode" in cases:
+            results["encode"] = summarize(times, len(frames), "fotogramas")
+        if "mux" in cases:
+            muxed = Path(work_dir) / "muxed.mp4"
+            times = measure(lambda: mux_audio(video_only, fixtures["audio"], muxed, temp_dir=work_dir), repeat)
+            results["mux"] = summarize(times, len(frames), "fotogramas")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara los resultados con una línea base.
+
+    Se compara el mejor tiempo de cada etapa (el mínimo de las repeticiones, el
+    menos afectado por otras cargas de la máquina). Una etapa es una regresión si
+    supera el de la base en más de `tolerance` (fracción, 0.15 = 15 %), y una
+    mejora si baja en más de `tolerance`.
+
+    Returns:
+        list: Filas `(etapa, base_s, actual_s, ratio, estado)`.
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append((name, None, current["min_seconds"], None, "nuevo"))
+            continue
+        ratio = current["min_seconds"] / base["min_seconds"] if base["min_seconds"] else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regresión"
+        elif ratio < 1 - tolerance:
+            status = "mejora"
+        else:
+            status = "ok"
+        rows.append((name, base["min_seconds"], current["min_seconds"], ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks con datos sintéticos y comparación con una línea base.")
+    parser.add_argument("--fixtures_dir", default="bench_fixtures", help="Directorio donde se generan (y reutilizan) los datos sintéticos.")
+    parser.add_argument("--resolution", type=parse_resolution, default=(640, 360), help="ANCHOxALTO del video sintético.")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--audio_kind", choices=["tone", "noise"], default="tone")
+    parser.add_argument("--detector", default=None, help="Modelo del detector real (por defecto, uno con pesos aleatorios).")
+    parser.add_argument("--wav2lip", default=None, help="Modelo de Wav2Lip real (por defecto, uno con pesos aleatorios).")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch_size", type=int, default=128)
+    parser.add_argument("--face_det_batch_size", type=int, default=16)
+    parser.add_argument("--device", default="CPU")
+    parser.add_argument("--preset", default="balanced")
+    parser.add_argument("--out", default=None, help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior con el que comparar.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Fracción de ralentización admitida antes de marcar una regresión.")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.fixtures_dir, args.seconds, args.fps, args.resolution, args.audio_kind)
+    # Los modelos reales se usan si existen; si faltan los checkpoints, los de pesos aleatorios
+    for key, path in (("face_detection", args.detector), ("wav2lip", args.wav2lip)):
+        if path and os.path.exists(path):
+            fixtures[key] = path
+            fixtures["models"] = "real"
+
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        results = run_suite(fixtures, args.cases, args.repeat, args.batch_size, args.face_det_batch_size, args.device, args.preset, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    import openvino as ov
+
+    report = {
+        "meta": {
+            "resolution": "{}x{}".format(*args.resolution),
+            "seconds": args.seconds,
+            "fps": args.fps,
+            "models": fixtures["models"],
+            "batch_size": args.batch_size,
+            "device": args.device,
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "openvino": ov.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+    print("\n| etapa | mediana (s) | mínimo (s) | unidades/s |")
+    print("|---|---|---|---|")
+    for name, r in results.items():
+        print("| {} | {:.4f} | {:.4f} | {:.1f} {}/s |".format(name, r["seconds"], r["min_seconds"], r["per_second"], r["unit"]))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("resolution", "seconds", "fps", "models", "batch_size", "device"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print("Aviso: la línea base usa {}={} (ahora {})".format(key, baseline.get("meta", {}).get(key), report["meta"][key]))
+        rows = compare(results, baseline, args.tolerance)
+        print("\n| etapa | base mín. (s) | actual mín. (s) | ratio | estado |")
+        print("|---|---|---|---|---|")
+        for name, base, current, ratio, status in rows:
+            print(
+                "| {} | {} | {:.4f} | {} | {} |".format(
+                    name, "-" if base is None else "{:.4f}".format(base), current, "-" if ratio is None else "{:.2f}x".format(ratio), status
+                )
+            )
+        if any(status == "regresión" for *_, status in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# fixtures.py
+#
+# Generadores de datos sintéticos para los benchmarks: videos con una cara dibujada,
+# audios de tonos o ruido y modelos IR con pesos aleatorios y las formas reales de
+# S3FD y Wav2Lip. No necesitan red ni archivos reales.
+#
+# Uso:
+#   python benchmarks/fixtures.py --out bench_fixtures --resolution 640x360 --seconds 10
+
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.io import wavfile
+
+AUDIO_SAMPLE_RATE = 16000
+WAV2LIP_IMG_SIZE = 96
+WAV2LIP_MEL_STEP_SIZE = 16
+# Strides de las 6 cabezas de S3FD (cada una da una salida de clases y otra de cajas)
+SFD_STRIDES = (4, 8, 16, 32, 64, 128)
+
+
+def parse_resolution(text):
+    """
+    Convierte "ANCHOxALTO" en `(ancho, alto)`.
+    """
+    width, height = (int(v) for v in text.lower().split("x"))
+    return width, height
+
+
+def face_box(size):
+    """
+    Caja `(y1, y2, x1, x2)` de la cara que dibuja `make_face_video` (útil como `--box`).
+    """
+    width, height = size
+    cx, cy, rx, ry = width // 2, height // 2, max(8, height // 5), max(10, height // 4)
+    return [max(0, cy - ry), min(height, cy + ry), max(0, cx - rx), min(width, cx + rx)]
+
+
+def make_face_video(path, seconds=5.0, fps=25.0, size=(640, 360), seed=0):
+    """
+    Escribe un video con una cara esquemática (óvalo de piel, ojos y una boca que se
+    abre y se cierra) que se mueve un poco sobre un fondo con ruido.
+
+    Args:
+        path (str): Ruta del video (`.avi` con MJPG, que OpenCV siempre puede escribir).
+        seconds (float): Duración.
+        fps (float): Fotogramas por segundo.
+        size (tuple): `(ancho, alto)`.
+        seed (int): Semilla del ruido de fondo.
+
+    Returns:
+        Path: Ruta del video.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    width, height = size
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+    y1, y2, x1, x2 = face_box(size)
+    rx, ry = (x2 - x1) // 2, (y2 - y1) // 2
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("No se pudo crear el video {}".format(path))
+    try:
+        for i in range(int(round(seconds * fps))):
+            frame = background.copy()
+            # Pequeño balanceo de la cabeza para que el seguimiento tenga trabajo
+            cx = width // 2 + int(round(0.05 * rx * np.sin(i / fps * 2.0)))
+            cy = height // 2 + int(round(0.03 * ry * np.cos(i / fps * 1.3)))
+            cv2.ellipse(frame, (cx, cy), (int(rx * 0.8), int(ry * 0.9)), 0, 0, 360, (120, 160, 210), -1)
+            for side in (-1, 1):
+                cv2.circle(frame, (cx + side * rx // 3, cy - ry // 4), max(2, rx // 8), (40, 40, 40), -1)
+            mouth_open = max(1, int(ry * 0.12 * (1 + np.sin(i / fps * 12.0))))
+            cv2.ellipse(frame, (cx, cy + ry // 2), (rx // 3, mouth_open), 0, 0, 360, (60, 60, 150), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+def make_audio(path, seconds=5.0, kind="tone", seed=0):
+    """
+    Escribe un WAV mono de 16 kHz en PCM de 16 bits.
+
+    Args:
+        path (str): Ruta del WAV.
+        seconds (float): Duración.
+        kind (str): "tone" (tonos modulados con pausas, parecido a la voz) o "noise" (ruido blanco).
+        seed (int): Semilla.
+
+    Returns:
+        Path: Ruta del WAV.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * AUDIO_SAMPLE_RATE)) / AUDIO_SAMPLE_RATE
+    if kind == "tone":
+        pitch = 140.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / AUDIO_SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        # Sílabas de ~4 Hz y una pausa de 0.5 s cada 3 s
+        envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0, None) * ((t % 3.0) < 2.5)
+        signal = 0.3 * voiced * envelope + 0.003 * rng.standard_normal(len(t))
+    elif kind == "noise":
+        signal = 0.1 * rng.standard_normal(len(t))
+    else:
+        raise ValueError("Tipo de audio desconocido: {}".format(kind))
+    wavfile.write(path, AUDIO_SAMPLE_RATE, (np.clip(signal, -1, 1) * 32767).astype(np.int16))
+    return path
+
+
+def _random_conv(ops, x, in_channels, out_channels, rng, kernel=3, stride=1):
+    weights = (rng.standard_normal((out_channels, in_channels, kernel, kernel)) * np.sqrt(2.0 / (in_channels * kernel * kernel))).astype(np.float32)
+    pad = kernel // 2
+    return ops.convolution(x, weights, [stride, stride], [pad, pad], [pad, pad], [1, 1])
+
+
+def _synthetic_s3fd(seed=0):
+    # Grafo con la firma de S3FD: (B, 3, H, W) -> 6 pares (clases, cajas) con strides 4..128
+    import openvino as ov
+    import openvino.opset13 as ops
+
+    rng = np.random.default_rng(seed)
+    image = ops.parameter(ov.PartialShape([-1, 3, -1, -1]), ov.Type.f32, name="x")
+    x = ops.relu(_random_conv(ops, image, 3, 16, rng, stride=2))
+    x = ops.relu(_random_conv(ops, x, 16, 32, rng, stride=2))
+    outputs, channels = [], 32
+    for stride in SFD_STRIDES:
+        if stride > 4:
+            x = ops.relu(_random_conv(ops, x, channels, 64, rng, stride=2))
+            channels = 64
+        outputs.append(_random_conv(ops, x, channels, 2, rng))
+        outputs.append(_random_conv(ops, x, channels, 4, rng))
+    return ov.Model(outputs, [image], "s3fd_synthetic")
+
+
+def _synthetic_wav2lip(seed=0):
+    # Grafo con la firma de Wav2Lip: mel (B, 1, 80, 16) y caras (B, 6, 96, 96) -> bocas (B, 3, 96, 96) en [0, 1]
+    import openvino as ov
+    import openvino.opset13 as ops
+
+    rng = np.random.default_rng(seed)
+    audio = ops.parameter(ov.PartialShape([-1, 1, 80, WAV2LIP_MEL_STEP_SIZE]), ov.Type.f32, name="audio_sequences")
+    face = ops.parameter(ov.PartialShape([-1, 6, WAV2LIP_IMG_SIZE, WAV2LIP_IMG_SIZE]), ov.Type.f32, name="face_sequences")
+    a = ops.relu(_random_conv(ops, audio, 1, 32, rng, stride=2))
+    a = ops.reduce_mean(ops.relu(_random_conv(ops, a, 32, 64, rng, stride=2)), np.array([2, 3]), True)
+    x = ops.relu(_random_conv(ops, face, 6, 32, rng))
+    x = ops.relu(_random_conv(ops, x, 32, 64, rng, stride=2))
+    x = ops.add(x, a)
+    x = ops.relu(_random_conv(ops, x, 64, 64, rng))
+    x = ops.interpolate(x, np.array([WAV2LIP_IMG_SIZE, WAV2LIP_IMG_SIZE], dtype=np.int64), "nearest", "sizes", axes=np.array([2, 3], dtype=np.int64))
+    mouths = ops.sigmoid(_random_conv(ops, x, 64, 3, rng))
+    return ov.Model([mouths], [audio, face], "wav2lip_synthetic")
+
+
+def _random_torch_models(seed=0):
+    # Arquitecturas reales de Wav2Lip con pesos aleatorios; None si el paquete no está disponible
+    try:
+        import torch
+        from Wav2Lip.face_detection.detection.sfd.net_s3fd import s3fd
+        from Wav2Lip.models import Wav2Lip
+    except ImportError:
+        return None
+    import openvino as ov
+
+    torch.manual_seed(seed)
+    face_detection = ov.convert_model(s3fd().eval(), example_input=torch.rand(1, 3, 256, 256))
+    example_inputs = {
+        "audio_sequences": torch.rand(2, 1, 80, WAV2LIP_MEL_STEP_SIZE),
+        "face_sequences": torch.rand(2, 6, WAV2LIP_IMG_SIZE, WAV2LIP_IMG_SIZE),
+    }
+    wav2lip = ov.convert_model(Wav2Lip().eval(), example_input=example_inputs)
+    return face_detection, wav2lip
+
+
+def make_models(out_dir, seed=0):
+    """
+    Crea `face_detection.xml` y `wav2lip.xml` con pesos aleatorios.
+
+    Si el paquete `Wav2Lip` está disponible se convierten las arquitecturas reales
+    (mismo coste de inferencia que los checkpoints); si no, grafos sintéticos más
+    ligeros con las mismas entradas y salidas. Los modelos ya creados se reutilizan.
+
+    Returns:
+        dict: Rutas (`face_detection`, `wav2lip`) y `kind` ("random_weights" o "synthetic").
+    """
+    import openvino as ov
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {"face_detection": out_dir / "face_detection.xml", "wav2lip": out_dir / "wav2lip.xml"}
+    kind_path = out_dir / "models_kind.txt"
+    if all(p.exists() for p in paths.values()) and kind_path.exists():
+        return dict(paths, kind=kind_path.read_text().strip())
+
+    models = _random_torch_models(seed)
+    kind = "random_weights"
+    if models is None:
+        models, kind = (_synthetic_s3fd(seed), _synthetic_wav2lip(seed)), "synthetic"
+    for model, key in zip(models, ("face_detection", "wav2lip")):
+        ov.save_model(model, paths[key])
+    kind_path.write_text(kind)
+    return dict(paths, kind=kind)
+
+
+def make_fixtures(out_dir, seconds=5.0, fps=25.0, size=(640, 360), audio_kind="tone", seed=0):
+    """
+    Genera (o reutiliza) el video, el audio y los modelos de un benchmark.
+
+    Returns:
+        dict: Rutas `video`, `audio`, `face_detection` y `wav2lip`, la caja de la cara y
+        el tipo de modelos.
+    """
+    out_dir = Path(out_dir)
+    name = "{}x{}_{:g}s_{:g}fps".format(size[0], size[1], seconds, fps)
+    video = out_dir / "video_{}.avi".format(name)
+    audio = out_dir / "audio_{}_{:g}s.wav".format(audio_kind, seconds)
+    if not video.exists():
+        make_face_video(video, seconds, fps, size, seed)
+    if not audio.exists():
+        make_audio(audio, seconds, audio_kind, seed)
+    models = make_models(out_dir / "models", seed)
+    return {
+        "video": str(video),
+        "audio": str(audio),
+        "face_detection": str(models["face_detection"]),
+        "wav2lip": str(models["wav2lip"]),
+        "models": models["kind"],
+        "box": face_box(size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera video, audio y modelos sintéticos para los benchmarks.")
+    parser.add_argument("--out", default="bench_fixtures")
+    parser.add_argument("--resolution", type=parse_resolution, default=(640, 360), help="ANCHOxALTO")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--audio", choices=["tone", "noise"], default="tone")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.out, args.seconds, args.fps, args.resolution, args.audio)
+    for key, value in fixtures.items():
+        print("{}: {}".format(key, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# avatar_pack.py
+#
+# "Avatar pack": todo lo que no depende del audio (fotogramas decodificados, cajas de
+# cara y recortes redimensionados) precalculado una vez en disco y leído con mmap.
+#
+# Uso:
+#   python src/avatar_pack.py --video assets/video/data_video_sun.mp4 --out packs/sun \
+#       --detector models/face_detection.xml --resize_factor 2
+
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+PACK_VERSION = 1
+META_NAME = "meta.json"
+
+
+class AvatarPack:
+    """
+    Lector de un avatar pack. Los arrays se abren con `mmap_mode="r"`, así que solo
+    se leen del disco las páginas de los fotogramas que se usan.
+
+    Attributes:
+        frames (np.memmap): Fotogramas u8 `(N, H, W, 3)` en BGR.
+        faces (np.memmap): Recortes de cara u8 `(N, img_size, img_size, 3)`.
+        coords (np.memmap): Coordenadas `(y1, y2, x1, x2)` int32 de cada cara.
+        meta (dict): fps, tamaño de imagen y parámetros de construcción.
+    """
+
+    def __init__(self, pack_dir):
+        self.pack_dir = Path(pack_dir)
+        with open(self.pack_dir / META_NAME, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != PACK_VERSION:
+            raise ValueError(f"Versión de avatar pack no soportada: {self.meta.get('version')}")
+        self.frames = np.load(self.pack_dir / "frames.npy", mmap_mode="r")
+        self.faces = np.load(self.pack_dir / "faces.npy", mmap_mode="r")
+        self.coords = np.load(self.pack_dir / "coords.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def fps(self):
+        return self.meta["fps"]
+
+    @property
+    def img_size(self):
+        return self.meta["img_size"]
+
+    @property
+    def frame_shape(self):
+        return tuple(self.frames.shape[1:])
+
+
+def write_avatar_pack(pack_dir, frames, coords, fps, img_size, params=None):
+    """
+    Escribe un avatar pack a partir de fotogramas y coordenadas de cara ya calculados.
+
+    Se escribe en un directorio temporal que después sustituye a `pack_dir`, para
+    que una construcción interrumpida no deje un pack a medias.
+
+    Args:
+        pack_dir (str): Directorio de destino.
+        frames (list): Fotogramas BGR u8 del mismo tamaño.
+        coords (list): Coordenadas `(y1, y2, x1, x2)` de la cara en cada fotograma.
+        fps (float): Fotogramas por segundo del video original.
+        img_size (int): Lado de los recortes de cara que espera Wav2Lip.
+        params (dict): Parámetros de construcción que se guardan en `meta.json`.
+    """
+    pack_dir = Path(pack_dir)
+    tmp_dir = pack_dir.with_name(pack_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    n = len(frames)
+    frames_mm = np.lib.format.open_memmap(tmp_dir / "frames.npy", mode="w+", dtype=np.uint8, shape=(n,) + frames[0].shape)
+    faces_mm = np.lib.format.open_memmap(tmp_dir / "faces.npy", mode="w+", dtype=np.uint8, shape=(n, img_size, img_size, 3))
+    for i, (frame, (y1, y2, x1, x2)) in enumerate(zip(frames, coords)):
+        frames_mm[i] = frame
+        faces_mm[i] = cv2.resize(frame[y1:y2, x1:x2], (img_size, img_size))
+    frames_mm.flush()
+    faces_mm.flush()
+    del frames_mm, faces_mm
+    np.save(tmp_dir / "coords.npy", np.asarray(coords, dtype=np.int32))
+
+    meta = {
+        "version": PACK_VERSION,
+        "fps": fps,
+        "img_size": img_size,
+        "n_frames": n,
+        "frame_shape": list(frames[0].shape),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": params or {},
+    }
+    with open(tmp_dir / META_NAME, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    shutil.rmtree(pack_dir, ignore_errors=True)
+    os.replace(tmp_dir, pack_dir)
+    return pack_dir
+
+
+def build_avatar_pack(
+    face_path,
+    pack_dir,
+    face_detection_path="models/face_detection.xml",
+    img_size=96,
+    resize_factor=1,
+    rotate=False,
+    crop=[0, -1, 0, -1],
+    box=[-1, -1, -1, -1],
+    static=False,
+    face_det_batch_size=16,
+    pads=[0, 10, 0, 0],
+    nosmooth=False,
+    keyframe_interval=1,
+    redetect_threshold=0.1,
+    det_long_edge=None,
+):
+    """
+    Decodifica el video del avatar, detecta la cara y escribe el avatar pack.
+
+    Los parámetros son los mismos que los de `ov_inference`. Con `static=True` el
+    pack solo contiene el primer fotograma.
+
+    Returns:
+        Path: Directorio del pack.
+    """
+    # Importación diferida: `ov_inference` importa este módulo
+    from ov_inference import face_detect_ov, read_video_frames
+
+    print("Reading video frames...")
+    frames, fps = read_video_frames(face_path, resize_factor, rotate, crop)
+    if static:
+        frames = frames[:1]
+    print("Number of frames in the avatar pack: {}".format(len(frames)))
+
+    if box[0] == -1:
+        face_det_results = face_detect_ov(
+            frames, "CPU", face_det_batch_size, pads, nosmooth, face_detection_path, keyframe_interval, redetect_threshold, det_long_edge
+        )
+        coords = [tuple(map(int, c)) for _, c in face_det_results]
+    else:
+        coords = [tuple(box)] * len(frames)
+
+    params = {
+        "video": os.path.abspath(face_path),
+        "face_detection_path": os.path.abspath(face_detection_path),
+        "resize_factor": resize_factor,
+        "rotate": rotate,
+        "crop": crop,
+        "box": box,
+        "static": static,
+        "pads": pads,
+        "nosmooth": nosmooth,
+        "keyframe_interval": keyframe_interval,
+        "redetect_threshold": redetect_threshold,
+        "det_long_edge": det_long_edge,
+    }
+    return write_avatar_pack(pack_dir, frames, coords, fps, img_size, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye un avatar pack a partir del video del avatar.")
+    parser.add_argument("--video", required=True, help="Ruta del video del avatar.")
+    parser.add_argument("--out", required=True, help="Directorio de salida del pack.")
+    parser.add_argument("--detector", default="models/face_detection.xml", help="Modelo OpenVINO de detección de caras.")
+    parser.add_argument("--img_size", type=int, default=96)
+    parser.add_argument("--resize_factor", type=int, default=1)
+    parser.add_argument("--rotate", action="store_true")
+    parser.add_argument("--crop", type=int, nargs=4, default=[0, -1, 0, -1])
+    parser.add_argument("--box", type=int, nargs=4, default=[-1, -1, -1, -1])
+    parser.add_argument("--static", action="store_true")
+    parser.add_argument("--pads", type=int, nargs=4, default=[0, 10, 0, 0])
+    parser.add_argument("--nosmooth", action="store_true")
+    parser.add_argument("--face_det_batch_size", type=int, default=16)
+    parser.add_argument("--keyframe_interval", type=int, default=1)
+    parser.add_argument("--redetect_threshold", type=float, default=0.1)
+    parser.add_argument("--det_long_edge", type=int, default=None)
+    args = parser.parse_args()
+
+    pack_dir = build_avatar_pack(
+        args.video,
+        args.out,
+        face_detection_path=args.detector,
+        img_size=args.img_size,
+        resize_factor=args.resize_factor,
+        rotate=args.rotate,
+        crop=args.crop,
+        box=args.box,
+        static=args.static,
+        face_det_batch_size=args.face_det_batch_size,
+        pads=args.pads,
+        nosmooth=args.nosmooth,
+        keyframe_interval=args.keyframe_interval,
+        redetect_threshold=args.redetect_threshold,
+        det_long_edge=args.det_long_edge,
+    )
+    print(f"Avatar pack guardado en: {pack_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# cache_utils.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from scipy.io import wavfile
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Calcula el SHA-256 del contenido de un archivo leyéndolo por bloques.
+
+    Args:
+        path (str): Ruta del archivo.
+        chunk_size (int): Tamaño de cada bloque de lectura en bytes.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_model(xml_path):
+    """
+    Hash de un modelo OpenVINO IR: combina el `.xml` y su `.bin` de pesos.
+
+    Args:
+        xml_path (str): Ruta del archivo `.xml`.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    xml_path = Path(xml_path)
+    bin_path = xml_path.with_suffix(".bin")
+    parts = [hash_file(xml_path)]
+    if bin_path.exists():
+        parts.append(hash_file(bin_path))
+    return hashlib.sha256("".join(parts).encode()).hexdigest()
+
+
+def hash_audio(path):
+    """
+    Hash de las muestras de un audio.
+
+    Los WAV se decodifican, así que los metadatos del contenedor (etiquetas,
+    fragmentos LIST, ...) no cambian la clave; el resto de formatos se hashean
+    por contenido.
+
+    Args:
+        path (str): Ruta del audio.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Avisos por fragmentos del WAV que no son audio
+            warnings.simplefilter("ignore", wavfile.WavFileWarning)
+            rate, samples = wavfile.read(path, mmap=True)
+    except (ValueError, OSError):
+        return hash_file(path)
+    digest = hashlib.sha256("{}:{}:{}".format(rate, samples.dtype.str, samples.shape).encode())
+    digest.update(memoryview(np.ascontiguousarray(samples)).cast("B"))
+    return digest.hexdigest()
+
+
+def hash_params(**params):
+    """
+    Hash estable de un conjunto de parámetros serializables en JSON.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def atomic_write_bytes(path, data):
+    """
+    Escribe un archivo de forma atómica (archivo temporal + `os.replace`).
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_copy_file(src, dst):
+    """
+    Copia un archivo de forma atómica (copia temporal en el destino + `os.replace`).
+    """
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Bloqueo exclusivo entre procesos sobre el archivo `path` (se crea si no existe).
+
+    Protege las secuencias leer-modificar-guardar de los índices en disco que
+    comparten varios procesos (p. ej. los de `--shards` o dos `run_inference`).
+    """
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK reintenta durante 10 s y después lanza OSError
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LRUDiskCache:
+    """
+    Caché en disco con presupuesto de bytes y expulsión LRU.
+
+    Cada entrada es un archivo dentro de `cache_dir`. Un índice `index.json`
+    guarda el tamaño y el último acceso de cada entrada, además de los contadores
+    de aciertos y fallos, para que sobrevivan entre procesos y reinicios. Cada
+    actualización del índice relee, modifica y guarda bajo `index.lock`, así que
+    varios procesos pueden usar la misma caché a la vez.
+    """
+
+    INDEX_NAME = "index.json"
+    LOCK_NAME = "index.lock"
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    @property
+    def index_path(self):
+        return self.cache_dir / self.INDEX_NAME
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, file_lock(self.cache_dir / self.LOCK_NAME):
+            yield
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("hits", 0)
+        index.setdefault("misses", 0)
+        index.setdefault("evictions", 0)
+        # Descarta entradas cuyo archivo ya no existe
+        index["entries"] = {k: v for k, v in index["entries"].items() if (self.cache_dir / v["file"]).exists()}
+        return index
+
+    def _save_index(self):
+        atomic_write_bytes(self.index_path, json.dumps(self._index, indent=1).encode("utf-8"))
+
+    def _evict(self):
+        entries = self._index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            entry = entries.pop(key)
+            total -= entry["size"]
+            self._index["evictions"] += 1
+            try:
+                os.remove(self.cache_dir / entry["file"])
+            except OSError:
+                pass
+
+    def get(self, key):
+        """
+        Devuelve la ruta del archivo de la entrada `key`, o None si no está en caché.
+        """
+        with self._locked():
+            # Relee el índice: otros procesos pueden haber añadido o expulsado entradas
+            self._index = self._load_index()
+            entry = self._index["entries"].get(key)
+            if entry is None or not (self.cache_dir / entry["file"]).exists():
+                self._index["entries"].pop(key, None)
+                self._index["misses"] += 1
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._index["hits"] += 1
+            self._save_index()
+            return self.cache_dir / entry["file"]
+
+    def put(self, key, data, suffix=""):
+        """
+        Guarda `data` (bytes) como entrada `key` y aplica el presupuesto de bytes.
+
+        Returns:
+            Path: Ruta del archivo guardado, o None si la entrada supera el presupuesto.
+        """
+        return self._put(key, len(data), suffix, lambda path: atomic_write_bytes(path, data))
+
+    def put_file(self, key, src_path, suffix=""):
+        """
+        Como `put`, pero copia el archivo `src_path` sin cargarlo en memoria.
+
+        Returns:
+            Path: Ruta del archivo guardado, o None si la entrada supera el presupuesto.
+        """
+        return self._put(key, os.path.getsize(src_path), suffix, lambda path: atomic_copy_file(src_path, path))
+
+    def _put(self, key, size, suffix, write):
+        if size > self.max_bytes:
+            return None
+        filename = key + suffix
+        with self._locked():
+            self._index = self._load_index()
+            write(self.cache_dir / filename)
+            self._index["entries"][key] = {"file": filename, "size": size, "last_access": time.time()}
+            self._evict()
+            self._save_index()
+        return self.cache_dir / filename
+
+    def stats(self):
+        """
+        Estadísticas de la caché: aciertos, fallos, expulsiones, entradas y bytes usados.
+        """
+        with self._lock:
+            entries = self._index["entries"]
+            lookups = self._index["hits"] + self._index["misses"]
+            return {
+                "hits": self._index["hits"],
+                "misses": self._index["misses"],
+                "hit_rate": self._index["hits"] / lookups if lookups else 0.0,
+                "evictions": self._index["evictions"],
+                "entries": len(entries),
+                "bytes": sum(e["size"] for e in entries.values()),
+                "max_bytes": self.max_bytes,
+            }
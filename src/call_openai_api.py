@@ -1,29 +1,11 @@
 import os
-
-from dotenv import load_dotenv
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import threading
 from pathlib import Path
 
 #Cargar variables de entorno desde el archivo .env
 # Ruta relativa al archivo .env en models/
 project_root = Path(__file__).resolve().parent.parent  # Sube al nivel raíz del proyecto
 env_path = project_root / "models" / ".env"           # Ruta completa al archivo .env
-load_dotenv(dotenv_path=env_path)
-
-#Configuracion de la clave de la api
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("No se encontro la clave de API")
-
-OPENAI_KEY_VAL = api_key
-
-llm = ChatOpenAI(
-    openai_api_key = OPENAI_KEY_VAL,
-    temperature = 0.7,
-    model = "gpt-4"
-)
 
 #plantilla del prompt con el texto leido del archivo
 template ="""
@@ -31,15 +13,48 @@ Eres un asistente de IA que orienta a los alumnos a ser mejores personas. Haz un
 Texto:{texto}
 Respuesta:
 """
-prompt = PromptTemplate(
-    input_variables = ["texto"],
-    template = template
-)
 
-chain = LLMChain(
-    llm = llm,
-    prompt = prompt
-)
+# langchain y el cliente de OpenAI se crean en el primer uso (ver get_chain), no al importar
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_chain():
+    """
+    Devuelve la cadena de LangChain del proceso, creándola la primera vez.
+
+    Importar este módulo no carga langchain ni exige la clave de API; si falta la
+    clave, el error aparece al pedir la primera respuesta.
+    """
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            from dotenv import load_dotenv
+            from langchain.chat_models import ChatOpenAI
+            from langchain.prompts import PromptTemplate
+            from langchain.chains import LLMChain
+
+            load_dotenv(dotenv_path=env_path)
+
+            #Configuracion de la clave de la api
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("No se encontro la clave de API")
+
+            llm = ChatOpenAI(
+                openai_api_key = api_key,
+                temperature = 0.7,
+                model = "gpt-4"
+            )
+            prompt = PromptTemplate(
+                input_variables = ["texto"],
+                template = template
+            )
+            _chain = LLMChain(
+                llm = llm,
+                prompt = prompt
+            )
+        return _chain
 
 #def save_summary_to_file(summary_text, filename = 'response.txt'):
 def save_summary_to_file(summary_text, filename = 'C:/programacionEjercicios/miwav2lipv6/results/OpenAI_response.txt'):
@@ -64,7 +79,7 @@ def moni(archivo):
     #texto_usuario = input("Ingresa un texto para resumir:")
     #texto_usuario = read_text_from_file("C:/programacionEjercicios/miwav2lipv6/results/transcripcion.txt")
     texto_usuario = read_text_from_file(archivo)
-    resultado = chain.run(texto = texto_usuario)
+    resultado = get_chain().run(texto = texto_usuario)
 
     #Mostrar el resumen generado
     print("\nResumen generado:")
@@ -0,0 +1,148 @@
+# conversion_manifest.py
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from importlib import metadata
+from pathlib import Path
+
+import openvino as ov
+
+from cache_utils import atomic_write_bytes, hash_file, hash_model, hash_params
+
+MANIFEST_NAME = "conversion_manifest.json"
+
+
+def converter_versions():
+    """
+    Versiones de las herramientas que intervienen en la conversión, sin importar torch.
+    """
+    versions = {"openvino": ov.__version__}
+    for package in ("torch",):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def save_model_atomic(model, ir_path, compress_to_fp16=True):
+    """
+    Guarda un `ov.Model` sin dejar nunca un IR a medias en `ir_path`.
+
+    El `.xml` y el `.bin` se escriben en un directorio temporal junto al destino y
+    se mueven con `os.replace`: primero los pesos y después el `.xml`, que es el
+    archivo que abren los lectores. `compress_to_fp16` es el de `ov.save_model`.
+    """
+    ir_path = Path(ir_path)
+    ir_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=ir_path.parent, prefix=".{}.".format(ir_path.stem)))
+    try:
+        tmp_xml = tmp_dir / ir_path.name
+        ov.save_model(model, tmp_xml, compress_to_fp16=compress_to_fp16)
+        os.replace(tmp_xml.with_suffix(".bin"), ir_path.with_suffix(".bin"))
+        os.replace(tmp_xml, ir_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return ir_path
+
+
+class ConversionManifest:
+    """
+    Registro de las conversiones a IR de un directorio de modelos (`conversion_manifest.json`).
+
+    Cada IR guarda el hash de sus fuentes (checkpoints de PyTorch o IR de los que
+    deriva), las versiones del conversor, las opciones de exportación y el hash del
+    propio IR. Una conversión está al día si todo coincide, así que `convert_models.py`
+    solo reconvierte lo que ha cambiado. Los hashes de las fuentes se recuerdan por
+    tamaño y fecha de modificación para no releer checkpoints de cientos de MB.
+
+    Args:
+        models_dir (str): Directorio de los IR (el manifiesto se guarda dentro).
+    """
+
+    def __init__(self, models_dir):
+        self.path = Path(models_dir) / MANIFEST_NAME
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("models", {})
+        manifest.setdefault("sources", {})
+        return manifest
+
+    def _save(self, manifest):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _source_hash(self, manifest, path):
+        path = os.path.abspath(str(path))
+        known = manifest["sources"].get(path)
+        stat = self._stat(path)
+        if known is not None and known["stat"] == stat:
+            return known["hash"]
+        source_hash = hash_model(path) if path.endswith(".xml") else hash_file(path)
+        manifest["sources"][path] = {"stat": stat, "hash": source_hash}
+        return source_hash
+
+    @staticmethod
+    def _fingerprint(source_hashes, options):
+        return hash_params(sources=source_hashes, versions=converter_versions(), options=options)
+
+    def is_up_to_date(self, ir_path, sources, options):
+        """
+        Comprueba si `ir_path` existe y se generó con estas fuentes, versiones y opciones.
+
+        Args:
+            ir_path (str): IR de destino (`.xml`).
+            sources (dict): Nombre -> ruta de cada fuente. Las fuentes que no existen
+                en disco se dan por buenas si el manifiesto ya las registró (conversión
+                sin red con los checkpoints borrados).
+            options (dict): Opciones de exportación serializables en JSON.
+        """
+        ir_path = Path(ir_path)
+        if not ir_path.exists() or not ir_path.with_suffix(".bin").exists():
+            return False
+        with self._lock:
+            manifest = self._load()
+            entry = manifest["models"].get(ir_path.name)
+            if entry is None or entry["ir_hash"] != self._source_hash(manifest, ir_path):
+                return False
+            source_hashes = {}
+            for name, path in sources.items():
+                if os.path.exists(path):
+                    source_hashes[name] = self._source_hash(manifest, path)
+                elif name in entry["sources"]:
+                    source_hashes[name] = entry["sources"][name]
+                else:
+                    return False
+            self._save(manifest)
+        return self._fingerprint(source_hashes, options) == entry["fingerprint"]
+
+    def record(self, ir_path, sources, options):
+        """
+        Registra que `ir_path` se acaba de generar a partir de `sources` con `options`.
+        """
+        ir_path = Path(ir_path)
+        with self._lock:
+            manifest = self._load()
+            source_hashes = {name: self._source_hash(manifest, path) for name, path in sources.items()}
+            manifest["models"][ir_path.name] = {
+                "sources": source_hashes,
+                "versions": converter_versions(),
+                "options": options,
+                "fingerprint": self._fingerprint(source_hashes, options),
+                "ir_hash": self._source_hash(manifest, ir_path),
+            }
+            self._save(manifest)
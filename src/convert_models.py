@@ -1,16 +1,66 @@
+import argparse
+import os
 import sys
 from pathlib import Path
 
 # Añade `src` a `sys.path` para que Python encuentre el módulo `utils`
 sys.path.append(str(Path(__file__).resolve().parent))
 
-# Importa la función desde utils/notebook_utils.py
-from utils.notebook_utils import download_file
-from ov_wav2lip_helper import download_and_convert_models
+from frame_source import VideoFrameSource
+from model_variants import PRECISIONS, detection_hw
+from ov_wav2lip_helper import convert_face_detection_u8, convert_wav2lip_fused, download_and_convert_models, export_static_variants
 
 
 OV_FACE_DETECTION_MODEL_PATH = Path("../miwav2lipv6/models/face_detection.xml")
 OV_WAV2LIP_MODEL_PATH = Path("../miwav2lipv6/models/wav2lip.xml")
+OV_FACE_DETECTION_U8_MODEL_PATH = Path("../miwav2lipv6/models/face_detection_u8.xml")
+OV_WAV2LIP_FUSED_MODEL_PATH = Path("../miwav2lipv6/models/wav2lip_fused.xml")
+# Avatares cuyas resoluciones de detección reciben una variante estática del detector
+AVATAR_VIDEOS = [os.path.abspath("../miwav2lipv6/assets/video/data_video_sun.mp4")]
 
 
-download_and_convert_models(OV_FACE_DETECTION_MODEL_PATH, OV_WAV2LIP_MODEL_PATH)
+def parse_hw(value):
+    h, w = value.lower().split("x")
+    return int(h), int(w)
+
+
+def avatar_detection_hws(videos, resize_factor=2, det_long_edge=None):
+    """
+    Resoluciones `(alto, ancho)` con las que `ov_inference` pasa estos avatares al detector.
+    """
+    hws = []
+    for video in videos:
+        if not os.path.exists(video):
+            print("Avatar no encontrado, se omite: {}".format(video))
+            continue
+        h, w = VideoFrameSource(video, resize_factor).frame_shape[:2]
+        hw = detection_hw(h, w, det_long_edge)
+        if hw not in hws:
+            hws.append(hw)
+    return hws
+
+
+# Las conversiones se lanzan en procesos `spawn`, que vuelven a importar este script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte a IR los modelos que no estén al día según conversion_manifest.json.")
+    parser.add_argument("--force", action="store_true", help="Reconvierte todos los modelos aunque estén al día.")
+    parser.add_argument("--jobs", type=int, default=None, help="Procesos de conversión (por defecto, uno por modelo pendiente).")
+    parser.add_argument("--batch_sizes", type=int, nargs="*", default=[16, 32, 64, 128], help="Lotes estáticos de las variantes de Wav2Lip (ninguno = sin variantes).")
+    parser.add_argument("--detector_batch", type=int, default=16, help="Lote estático de las variantes del detector (el --face_det_batch_size del render).")
+    parser.add_argument("--avatars", nargs="*", default=AVATAR_VIDEOS, help="Videos de avatar cuya resolución de detección recibe una variante del detector.")
+    parser.add_argument("--detector_shapes", type=parse_hw, nargs="*", default=[], help="Resoluciones de detección adicionales, como 360x640.")
+    parser.add_argument("--resize_factor", type=int, default=2, help="El --resize_factor con el que se renderizan los avatares.")
+    parser.add_argument("--det_long_edge", type=int, default=None, help="El --det_long_edge con el que se renderizan los avatares.")
+    parser.add_argument("--precisions", nargs="+", choices=PRECISIONS, default=list(PRECISIONS))
+    args = parser.parse_args()
+
+    download_and_convert_models(OV_FACE_DETECTION_MODEL_PATH, OV_WAV2LIP_MODEL_PATH, force=args.force, jobs=args.jobs)
+    convert_face_detection_u8(OV_FACE_DETECTION_MODEL_PATH, OV_FACE_DETECTION_U8_MODEL_PATH, force=args.force)
+    convert_wav2lip_fused(OV_WAV2LIP_MODEL_PATH, OV_WAV2LIP_FUSED_MODEL_PATH, force=args.force)
+
+    # Variantes de los modelos que usa run_inference; se miden después con model_variants.py
+    if args.batch_sizes:
+        export_static_variants(OV_WAV2LIP_FUSED_MODEL_PATH, args.batch_sizes, precisions=args.precisions, force=args.force)
+    detector_hws = list(dict.fromkeys(avatar_detection_hws(args.avatars, args.resize_factor, args.det_long_edge) + args.detector_shapes))
+    if detector_hws:
+        export_static_variants(OV_FACE_DETECTION_U8_MODEL_PATH, [args.detector_batch], detector_hws, args.precisions, force=args.force)
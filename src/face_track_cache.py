@@ -0,0 +1,77 @@
+# face_track_cache.py
+
+import io
+import os
+
+import numpy as np
+
+from cache_utils import LRUDiskCache, hash_file, hash_model, hash_params
+
+# Presupuesto por defecto de la caché de pistas de cara (las entradas ocupan pocos KB)
+DEFAULT_FACE_TRACK_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class FaceTrackCache:
+    """
+    Caché persistente de las cajas de cara suavizadas de un video de avatar.
+
+    La clave combina el hash del contenido del video, el hash del modelo de
+    detección y todos los parámetros que afectan a las cajas. Cada entrada guarda
+    un array `(N, 4)` con las coordenadas `(y1, y2, x1, x2)` de cada fotograma, de
+    modo que `datagen` puede saltarse la detección por completo.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_FACE_TRACK_CACHE_BYTES):
+        self.cache = LRUDiskCache(cache_dir, max_bytes)
+        self._file_hashes = {}
+
+    def _hash(self, path, hasher):
+        # Como en `RenderCache`: un video sustituido en la misma ruta se vuelve a hashear
+        stat = os.stat(path)
+        memo_key = (str(path), hasher.__name__, stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._file_hashes:
+            self._file_hashes[memo_key] = hasher(path)
+        return self._file_hashes[memo_key]
+
+    def make_key(self, video_path, detector_path, **params):
+        """
+        Construye la clave de caché.
+
+        Args:
+            video_path (str): Ruta del video del avatar.
+            detector_path (str): Ruta del modelo `face_detection.xml`.
+            **params: Parámetros de detección (`pads`, `resize_factor`, `crop`,
+                `rotate`, `nosmooth`, ...).
+
+        Returns:
+            str: Clave hexadecimal.
+        """
+        return hash_params(
+            video=self._hash(video_path, hash_file),
+            detector=self._hash(detector_path, hash_model),
+            **params,
+        )
+
+    def load(self, key):
+        """
+        Devuelve las coordenadas guardadas para `key`, o None si no están en caché.
+        """
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        try:
+            return np.load(path)
+        except FileNotFoundError:
+            # Otro proceso lo ha expulsado entre la consulta y la carga
+            return None
+
+    def store(self, key, coords):
+        """
+        Guarda las coordenadas `(y1, y2, x1, x2)` de cada fotograma.
+        """
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(coords, dtype=np.int32))
+        self.cache.put(key, buffer.getvalue(), suffix=".npy")
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,98 @@
+# face_tracking.py
+
+import cv2
+import numpy as np
+
+# Tamaño de la miniatura en escala de grises usada para medir la deriva de la cara
+DRIFT_THUMB_SIZE = 32
+
+
+def select_keyframes(n_frames, keyframe_interval):
+    """
+    Devuelve los índices de fotogramas clave: uno cada `keyframe_interval` más el último.
+
+    Args:
+        n_frames (int): Número total de fotogramas.
+        keyframe_interval (int): Distancia entre fotogramas clave (1 = todos).
+
+    Returns:
+        list: Índices ordenados de los fotogramas clave.
+    """
+    keyframes = list(range(0, n_frames, max(1, keyframe_interval)))
+    if n_frames and keyframes[-1] != n_frames - 1:
+        keyframes.append(n_frames - 1)
+    return keyframes
+
+
+def _face_thumbnail(frame, box):
+    x1, y1, x2, y2 = box
+    crop = frame[y1:y2, x1:x2]
+    if crop.size == 0:
+        return None
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(crop, (DRIFT_THUMB_SIZE, DRIFT_THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def appearance_drift(frame, reference_frame, box):
+    """
+    Mide cuánto ha cambiado la región de la cara respecto al último fotograma detectado.
+
+    Compara miniaturas en escala de grises de la caja `box` en ambos fotogramas; es
+    una comprobación muy barata frente a ejecutar S3FD.
+
+    Args:
+        frame (np.ndarray): Fotograma actual.
+        reference_frame (np.ndarray): Fotograma donde se detectó `box`.
+        box (tuple): Caja `(x1, y1, x2, y2)` de la última detección.
+
+    Returns:
+        float: Diferencia absoluta media normalizada a [0, 1].
+    """
+    current, reference = _face_thumbnail(frame, box), _face_thumbnail(reference_frame, box)
+    if current is None or reference is None:
+        return 1.0
+    return float(np.mean(np.abs(current - reference)) / 255.0)
+
+
+def frames_to_redetect(images, detections, redetect_threshold):
+    """
+    Busca, entre fotogramas clave, los que se han alejado demasiado de la última detección.
+
+    Args:
+        images (list): Fotogramas del video.
+        detections (dict): Índice de fotograma -> caja detectada (o None).
+        redetect_threshold (float): Deriva máxima antes de volver a detectar.
+
+    Returns:
+        list: Índices de los fotogramas que deben pasar por el detector.
+    """
+    detected = sorted(detections)
+    redetect = []
+    for start, end in zip(detected[:-1], detected[1:]):
+        box = detections[start]
+        if box is None:
+            continue
+        for i in range(start + 1, end):
+            if appearance_drift(images[i], images[start], box) > redetect_threshold:
+                redetect.append(i)
+                break
+    return redetect
+
+
+def interpolate_track(detections, n_frames):
+    """
+    Propaga las cajas detectadas a todos los fotogramas por interpolación lineal.
+
+    Args:
+        detections (dict): Índice de fotograma -> caja `(x1, y1, x2, y2)`.
+        n_frames (int): Número total de fotogramas.
+
+    Returns:
+        list: Una caja `(x1, y1, x2, y2)` de enteros por fotograma.
+    """
+    indices = np.array(sorted(detections))
+    boxes = np.array([detections[i] for i in indices], dtype=np.float64)
+    frames = np.arange(n_frames)
+    track = np.stack([np.interp(frames, indices, boxes[:, c]) for c in range(4)], axis=1)
+    return [tuple(map(int, b)) for b in np.rint(track)]
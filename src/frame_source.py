@@ -0,0 +1,207 @@
+# frame_source.py
+
+import queue
+import threading
+
+import cv2
+
+# Marca de fin de la cola de prefetch
+_END = object()
+
+
+def transform_frame(frame, resize_factor=1, rotate=False, crop=[0, -1, 0, -1]):
+    """
+    Aplica a un fotograma el redimensionado, la rotación y el recorte de `ov_inference`.
+
+    Args:
+        frame (np.ndarray): Fotograma BGR decodificado.
+        resize_factor (int): Factor de reducción de resolución.
+        rotate (bool): Gira el fotograma 90 grados en sentido horario.
+        crop (list): Recorte `[y1, y2, x1, x2]`; -1 significa hasta el borde.
+
+    Returns:
+        np.ndarray: Fotograma transformado.
+    """
+    if resize_factor > 1:
+        frame = cv2.resize(frame, (frame.shape[1] // resize_factor, frame.shape[0] // resize_factor))
+
+    if rotate:
+        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+
+    y1, y2, x1, x2 = crop
+    if x2 == -1:
+        x2 = frame.shape[1]
+    if y2 == -1:
+        y2 = frame.shape[0]
+
+    return frame[y1:y2, x1:x2]
+
+
+class VideoFrameSource:
+    """
+    Fuente de fotogramas que decodifica el video bajo demanda.
+
+    Cada iteración abre el video de nuevo y entrega los fotogramas ya
+    transformados uno a uno, sin guardarlos en memoria.
+
+    Args:
+        path (str): Ruta del video.
+        resize_factor (int): Factor de reducción de resolución.
+        rotate (bool): Gira los fotogramas 90 grados en sentido horario.
+        crop (list): Recorte `[y1, y2, x1, x2]`.
+    """
+
+    def __init__(self, path, resize_factor=1, rotate=False, crop=[0, -1, 0, -1]):
+        self.path = path
+        self.resize_factor = resize_factor
+        self.rotate = rotate
+        self.crop = crop
+        self._fps = None
+        self._frame_shape = None
+
+    def _probe(self):
+        video_stream = cv2.VideoCapture(self.path)
+        try:
+            self._fps = video_stream.get(cv2.CAP_PROP_FPS)
+            still_reading, frame = video_stream.read()
+        finally:
+            video_stream.release()
+        if not still_reading:
+            raise ValueError("No se pudo leer ningún fotograma de {}".format(self.path))
+        self._frame_shape = self._transform(frame).shape
+
+    def _transform(self, frame):
+        return transform_frame(frame, self.resize_factor, self.rotate, self.crop)
+
+    @property
+    def fps(self):
+        if self._fps is None:
+            self._probe()
+        return self._fps
+
+    @property
+    def frame_shape(self):
+        """
+        Forma `(H, W, 3)` de los fotogramas ya transformados.
+        """
+        if self._frame_shape is None:
+            self._probe()
+        return self._frame_shape
+
+    def __iter__(self):
+        return self.frames()
+
+    def frames(self, limit=None, start=0):
+        """
+        Genera los fotogramas del video a partir del fotograma `start`, como mucho `limit`.
+
+        Los fotogramas anteriores a `start` se saltan con `grab`, sin decodificarlos
+        ni transformarlos.
+        """
+        video_stream = cv2.VideoCapture(self.path)
+        try:
+            for _ in range(start):
+                if not video_stream.grab():
+                    return
+            n = 0
+            while limit is None or n < limit:
+                still_reading, frame = video_stream.read()
+                if not still_reading:
+                    break
+                yield self._transform(frame)
+                n += 1
+        finally:
+            video_stream.release()
+
+    def count(self):
+        """
+        Cuenta los fotogramas del video recorriéndolo con `grab` (la cabecera del
+        contenedor no siempre es fiable).
+        """
+        video_stream = cv2.VideoCapture(self.path)
+        try:
+            n = 0
+            while video_stream.grab():
+                n += 1
+            return n
+        finally:
+            video_stream.release()
+
+    def cycle(self, n_frames=None, start=0):
+        """
+        Genera exactamente `n_frames` fotogramas, volviendo al principio del video
+        cuando se acaba (igual que `datagen` con `i % len(frames)`). Con `None` no
+        termina nunca; el consumidor decide cuándo parar.
+
+        `start` es la posición del primer fotograma en el ciclo: el fotograma `k`
+        generado es el `(start + k) % len(video)` del video.
+        """
+        produced = 0
+        while n_frames is None or produced < n_frames:
+            before = produced
+            for frame in self.frames(None if n_frames is None else n_frames - produced, start):
+                yield frame
+                produced += 1
+            if produced == before:
+                if start == 0:
+                    raise ValueError("No se pudo leer ningún fotograma de {}".format(self.path))
+                # `start` cae más allá del final: solo ahora hace falta la longitud del video
+                n_video = self.count()
+                if n_video == 0:
+                    raise ValueError("No se pudo leer ningún fotograma de {}".format(self.path))
+                start %= n_video
+                continue
+            start = 0
+
+
+def prefetch(iterable, maxsize=16):
+    """
+    Consume `iterable` en un hilo de fondo a través de una cola acotada.
+
+    Como mucho hay `maxsize` elementos esperando en memoria, así que la
+    decodificación se solapa con el resto del trabajo sin acumular el video.
+    Las excepciones del hilo de fondo se relanzan en el consumidor.
+
+    Args:
+        iterable: Fuente de elementos (por ejemplo `VideoFrameSource.frames()`).
+        maxsize (int): Capacidad de la cola.
+
+    Yields:
+        Los elementos de `iterable`, en orden.
+    """
+    items = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        put(_END)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # Si el consumidor se detiene antes de tiempo, libera al productor
+        stop.set()
+        thread.join(timeout=1.0)
@@ -1,15 +1,18 @@
 # interfaceV2.py
 
 import gradio as gr
-import sounddevice as sd
 from scipy.io.wavfile import write
 import tempfile
 import shutil
 import os
 import subprocess
 import sys
-from whisper_audio_transcriber import transcribe_audio, guardar_transcripcion
-from call_openai_api import  moni as rtff   # Asegúrate de que el archivo call_open_api.py esté en el mismo directorio
+import inspect
+import threading
+import time
+# Ninguno de los dos carga su backend (transformers, langchain) al importarse; ver precargar_backends
+from whisper_audio_transcriber import get_pipeline, transcribe_audio, guardar_transcripcion
+from call_openai_api import  get_chain, moni as rtff   # Asegúrate de que el archivo call_open_api.py esté en el mismo directorio
 
 
 # Paths to files (adjusted as per your specified structure)
@@ -22,9 +25,55 @@ RESULT_AUDIO_TEMP_PATH = os.path.abspath( "C:/programacionEjercicios/miwav2lipv6
 RESULT_AUDIO_FINAL_PATH = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/assets/audio/audio.wav")
 RESULT_VIDEO_PATH = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/results/result_voice.mp4")
 TEXT_TO_SPEECH_PATH = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/src/text_to_speech.py")
+FACE_DETECTION_PATH = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/models/face_detection.xml")
+WAV2LIP_PATH = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/models/wav2lip.xml")
+RESULT_SEGMENTS_DIR = os.path.abspath("C:/programacionEjercicios/miwav2lipv6/results/segments")
+WHISPER_MODEL_NAME = "openai/whisper-large"
+# VIDEO_AVATAR_PRELOAD=0 desactiva la precarga y cada backend se carga en su primer uso
+PRELOAD_BACKENDS = os.environ.get("VIDEO_AVATAR_PRELOAD", "1") != "0"
+
+# Precarga los backends pesados en segundo plano mientras la interfaz ya atiende peticiones
+def precargar_backends():
+    """
+    Carga en un hilo de fondo Whisper, el cliente del LLM y los modelos de OpenVINO.
+
+    Cada backend se sigue cargando bajo demanda si se usa antes de que termine la
+    precarga (la primera llamada espera a la carga en curso en lugar de repetirla).
+    Un fallo (p. ej. falta la clave de OpenAI) solo se informa: el error real
+    aparece cuando el flujo usa ese backend.
+
+    Returns:
+        threading.Thread: Hilo de precarga ya iniciado.
+    """
+    def cargar(nombre, funcion):
+        start = time.perf_counter()
+        try:
+            funcion()
+        except Exception as e:
+            print("Precarga de {} fallida: {}".format(nombre, e))
+            return
+        print("Precarga de {}: {:.2f} s".format(nombre, time.perf_counter() - start))
+
+    def ov_models():
+        from model_registry import preload_models
+
+        for thread in preload_models(FACE_DETECTION_PATH, WAV2LIP_PATH, device="CPU"):
+            thread.join()
+
+    def run():
+        # OpenVINO primero: es lo que más tarda en la primera respuesta del avatar
+        cargar("OpenVINO", ov_models)
+        cargar("Whisper", lambda: get_pipeline(WHISPER_MODEL_NAME))
+        cargar("LLM", get_chain)
+
+    thread = threading.Thread(target=run, name="precarga", daemon=True)
+    thread.start()
+    return thread
 
 # Function to record 8-second audio
 def grabar_audio(duration=8, sample_rate=44100):
+    import sounddevice as sd
+
     print("Starting recording...")
     audio_data = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=1)
     print(f"Recording in progress for {duration} seconds...")
@@ -45,10 +94,9 @@ def grabar_audio(duration=8, sample_rate=44100):
 def transcribir_con_progreso(audio_path):
     progreso = gr.Progress()
     progreso(0, "Starting transcription...")
-    model_name = "openai/whisper-large"
     progreso(25, "Loading Whisper model...")
 
-    transcripcion = transcribe_audio(audio_path, model_name)
+    transcripcion = transcribe_audio(audio_path, WHISPER_MODEL_NAME)
     progreso(75, "Saving transcription...")
     guardar_transcripcion(transcripcion, filename=TRANSCRIPTION_TEXT_PATH)
     progreso(100, "Transcription completed.")
@@ -107,6 +155,28 @@ def procesar_video_audio():
         print("Error: Video file was not generated at 'results/result_voice.mp4'")
         return None
 
+# Function to process video and audio in-process, yielding playable segments as soon as they are rendered
+def procesar_video_audio_streaming(segment_seconds=2.0):
+    from ov_inference import ov_inference_segments
+
+    print("Starting streaming video and audio processing...")
+    shutil.rmtree(RESULT_SEGMENTS_DIR, ignore_errors=True)
+    for segment in ov_inference_segments(
+        VIDEO_PATH,
+        RESULT_AUDIO_FINAL_PATH,
+        face_detection_path=FACE_DETECTION_PATH,
+        wav2lip_path=WAV2LIP_PATH,
+        inference_device="CPU",
+        resize_factor=2,
+        segment_dir=RESULT_SEGMENTS_DIR,
+        segment_seconds=segment_seconds,
+    ):
+        print("Segment {index} ready after {ready_s:.2f} s: {path}".format(**segment))
+        yield segment["path"]
+
+# Gradio 5 plays the segments back to back; older versions replace the video with each segment
+VIDEO_STREAMING_KWARGS = {"streaming": True, "autoplay": True} if "streaming" in inspect.signature(gr.Video.__init__).parameters else {}
+
 # Gradio Interface Configuration
 def interfaz():
     with gr.Blocks() as demo:
@@ -119,7 +189,7 @@ def interfaz():
             with gr.Column():
                 output_audio = gr.Audio(AUDIO_RECORD_PATH, label="Audio Grabado", interactive=False)
                 output_audio_speech = gr.Audio(RESULT_AUDIO_FINAL_PATH, label="Audio TTS", interactive=False)
-                video_resultado = gr.Video(RESULT_VIDEO_PATH,label="Video procesado", interactive=False)
+                video_resultado = gr.Video(label="Video procesado", interactive=False, **VIDEO_STREAMING_KWARGS)
                 texto_transcripcion = gr.Textbox(label="Texto transcrito")
                 progreso_transcripcion = gr.Textbox(label="Transcription Status", interactive=False)
 
@@ -154,16 +224,15 @@ def interfaz():
                     # Generar audio desde texto
                     audio_generado = generar_audio_desde_texto()
                     print("Audio generado:", audio_generado)
-                    # Procesar video y audio
-                    video_path = procesar_video_audio()
-                    print("Video procesado en:", video_path)
-                    # Devolver resultados si todo fue exitoso
-                    return mensaje_grabacion, audio_path, transcripcion, audio_generado, video_path
+                    # Procesar video y audio: cada segmento se muestra en cuanto está listo
+                    for segment_path in procesar_video_audio_streaming():
+                        yield mensaje_grabacion, audio_path, transcripcion, audio_generado, segment_path
+                    print("Video procesado en:", RESULT_SEGMENTS_DIR)
                 
                 except Exception as e:
                     # Imprime el error en la terminal y regresa mensajes de error a la interfaz
                     print("Error detectado en flujo completo:", str(e))
-                    return (
+                    yield (
                         "Error durante el flujo completo",
                         None,  # Audio grabado
                         f"Error: {str(e)}",  # Transcripción
@@ -179,5 +248,7 @@ def interfaz():
     return demo
 
 if __name__ == "__main__":
+    if PRELOAD_BACKENDS:
+        precargar_backends()
     demo = interfaz()
     demo.launch(allowed_paths=["C:/programacionEjercicios/miwav2lipv6/assets", "C:/programacionEjercicios/miwav2lipv6/results"])
@@ -0,0 +1,251 @@
+# lipsync_pipeline.py
+
+import queue
+import threading
+import time
+
+import numpy as np
+import openvino as ov
+from tqdm import tqdm
+
+from model_registry import pad_batch, static_batch_size
+from profiling import record
+
+# Marca de fin de cola entre etapas
+_END = object()
+
+
+class StageStats:
+    """
+    Contador de tiempo ocupado, lotes y fotogramas procesados por una etapa del pipeline.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.batches = 0
+        self.frames = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, frames):
+        with self._lock:
+            self.busy += seconds
+            self.batches += 1
+            self.frames += frames
+        # El tramo acaba ahora: las etapas lo registran justo al terminar cada lote
+        record("lipsync." + self.name, seconds, frames)
+
+    def as_dict(self, wall_time):
+        return {
+            "stage": self.name,
+            "batches": self.batches,
+            "frames": self.frames,
+            "busy_s": self.busy,
+            "utilization": self.busy / wall_time if wall_time else 0.0,
+            "fps_busy": self.frames / self.busy if self.busy else 0.0,
+        }
+
+
+class LipSyncPipeline:
+    """
+    Bucle de inferencia de Wav2Lip en tres etapas solapadas.
+
+    1. Preparación (hilo propio): consume el generador `datagen` (recorte,
+       redimensionado y enmascarado) y deja los lotes en una cola acotada.
+    2. Inferencia (hilo principal): reparte los lotes en un `AsyncInferQueue` con
+       `infer_jobs` peticiones en vuelo.
+    3. Composición y codificación (hilo propio): pega las bocas en los fotogramas
+       y los escribe, reordenando los lotes para respetar el orden de los fotogramas.
+
+    Args:
+        compiled_wav2lip_model: Entrada del registro de modelos (o `ov.CompiledModel`).
+        fused (bool): True si el IR es el fusionado (u8 NHWC de entrada y salida).
+        write_batch (callable): `write_batch(mouths, frames, coords)` compone y escribe un
+            lote; `mouths` es None si el lote no pasó por el modelo.
+        infer_jobs (int): Número de lotes en vuelo en OpenVINO.
+        queue_size (int): Capacidad de las colas entre etapas.
+
+    Como mucho hay `2 * queue_size + infer_jobs + 3` lotes vivos a la vez (ver
+    `max_live_batches`), así que la memoria no crece con la longitud del video.
+    """
+
+    def __init__(self, compiled_wav2lip_model, fused, write_batch, infer_jobs=2, queue_size=4):
+        self.compiled_model = getattr(compiled_wav2lip_model, "compiled_model", compiled_wav2lip_model)
+        self.fused = fused
+        # Las variantes de lote estático reciben el último lote completado con `pad_batch`
+        self.static_batch = static_batch_size(self.compiled_model)
+        self.write_batch = write_batch
+        self.infer_jobs = max(1, infer_jobs)
+        self.queue_size = max(1, queue_size)
+        self.stats = {name: StageStats(name) for name in ("prep", "infer", "compose")}
+        self.wall_time = 0.0
+        self._errors = []
+        # Lotes entre `start_async` y el final de su composición
+        self._slots = threading.Semaphore(self.infer_jobs + self.queue_size)
+
+    @staticmethod
+    def max_live_batches(infer_jobs=2, queue_size=4):
+        """
+        Cota de lotes (con sus fotogramas) vivos a la vez: uno en construcción en
+        `datagen`, uno esperando a entrar en la cola de preparados, `queue_size` en
+        esa cola, uno esperando hueco en el hilo principal y `infer_jobs + queue_size`
+        entre la inferencia y la composición.
+        """
+        return 2 * max(1, queue_size) + max(1, infer_jobs) + 3
+
+    def _to_model_inputs(self, img_batch, mel_batch):
+        # Lote sin fotogramas que inferir (p. ej. todo silencio): va directo a composición
+        if len(img_batch) == 0:
+            return None
+        if self.fused:
+            inputs = {"audio_sequences": mel_batch, "face_sequences": img_batch}
+        else:
+            inputs = {
+                "audio_sequences": np.ascontiguousarray(np.transpose(mel_batch, (0, 3, 1, 2)), dtype=np.float32),
+                "face_sequences": np.ascontiguousarray(np.transpose(img_batch, (0, 3, 1, 2)), dtype=np.float32),
+            }
+        if self.static_batch is not None and len(img_batch) != self.static_batch:
+            if len(img_batch) > self.static_batch:
+                raise ValueError("Lote de {} fotogramas para un modelo de lote fijo {}".format(len(img_batch), self.static_batch))
+            inputs = pad_batch(inputs, self.static_batch)
+        return inputs
+
+    def _prep_stage(self, batches, prepared):
+        try:
+            iterator = iter(batches)
+            while not self._errors:
+                start = time.perf_counter()
+                try:
+                    img_batch, mel_batch, frames, coords = next(iterator)
+                except StopIteration:
+                    break
+                inputs = self._to_model_inputs(img_batch, mel_batch)
+                self.stats["prep"].add(time.perf_counter() - start, len(frames))
+                prepared.put((inputs, len(img_batch), frames, coords))
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            prepared.put(_END)
+
+    def _compose_stage(self, results, progress):
+        pending, next_idx = {}, 0
+        try:
+            while True:
+                item = results.get()
+                if item is _END:
+                    break
+                idx, mouths, frames, coords = item
+                pending[idx] = (mouths, frames, coords)
+                # Escribe en orden aunque las peticiones terminen desordenadas
+                while next_idx in pending:
+                    mouths, frames, coords = pending.pop(next_idx)
+                    start = time.perf_counter()
+                    if mouths is not None and not self.fused:
+                        mouths = (mouths.transpose(0, 2, 3, 1) * 255.0).astype(np.uint8)
+                    self.write_batch(mouths, frames, coords)
+                    self.stats["compose"].add(time.perf_counter() - start, len(frames))
+                    del mouths, frames, coords
+                    self._slots.release()
+                    progress.update(1)
+                    next_idx += 1
+        except BaseException as e:
+            self._errors.append(e)
+            # Sigue vaciando la cola para no bloquear los callbacks ni el hilo principal
+            for _ in pending:
+                self._slots.release()
+            pending.clear()
+            while results.get() is not _END:
+                self._slots.release()
+
+    def run(self, batches, total=None):
+        """
+        Ejecuta el pipeline completo sobre los lotes de `datagen`.
+
+        Args:
+            batches: Iterable de `(img_batch, mel_batch, frames, coords)`.
+            total (int): Número de lotes esperado (solo para la barra de progreso).
+
+        Returns:
+            dict: Informe de rendimiento por etapa (ver `report`).
+        """
+        prepared = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+        progress = tqdm(total=total)
+
+        def on_done(request, userdata):
+            idx, size, frames, coords = userdata
+            try:
+                # `size` descarta las filas de relleno de los modelos de lote estático
+                mouths = request.get_output_tensor(0).data[:size].copy()
+                self.stats["infer"].add(request.latency / 1000.0, len(mouths))
+                results.put((idx, mouths, frames, coords))
+            except BaseException as e:
+                self._errors.append(e)
+
+        start = time.perf_counter()
+        prep_thread = threading.Thread(target=self._prep_stage, args=(batches, prepared), name="lipsync-prep", daemon=True)
+        compose_thread = threading.Thread(target=self._compose_stage, args=(results, progress), name="lipsync-compose", daemon=True)
+        prep_thread.start()
+        compose_thread.start()
+
+        infer_queue = ov.AsyncInferQueue(self.compiled_model, self.infer_jobs)
+        infer_queue.set_callback(on_done)
+        idx = 0
+        try:
+            while not self._errors:
+                item = prepared.get()
+                if item is _END:
+                    break
+                inputs, size, frames, coords = item
+                while not self._slots.acquire(timeout=0.1):
+                    if self._errors:
+                        break
+                if self._errors:
+                    break
+                if inputs is None:
+                    results.put((idx, None, frames, coords))
+                else:
+                    infer_queue.start_async(inputs, (idx, size, frames, coords))
+                idx += 1
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            # También con error: ninguna etapa debe quedar viva reteniendo sus fotogramas
+            try:
+                # Relanza el error de una petición que falló después de `start_async`
+                infer_queue.wait_all()
+            except BaseException as e:
+                self._errors.append(e)
+            results.put(_END)
+            compose_thread.join()
+            # La preparación ve `_errors` y termina; se vacía su cola por si está bloqueada en `put`
+            while prep_thread.is_alive():
+                try:
+                    prepared.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            progress.close()
+        self.wall_time = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+        return self.report()
+
+    def report(self):
+        """
+        Devuelve el tiempo total y, por etapa, lotes, fotogramas, tiempo ocupado, utilización y fps.
+
+        El tiempo de inferencia es la suma de latencias de las peticiones, así que
+        con varias en vuelo su utilización puede superar el 100 %.
+        """
+        return {"wall_s": self.wall_time, "stages": [s.as_dict(self.wall_time) for s in self.stats.values()]}
+
+
+def print_report(report):
+    print("Pipeline: {:.2f} s en total".format(report["wall_s"]))
+    for stage in report["stages"]:
+        print(
+            "  {stage:<8} {batches:>4} lotes {frames:>6} fotogramas  ocupado {busy_s:6.2f} s ({utilization:4.0%})  {fps_busy:8.1f} fps".format(
+                **stage
+            )
+        )
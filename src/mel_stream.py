@@ -0,0 +1,316 @@
+# mel_stream.py
+
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+
+# Parámetros de audio de Wav2Lip (`Wav2Lip/hparams.py`)
+SAMPLE_RATE = 16000
+N_FFT = 800
+HOP_SIZE = 200
+WIN_SIZE = 800
+NUM_MELS = 80
+FMIN = 55
+FMAX = 7600
+PREEMPHASIS = 0.97
+REF_LEVEL_DB = 20
+MIN_LEVEL_DB = -100
+MAX_ABS_VALUE = 4.0
+
+# Columnas del banco de filtros que se proyectan juntas; fijo para que el resultado no dependa de los bloques
+MEL_TILE = 64
+
+# Argumentos de ffmpeg para leer el PCM que guarda `MelStream`
+PCM_INPUT_ARGS = ["-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1"]
+
+_MEL_BASIS = None
+
+
+def _hz_to_mel(frequencies):
+    # Escala de Slaney, como `librosa.hz_to_mel(htk=False)`
+    frequencies = np.asanyarray(frequencies, dtype=np.float64)
+    f_sp = 200.0 / 3
+    mels = frequencies / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    if frequencies.ndim:
+        log_t = frequencies >= min_log_hz
+        mels[log_t] = min_log_mel + np.log(frequencies[log_t] / min_log_hz) / logstep
+    elif frequencies >= min_log_hz:
+        mels = min_log_mel + np.log(frequencies / min_log_hz) / logstep
+    return mels
+
+
+def _mel_to_hz(mels):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs[log_t] = min_log_hz * np.exp(logstep * (mels[log_t] - min_log_mel))
+    return freqs
+
+
+def mel_basis():
+    """
+    Banco de filtros mel de Wav2Lip, igual que `librosa.filters.mel(sr=16000, n_fft=800,
+    n_mels=80, fmin=55, fmax=7600)` (escala de Slaney y normalización "slaney").
+
+    Returns:
+        np.ndarray: Matriz float32 `(80, 401)`.
+    """
+    global _MEL_BASIS
+    if _MEL_BASIS is None:
+        fftfreqs = np.fft.rfftfreq(n=N_FFT, d=1.0 / SAMPLE_RATE)
+        mel_f = _mel_to_hz(np.linspace(_hz_to_mel(FMIN), _hz_to_mel(FMAX), NUM_MELS + 2))
+        fdiff = np.diff(mel_f)
+        ramps = np.subtract.outer(mel_f, fftfreqs)
+        weights = np.zeros((NUM_MELS, 1 + N_FFT // 2), dtype=np.float32)
+        for i in range(NUM_MELS):
+            lower = -ramps[i] / fdiff[i]
+            upper = ramps[i + 2] / fdiff[i + 1]
+            weights[i] = np.maximum(0, np.minimum(lower, upper))
+        weights *= (2.0 / (mel_f[2 : NUM_MELS + 2] - mel_f[:NUM_MELS]))[:, np.newaxis]
+        _MEL_BASIS = weights
+    return _MEL_BASIS
+
+
+def pcm_to_float(block):
+    """
+    Convierte un bloque PCM a float64 en [-1, 1]; los enteros se escalan como `soundfile`.
+    """
+    block = np.asarray(block).reshape(-1)
+    if np.issubdtype(block.dtype, np.integer):
+        return block.astype(np.float32) / np.float32(np.iinfo(block.dtype).max + 1)
+    return block
+
+
+class IncrementalMel:
+    """
+    Espectrograma mel de Wav2Lip calculado a medida que llega el audio.
+
+    Reproduce `audio.melspectrogram`: preénfasis, STFT centrada (relleno por
+    reflexión) de 800 muestras con salto de 200, banco de filtros mel, dB y
+    normalización simétrica a [-4, 4]. Entre bloques guarda la última muestra del
+    preénfasis y las muestras que aún comparten ventanas de la STFT, así que cada
+    columna se emite en cuanto llegan las 400 muestras que hay tras su centro.
+
+    La proyección mel se hace siempre en grupos de `MEL_TILE` columnas alineados
+    con el inicio del audio; así cada columna sale idéntica bit a bit con
+    cualquier partición en bloques, y también con `melspectrogram(wav)`.
+    """
+
+    def __init__(self):
+        self._window = get_window("hann", WIN_SIZE, fftbins=True)
+        self._basis = mel_basis().astype(np.float64)
+        self._tile = np.zeros((1 + N_FFT // 2, MEL_TILE))
+        self._last = 0.0
+        # Muestras con preénfasis desde la muestra absoluta `_offset`
+        self._y = np.zeros(0)
+        self._offset = 0
+        self.n_samples = 0
+        self.n_frames = 0
+        self.finished = False
+
+    def push(self, pcm):
+        """
+        Añade un bloque de audio mono a 16 kHz.
+
+        Args:
+            pcm (np.ndarray): Muestras float (como `audio.load_wav`) o enteras.
+
+        Returns:
+            np.ndarray: Columnas nuevas del mel `(80, k)`, posiblemente vacías.
+        """
+        if self.finished:
+            raise RuntimeError("El audio ya terminó; no se pueden añadir más bloques")
+        x = pcm_to_float(pcm).astype(np.float64)
+        if len(x) == 0:
+            return np.zeros((NUM_MELS, 0))
+        # y[n] = x[n] - 0.97 * x[n - 1], como `signal.lfilter([1, -0.97], [1], wav)`
+        y = x.copy()
+        y[0] -= PREEMPHASIS * self._last
+        y[1:] -= PREEMPHASIS * x[:-1]
+        self._last = x[-1]
+        self._y = np.concatenate((self._y, y))
+        self.n_samples += len(x)
+        # Una columna está completa cuando su ventana no necesita el relleno final
+        half = N_FFT // 2
+        ready = (self.n_samples - half - 1) // HOP_SIZE + 1 if self.n_samples > half else 0
+        return self._emit(ready, final=False)
+
+    def finish(self):
+        """
+        Cierra el audio y devuelve las últimas columnas (las que usan el relleno final).
+
+        Returns:
+            np.ndarray: Columnas restantes del mel `(80, k)`.
+        """
+        if self.finished:
+            return np.zeros((NUM_MELS, 0))
+        if self.n_samples == 0:
+            raise ValueError("No se recibió audio")
+        self.finished = True
+        return self._emit(1 + self.n_samples // HOP_SIZE, final=True)
+
+    def _emit(self, stop, final):
+        start = self.n_frames
+        if stop <= start:
+            return np.zeros((NUM_MELS, 0))
+        half = N_FFT // 2
+        # El relleno inicial solo existe mientras se conserva el principio del audio
+        pad_left = half if self._offset == 0 else 0
+        padded = np.pad(self._y, (pad_left, half if final else 0), mode="reflect")
+        first = start * HOP_SIZE - half - (self._offset - pad_left)
+        frames = sliding_window_view(padded, N_FFT)[first :: HOP_SIZE][: stop - start]
+        magnitudes = np.abs(np.fft.rfft(self._window * frames, axis=-1)).T
+
+        columns = []
+        done = 0
+        while done < stop - start:
+            pos = (start + done) % MEL_TILE
+            take = min(MEL_TILE - pos, stop - start - done)
+            self._tile[:, pos : pos + take] = magnitudes[:, done : done + take]
+            columns.append(np.dot(self._basis, self._tile)[:, pos : pos + take])
+            done += take
+        mel = self._normalize(self._amp_to_db(np.concatenate(columns, axis=1)) - REF_LEVEL_DB)
+
+        self.n_frames = stop
+        # Se descartan las muestras que ya no entran en ninguna ventana pendiente
+        cut = stop * HOP_SIZE - half - self._offset
+        if cut > 0:
+            self._y = self._y[cut:]
+            self._offset += cut
+        return mel
+
+    @staticmethod
+    def _amp_to_db(x):
+        min_level = np.exp(MIN_LEVEL_DB / 20 * np.log(10))
+        return 20 * np.log10(np.maximum(min_level, x))
+
+    @staticmethod
+    def _normalize(S):
+        return np.clip(
+            (2 * MAX_ABS_VALUE) * ((S - MIN_LEVEL_DB) / (-MIN_LEVEL_DB)) - MAX_ABS_VALUE,
+            -MAX_ABS_VALUE,
+            MAX_ABS_VALUE,
+        )
+
+
+def melspectrogram(wav):
+    """
+    Mel de un audio completo con el mismo cálculo que `IncrementalMel`.
+
+    Args:
+        wav (np.ndarray): Audio mono a 16 kHz (p. ej. de `audio.load_wav`).
+
+    Returns:
+        np.ndarray: Espectrograma float64 `(80, 1 + len(wav) // 200)`.
+    """
+    engine = IncrementalMel()
+    return np.concatenate((engine.push(wav), engine.finish()), axis=1)
+
+
+def iter_pcm_blocks(stream, block_samples=1600, dtype=np.int16):
+    """
+    Lee PCM crudo de un flujo binario (p. ej. `sys.stdin.buffer`) en bloques.
+
+    Args:
+        stream: Objeto con `read(n)`.
+        block_samples (int): Muestras por bloque (1600 = 100 ms a 16 kHz).
+        dtype: Tipo de las muestras en el flujo.
+
+    Yields:
+        np.ndarray: Bloques de muestras.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    pending = b""
+    while True:
+        data = stream.read(block_samples * itemsize)
+        if not data:
+            break
+        data = pending + data
+        usable = len(data) - len(data) % itemsize
+        pending = data[usable:]
+        if usable:
+            yield np.frombuffer(data[:usable], dtype=dtype)
+
+
+class MelStream:
+    """
+    Consume bloques PCM en un hilo y alimenta una `StreamingMelWindows` a medida que llegan.
+
+    El audio recibido se guarda además en `pcm_path` (float32 crudo, ver
+    `PCM_INPUT_ARGS`) antes de publicar su mel, de modo que cualquier fotograma ya
+    renderizado tiene su audio en disco para mezclarlo.
+
+    Args:
+        blocks: Iterable de bloques de audio mono a 16 kHz (p. ej. de un TTS).
+        fps (float): Fotogramas por segundo del video.
+        pcm_path (str): Archivo donde se guarda el audio recibido (None para no guardarlo).
+        mel_step_size (int): Columnas por fragmento de mel.
+    """
+
+    def __init__(self, blocks, fps, pcm_path=None, mel_step_size=16):
+        from mel_windows import StreamingMelWindows
+
+        self.windows = StreamingMelWindows(fps, mel_step_size)
+        self.pcm_path = pcm_path
+        self.n_samples = 0
+        self.finished = False
+        self._blocks = blocks
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def seconds(self):
+        """
+        Segundos de audio recibidos hasta ahora.
+        """
+        return self.n_samples / SAMPLE_RATE
+
+    def _run(self):
+        engine = IncrementalMel()
+        out = open(self.pcm_path, "wb") if self.pcm_path else None
+        try:
+            for block in self._blocks:
+                block = pcm_to_float(block)
+                if out is not None:
+                    out.write(block.astype("<f4").tobytes())
+                    out.flush()
+                columns = engine.push(block)
+                with self._cond:
+                    self.n_samples = engine.n_samples
+                    self._cond.notify_all()
+                self._publish(columns)
+            self._publish(engine.finish())
+            self.windows.close()
+        except BaseException as e:
+            self.windows.close(error=e)
+        finally:
+            if out is not None:
+                out.close()
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+    def _publish(self, columns):
+        if np.isnan(columns).any():
+            raise ValueError("Mel contains nan! Using a TTS voice? Add a small epsilon noise to the wav file and try again")
+        self.windows.append(columns)
+
+    def wait_for(self, seconds):
+        """
+        Espera a que se hayan recibido `seconds` segundos de audio o a que termine el flujo.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.finished or self.seconds >= seconds)
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
@@ -0,0 +1,246 @@
+# mel_windows.py
+
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Columnas de mel por segundo de audio en Wav2Lip (16 kHz con hop de 200 muestras)
+MEL_FRAMES_PER_SECOND = 80.0
+
+
+def mel_chunk_starts(n_mel_frames, fps, mel_step_size=16):
+    """
+    Columna inicial del fragmento de mel de cada fotograma.
+
+    Reproduce el bucle original de `ov_inference`: el fotograma `i` empieza en
+    `int(i * 80 / fps)` y el último fragmento se ajusta al final del mel.
+
+    Args:
+        n_mel_frames (int): Número de columnas del mel.
+        fps (float): Fotogramas por segundo del video.
+        mel_step_size (int): Columnas por fragmento.
+
+    Returns:
+        np.ndarray: Índices int64, uno por fotograma.
+    """
+    if n_mel_frames < mel_step_size:
+        raise ValueError("El audio es demasiado corto: {} columnas de mel, se necesitan {}".format(n_mel_frames, mel_step_size))
+    mel_idx_multiplier = MEL_FRAMES_PER_SECOND / fps
+    # Cota superior del número de fragmentos completos; se recorta con la misma aritmética del bucle
+    candidates = np.arange(int((n_mel_frames - mel_step_size) / mel_idx_multiplier) + 2)
+    starts = (candidates * mel_idx_multiplier).astype(np.int64)
+    starts = starts[starts + mel_step_size <= n_mel_frames]
+    return np.append(starts, n_mel_frames - mel_step_size)
+
+
+class MelWindows:
+    """
+    Fragmentos de mel de cada fotograma como vista con strides sobre el mel float32.
+
+    No copia ningún fragmento: `windows[:, w]` es la ventana de `mel_step_size`
+    columnas que empieza en la columna `w`, y cada fotograma se asigna a su
+    ventana mediante `starts`. Se comporta como la lista `mel_chunks` original:
+    `len`, iteración e índice entero devuelven fragmentos `(80, mel_step_size)`, y
+    un slice devuelve el lote `(B, 80, mel_step_size)` con una sola operación de
+    gather sobre un array float32 nuevo.
+
+    Args:
+        mel (np.ndarray): Espectrograma `(80, T)` de `audio.melspectrogram`.
+        fps (float): Fotogramas por segundo del video.
+        mel_step_size (int): Columnas por fragmento.
+        starts (np.ndarray): Columnas iniciales ya calculadas (ver `shard`); si se
+            indican, `fps` no se usa.
+    """
+
+    def __init__(self, mel, fps, mel_step_size=16, starts=None):
+        self.mel_step_size = mel_step_size
+        self.mel = np.ascontiguousarray(mel, dtype=np.float32)
+        # (80, T - step + 1, step): vista sin copia de todas las ventanas posibles
+        self.windows = sliding_window_view(self.mel, mel_step_size, axis=1)
+        if starts is None:
+            starts = mel_chunk_starts(self.mel.shape[1], fps, mel_step_size)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self._bins = np.arange(self.mel.shape[0])[None, :]
+
+    def __reduce__(self):
+        # Se serializa el mel y los inicios, no la vista (que se copiaría `mel_step_size` veces)
+        return MelWindows, (self.mel, None, self.mel_step_size, self.starts)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for start in self.starts:
+            yield self.windows[:, start]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(self.starts[index])
+        return self.windows[:, self.starts[index]]
+
+    def take(self, starts):
+        """
+        Copia las ventanas que empiezan en `starts` a un lote contiguo `(B, 80, mel_step_size)`.
+
+        Es un único indexado avanzado sobre la vista, con índices `(B, 80)`
+        difundidos, así que el resultado sale ya en orden C `(B, 80, step)` y listo
+        para el modelo (`np.take` copiaría antes la vista entera).
+
+        Args:
+            starts (np.ndarray): Columnas iniciales (p. ej. `self.starts[a:b]`).
+
+        Returns:
+            np.ndarray: El lote float32.
+        """
+        return self.windows[self._bins, np.asarray(starts, dtype=np.intp)[:, None]]
+
+    def batches(self, batch_size):
+        """
+        Genera `(inicio, lote)` con lotes de `batch_size` fragmentos (el último puede ser menor).
+        """
+        for start in range(0, len(self), batch_size):
+            yield start, self[start : start + batch_size]
+
+    def shard(self, start, stop):
+        """
+        Fragmentos `[start, stop)` como una `MelWindows` independiente.
+
+        Solo conserva las columnas del mel que usan esos fragmentos, así que es
+        barato de enviar a otro proceso; `shard(a, b)[i]` es igual que `self[a + i]`.
+        """
+        starts = self.starts[start:stop]
+        if len(starts) == 0:
+            raise ValueError("Tramo vacío: [{}, {})".format(start, stop))
+        first = int(starts[0])
+        mel = self.mel[:, first : int(starts[-1]) + self.mel_step_size]
+        return MelWindows(mel, None, self.mel_step_size, starts - first)
+
+
+class StreamingMelWindows:
+    """
+    Versión de `MelWindows` para un mel que llega por partes (ver `mel_stream.MelStream`).
+
+    Un productor añade columnas con `append` y termina con `close`; los
+    consumidores leen fragmentos con la misma interfaz que `MelWindows` y se
+    bloquean hasta que el fragmento pedido está completo. Los inicios se calculan
+    con la misma aritmética que `mel_chunk_starts`, así que con el mismo mel el
+    resultado es idéntico. `len()` solo se conoce al cerrar, por lo que espera al
+    final del audio; para consumir a medida que llega hay que iterar o usar `batches`.
+
+    Args:
+        fps (float): Fotogramas por segundo del video.
+        mel_step_size (int): Columnas por fragmento.
+        n_mels (int): Filas del mel.
+    """
+
+    def __init__(self, fps, mel_step_size=16, n_mels=80):
+        self.mel_step_size = mel_step_size
+        self._mel_idx_multiplier = MEL_FRAMES_PER_SECOND / fps
+        self._mel = np.zeros((n_mels, 1024), dtype=np.float32)
+        self._n = 0
+        self._starts = []
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._bins = np.arange(n_mels)[None, :]
+
+    @property
+    def mel(self):
+        """
+        Columnas recibidas hasta ahora, como array float32 `(80, T)`.
+        """
+        with self._cond:
+            return self._mel[:, : self._n]
+
+    def append(self, columns):
+        """
+        Añade columnas `(80, k)` al final del mel.
+        """
+        columns = np.asarray(columns)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("El mel ya está cerrado")
+            end = self._n + columns.shape[1]
+            if end > self._mel.shape[1]:
+                # Crece al doble; las vistas ya entregadas siguen apuntando al buffer anterior
+                grown = np.zeros((self._mel.shape[0], max(end, 2 * self._mel.shape[1])), dtype=np.float32)
+                grown[:, : self._n] = self._mel[:, : self._n]
+                self._mel = grown
+            self._mel[:, self._n : end] = columns
+            self._n = end
+            i = len(self._starts)
+            while True:
+                start = int(i * self._mel_idx_multiplier)
+                if start + self.mel_step_size > self._n:
+                    break
+                self._starts.append(start)
+                i += 1
+            self._cond.notify_all()
+
+    def close(self, error=None):
+        """
+        Marca el final del mel (o un error del productor, que se relanza en los consumidores).
+        """
+        with self._cond:
+            if self._closed:
+                return
+            if error is None:
+                if self._n < self.mel_step_size:
+                    error = ValueError("El audio es demasiado corto: {} columnas de mel, se necesitan {}".format(self._n, self.mel_step_size))
+                else:
+                    # Último fragmento ajustado al final del mel, como en `mel_chunk_starts`
+                    self._starts.append(self._n - self.mel_step_size)
+            self._error = error
+            self._closed = True
+            self._cond.notify_all()
+
+    def _wait(self, count):
+        # Espera a que haya `count` fragmentos (None = hasta el cierre); devuelve los disponibles
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or (count is not None and len(self._starts) >= count))
+            if self._error is not None:
+                raise self._error
+            return len(self._starts)
+
+    def __len__(self):
+        return self._wait(None)
+
+    def __iter__(self):
+        i = 0
+        while self._wait(i + 1) > i:
+            yield self[i]
+            i += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step not in (None, 1) or (index.start or 0) < 0 or (index.stop is not None and index.stop < 0):
+                raise IndexError("Solo se admiten slices crecientes sin paso")
+            self._wait(index.stop)
+            with self._cond:
+                return self.take(self._starts[index])
+        if index < 0:
+            raise IndexError("Los índices negativos necesitan el final del audio")
+        if self._wait(index + 1) <= index:
+            raise IndexError("Fragmento fuera de rango")
+        with self._cond:
+            start = self._starts[index]
+            return self._mel[:, start : start + self.mel_step_size]
+
+    def take(self, starts):
+        """
+        Copia las ventanas que empiezan en `starts` a un lote contiguo `(B, 80, mel_step_size)`.
+        """
+        with self._cond:
+            windows = sliding_window_view(self._mel[:, : self._n], self.mel_step_size, axis=1)
+            return windows[self._bins, np.asarray(starts, dtype=np.intp).reshape(-1, 1)]
+
+    def batches(self, batch_size):
+        """
+        Genera `(inicio, lote)` en cuanto hay `batch_size` fragmentos nuevos (o al cerrar).
+        """
+        start = 0
+        while self._wait(start + batch_size) > start:
+            batch = self[start : start + batch_size]
+            yield start, batch
+            start += len(batch)
@@ -0,0 +1,143 @@
+# model_cache.py
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import openvino as ov
+
+from cache_utils import atomic_write_bytes, file_lock, hash_model
+
+# Variable de entorno con el directorio de la caché; la heredan los procesos hijos (p. ej. los de --shards)
+MODEL_CACHE_ENV = "VIDEO_AVATAR_MODEL_CACHE"
+PRECISION_HINT = "INFERENCE_PRECISION_HINT"
+
+
+def blob_files(cache_dir):
+    """
+    Blobs compilados que OpenVINO ha dejado en `cache_dir`.
+    """
+    cache_dir = Path(cache_dir)
+    return {p.name for p in cache_dir.glob("*.blob")} if cache_dir.is_dir() else set()
+
+
+class ModelCache:
+    """
+    Caché en disco de modelos compilados de OpenVINO (`CACHE_DIR`).
+
+    Cada combinación (hash del IR, dispositivo, precisión) tiene su propio
+    directorio de caché, así que un `compile_model` en un proceso nuevo importa el
+    blob ya compilado en lugar de recompilar. Un índice `index.json` recuerda el
+    hash de cada modelo (por tamaño y fecha de modificación, para no rehashear los
+    pesos en cada arranque) y la versión de OpenVINO: si el IR cambia, los
+    directorios del hash anterior se borran; si cambia OpenVINO, se vacían todos.
+    Los procesos que comparten la caché se turnan con `index.lock` para leer y
+    reescribir el índice.
+
+    Args:
+        cache_dir (str): Directorio raíz de la caché.
+    """
+
+    INDEX_NAME = "index.json"
+    LOCK_NAME = "index.lock"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return self.cache_dir / self.INDEX_NAME
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, file_lock(self.cache_dir / self.LOCK_NAME):
+            yield
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("openvino", ov.__version__)
+        index.setdefault("models", {})
+        index.setdefault("dirs", {})
+        if index["openvino"] != ov.__version__:
+            # Los blobs de otra versión de OpenVINO no se pueden importar
+            for name in index["dirs"]:
+                shutil.rmtree(self.cache_dir / name, ignore_errors=True)
+            index = {"openvino": ov.__version__, "models": index["models"], "dirs": {}}
+        return index
+
+    def _save_index(self, index):
+        atomic_write_bytes(self.index_path, json.dumps(index, indent=1).encode("utf-8"))
+
+    @staticmethod
+    def _stat(model_path):
+        xml_path = Path(model_path)
+        stats = [os.stat(p) for p in (xml_path, xml_path.with_suffix(".bin")) if p.exists()]
+        return [[s.st_size, s.st_mtime_ns] for s in stats]
+
+    def _model_hash(self, index, model_path):
+        path = os.path.abspath(str(model_path))
+        stat = self._stat(path)
+        known = index["models"].get(path)
+        if known is not None and known["stat"] == stat:
+            return known["hash"]
+        model_hash = hash_model(path)
+        if known is not None and known["hash"] != model_hash:
+            # El IR ha cambiado: los blobs del hash anterior ya no sirven
+            self._drop_hash(index, known["hash"], path)
+        index["models"][path] = {"stat": stat, "hash": model_hash}
+        return model_hash
+
+    def _drop_hash(self, index, model_hash, model_path):
+        # Otro archivo con el mismo contenido sigue usando esos blobs
+        if any(m["hash"] == model_hash for p, m in index["models"].items() if p != model_path):
+            return
+        for name in [n for n, d in index["dirs"].items() if d["hash"] == model_hash]:
+            shutil.rmtree(self.cache_dir / name, ignore_errors=True)
+            del index["dirs"][name]
+
+    def dir_for(self, model_path, device="CPU", config=None):
+        """
+        Directorio de caché (`CACHE_DIR`) para compilar `model_path` en `device` con `config`.
+
+        Returns:
+            Path: Directorio, ya creado.
+        """
+        precision = str((config or {}).get(PRECISION_HINT, "default"))
+        with self._locked():
+            index = self._load_index()
+            model_hash = self._model_hash(index, model_path)
+            name = re.sub(r"[^A-Za-z0-9.]+", "_", "{}-{}-{}".format(model_hash[:16], device, precision).lower())
+            index["dirs"][name] = {
+                "hash": model_hash,
+                "model_path": os.path.abspath(str(model_path)),
+                "device": device,
+                "precision": precision,
+                "last_used": time.time(),
+            }
+            self._save_index(index)
+        path = self.cache_dir / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def stats(self):
+        """
+        Directorios de la caché con su modelo, dispositivo, precisión, blobs y bytes.
+        """
+        with self._locked():
+            index = self._load_index()
+        rows = []
+        for name, entry in index["dirs"].items():
+            files = [p for p in (self.cache_dir / name).glob("*") if p.is_file()]
+            rows.append(dict(entry, dir=name, blobs=len(blob_files(self.cache_dir / name)), bytes=sum(p.stat().st_size for p in files)))
+        return rows
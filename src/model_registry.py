@@ -0,0 +1,332 @@
+# model_registry.py
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import openvino as ov
+
+from model_cache import MODEL_CACHE_ENV, ModelCache, blob_files
+
+# Tamaño usado en la inferencia de calentamiento para dimensiones dinámicas que no sean el lote
+WARMUP_DYNAMIC_DIM = 256
+
+
+def static_batch_size(compiled_model):
+    """
+    Lote fijo de un modelo compilado con forma estática (ver `model_variants.py`).
+
+    Returns:
+        int: Tamaño de la dimensión 0, si es estática y la misma en todas las entradas; None si no.
+    """
+    sizes = set()
+    for model_input in compiled_model.inputs:
+        pshape = model_input.get_partial_shape()
+        if pshape.rank.is_dynamic or pshape[0].is_dynamic:
+            return None
+        sizes.add(pshape[0].get_length())
+    return sizes.pop() if len(sizes) == 1 else None
+
+
+def pad_batch(inputs, batch_size):
+    """
+    Completa cada entrada hasta `batch_size` repitiendo su última fila.
+
+    Los modelos de lote estático solo aceptan lotes completos; las filas añadidas se
+    descartan de la salida.
+    """
+    padded = {}
+    for name, value in inputs.items():
+        value = np.asarray(value)
+        if len(value) < batch_size:
+            value = np.concatenate([value, np.repeat(value[-1:], batch_size - len(value), axis=0)])
+        padded[name] = value
+    return padded
+
+
+class CompiledModelEntry:
+    """
+    Modelo compilado residente con un conjunto de infer requests reutilizables.
+
+    Attributes:
+        model_path (str): Ruta del modelo IR.
+        device (str): Dispositivo de OpenVINO.
+        config (dict): Propiedades de compilación.
+        state (str): "loading", "ready" o "failed".
+        compile_time (float): Segundos empleados en `compile_model`.
+        warmup_time (float): Segundos de la inferencia de calentamiento (None si no se hizo).
+        cache_dir (Path): `CACHE_DIR` de OpenVINO (None sin caché de modelos).
+        cache_state (str): "warm" si se importó un blob ya compilado, "cold" si se
+            compiló y se guardó el blob, None sin caché o si el dispositivo no la admite.
+        static_batch (int): Lote fijo del modelo (None si el lote es dinámico).
+    """
+
+    def __init__(self, model_path, device, config, cache_dir=None):
+        self.model_path = model_path
+        self.device = device
+        self.config = config
+        self.cache_dir = cache_dir
+        self.cache_state = None
+        self.state = "loading"
+        self.error = None
+        self.compile_time = None
+        self.warmup_time = None
+        self.compiled_model = None
+        self.static_batch = None
+        self._requests = queue.LifoQueue()
+        self._n_requests = 0
+        self._pool_size = 1
+        self._pool_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def _compile(self, core):
+        config = dict(self.config)
+        if self.cache_dir is not None:
+            config["CACHE_DIR"] = str(self.cache_dir)
+            blobs_before = blob_files(self.cache_dir)
+        start = time.perf_counter()
+        try:
+            self.compiled_model = core.compile_model(self.model_path, self.device, config)
+        except Exception as e:
+            self.compile_time = time.perf_counter() - start
+            self.state, self.error = "failed", str(e)
+            self._ready.set()
+            raise
+        self.compile_time = time.perf_counter() - start
+        if self.cache_dir is not None:
+            # Un blob nuevo significa que se compiló desde el IR; si no, se importó uno existente
+            if blob_files(self.cache_dir) - blobs_before:
+                self.cache_state = "cold"
+            elif blobs_before:
+                self.cache_state = "warm"
+        self.static_batch = static_batch_size(self.compiled_model)
+        try:
+            self._pool_size = max(1, self.compiled_model.get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS"))
+        except Exception:
+            self._pool_size = 1
+        self.state = "ready"
+        # Solo ahora: quien espera en `wait` usa `static_batch` y el resto de campos
+        self._ready.set()
+
+    def wait(self):
+        self._ready.wait()
+        if self.state == "failed":
+            raise RuntimeError(f"No se pudo compilar {self.model_path}: {self.error}")
+        return self
+
+    @contextmanager
+    def request(self):
+        """
+        Presta un infer request del conjunto; se crea uno nuevo si todos están ocupados.
+        """
+        try:
+            infer_request = self._requests.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                self._n_requests += 1
+            infer_request = self.compiled_model.create_infer_request()
+        try:
+            yield infer_request
+        finally:
+            if self._requests.qsize() < self._pool_size:
+                self._requests.put(infer_request)
+
+    def infer(self, inputs):
+        """
+        Ejecuta una inferencia síncrona con un infer request del conjunto.
+
+        Con un lote estático, la entrada se parte en lotes de `static_batch`, el último
+        se completa con `pad_batch` y las salidas se recortan al tamaño original.
+
+        Returns:
+            OVDict: Salidas del modelo (copias, seguras tras devolver el request).
+        """
+        if self.static_batch is None:
+            with self.request() as infer_request:
+                return infer_request.infer(inputs)
+
+        if not isinstance(inputs, dict):
+            # Entradas por posición, como las acepta `infer_request.infer`
+            inputs = dict(enumerate(inputs)) if isinstance(inputs, (list, tuple)) else {0: inputs}
+        total = len(next(iter(inputs.values())))
+        parts = []
+        for start in range(0, total, self.static_batch):
+            chunk = {name: value[start : start + self.static_batch] for name, value in inputs.items()}
+            size = len(next(iter(chunk.values())))
+            with self.request() as infer_request:
+                parts.append((infer_request.infer(pad_batch(chunk, self.static_batch)), size))
+        first = parts[0][0]
+        return type(first)({port: np.concatenate([result[port][:size] for result, size in parts]) for port in first.keys()})
+
+    def __call__(self, inputs):
+        return self.infer(inputs)
+
+    def warmup(self, shapes=None):
+        """
+        Ejecuta una inferencia con ceros para que la primera petición real no pague la inicialización.
+
+        Args:
+            shapes (dict): Nombre de entrada -> forma. Las entradas no indicadas usan
+                su forma estática, con lote 1 y `WARMUP_DYNAMIC_DIM` en el resto de
+                dimensiones dinámicas.
+        """
+        shapes = shapes or {}
+        inputs = {}
+        for model_input in self.compiled_model.inputs:
+            name = model_input.get_any_name()
+            shape = shapes.get(name)
+            if shape is None:
+                pshape = model_input.get_partial_shape()
+                shape = [d.get_length() if d.is_static else (1 if i == 0 else WARMUP_DYNAMIC_DIM) for i, d in enumerate(pshape)]
+            inputs[name] = np.zeros(shape, dtype=model_input.get_element_type().to_dtype())
+        start = time.perf_counter()
+        self.infer(inputs)
+        self.warmup_time = time.perf_counter() - start
+
+    def info(self):
+        return {
+            "model_path": self.model_path,
+            "device": self.device,
+            "config": self.config,
+            "state": self.state,
+            "compile_time": self.compile_time,
+            "cache": self.cache_state,
+            "static_batch": self.static_batch,
+            "warmup_time": self.warmup_time,
+            "infer_requests": self._n_requests,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compilados a nivel de proceso.
+
+    Cada combinación (ruta del modelo, dispositivo, configuración) se compila una
+    sola vez con un único `ov.Core`, y el resultado se comparte entre
+    `face_detect_ov`, `ov_inference` y cualquier otro llamador. Con `model_cache`,
+    los blobs compilados se guardan en disco y otros procesos los importan en
+    lugar de recompilar (ver `model_cache.ModelCache`).
+    """
+
+    def __init__(self, core=None, model_cache=None):
+        self.core = core or ov.Core()
+        self.model_cache = model_cache
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_path, device, config):
+        return (os.path.abspath(str(model_path)), device, tuple(sorted((k, str(v)) for k, v in config.items())))
+
+    def get(self, model_path, device="CPU", config=None, warmup_shapes=None):
+        """
+        Devuelve el modelo compilado, compilándolo (y calentándolo) solo la primera vez.
+
+        Args:
+            model_path (str): Ruta del modelo IR `.xml`.
+            device (str): Dispositivo de OpenVINO.
+            config (dict): Propiedades de compilación.
+            warmup_shapes (dict): Formas para la inferencia de calentamiento (o una
+                función que las calcula a partir de la entrada compilada); si es
+                None no se calienta.
+
+        Returns:
+            CompiledModelEntry: Entrada lista para inferir.
+        """
+        config = dict(config or {})
+        key = self._key(model_path, device, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None or entry.state == "failed"
+            if owner:
+                entry = CompiledModelEntry(str(model_path), device, config)
+                self._entries[key] = entry
+        if not owner:
+            return entry.wait()
+
+        if self.model_cache is not None:
+            # Fuera del lock: la primera vez hay que hashear los pesos del modelo
+            try:
+                entry.cache_dir = self.model_cache.dir_for(model_path, device, config)
+            except OSError as e:
+                print("Caché de modelos no disponible para {}: {}".format(model_path, e))
+
+        entry._compile(self.core)
+        if warmup_shapes is not None:
+            entry.warmup(warmup_shapes(entry) if callable(warmup_shapes) else warmup_shapes)
+        return entry
+
+    def preload(self, model_path, device="CPU", config=None, warmup_shapes=None):
+        """
+        Compila y calienta un modelo en un hilo de fondo.
+
+        Returns:
+            threading.Thread: Hilo de carga ya iniciado.
+        """
+        thread = threading.Thread(target=self.get, args=(model_path, device, config, warmup_shapes or {}), daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """
+        Estado de carga y tiempos de compilación de todos los modelos registrados.
+        """
+        with self._lock:
+            return [entry.info() for entry in self._entries.values()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Devuelve el registro de modelos del proceso, creándolo la primera vez.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            cache_dir = os.environ.get(MODEL_CACHE_ENV)
+            _registry = ModelRegistry(model_cache=ModelCache(cache_dir) if cache_dir else None)
+        return _registry
+
+
+def set_model_cache(cache_dir):
+    """
+    Activa (o, con None o cadena vacía, desactiva) la caché en disco de modelos compilados.
+
+    Se aplica a los modelos que se compilen a partir de ahora en este proceso y,
+    a través de `VIDEO_AVATAR_MODEL_CACHE`, a los procesos hijos.
+    """
+    if cache_dir:
+        os.environ[MODEL_CACHE_ENV] = str(cache_dir)
+    else:
+        os.environ.pop(MODEL_CACHE_ENV, None)
+    get_registry().model_cache = ModelCache(cache_dir) if cache_dir else None
+
+
+def wav2lip_warmup_shapes(entry, img_size=96, mel_step_size=16):
+    """
+    Formas de calentamiento de Wav2Lip, tanto para el IR original como para el fusionado (u8 NHWC).
+    """
+    if entry.compiled_model.input("face_sequences").get_element_type() == ov.Type.u8:
+        return {"audio_sequences": (1, 80, mel_step_size), "face_sequences": (1, img_size, img_size, 3)}
+    return {"audio_sequences": (1, 1, 80, mel_step_size), "face_sequences": (1, 6, img_size, img_size)}
+
+
+def preload_models(face_detection_path, wav2lip_path, device="CPU", img_size=96, mel_step_size=16):
+    """
+    Compila y calienta en segundo plano el detector de caras y Wav2Lip.
+
+    Returns:
+        list: Hilos de carga; se puede hacer `join` para esperar a que terminen.
+    """
+    registry = get_registry()
+    return [
+        registry.preload(face_detection_path, device, warmup_shapes={}),
+        registry.preload(wav2lip_path, device, warmup_shapes=lambda entry: wav2lip_warmup_shapes(entry, img_size, mel_step_size)),
+    ]
@@ -0,0 +1,211 @@
+# model_variants.py
+#
+# Variantes de forma estática y precisión de los IR (ver `export_static_variants` en
+# `ov_wav2lip_helper.py`) y sus medidas de rendimiento. Las variantes y sus tiempos
+# se guardan en `models/variants/variants.json`, junto a los modelos, y
+# `ov_inference.select_model_variant` elige con ellos la más rápida para cada trabajo.
+# Las medidas dependen de la máquina: hay que repetirlas en la de despliegue.
+#
+# Uso:
+#   python src/model_variants.py --models_dir ../miwav2lipv6/models --device CPU --repeat 5
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+
+from cache_utils import atomic_write_bytes
+
+VARIANTS_DIR = "variants"
+CATALOG_NAME = "variants.json"
+# fp16: pesos comprimidos a FP16 (`compress_to_fp16`); la CPU sigue calculando en FP32
+PRECISIONS = ("fp32", "fp16")
+
+
+def variant_name(base_name, batch, hw=None, precision="fp32"):
+    """
+    Ruta, relativa al directorio de modelos, de una variante de `base_name`.
+    """
+    stem = Path(base_name).stem
+    shape = "" if hw is None else "_{}x{}".format(*hw)
+    return "{}/{}{}_b{}_{}.xml".format(VARIANTS_DIR, stem, shape, batch, precision)
+
+
+def detection_hw(frame_h, frame_w, long_edge=None):
+    """
+    Alto y ancho con los que llegan al detector los fotogramas de `frame_h` x `frame_w`
+    (mismo redondeo que `ov_inference.downscale_for_detection`).
+    """
+    if not long_edge or max(frame_h, frame_w) <= long_edge:
+        return frame_h, frame_w
+    ratio = long_edge / max(frame_h, frame_w)
+    return max(1, round(frame_h * ratio)), max(1, round(frame_w * ratio))
+
+
+def static_shapes(model, batch, hw=None):
+    """
+    Formas estáticas de las entradas de `model` con lote `batch`.
+
+    Las dimensiones dinámicas que no son el lote se rellenan, en orden, con `hw`
+    (alto y ancho del detector, tanto en NCHW como en NHWC).
+
+    Raises:
+        ValueError: Si queda alguna dimensión dinámica sin valor.
+    """
+    shapes = {}
+    for model_input in model.inputs:
+        spatial = list(hw or ())
+        shape = [batch]
+        for d in list(model_input.get_partial_shape())[1:]:
+            if d.is_static:
+                shape.append(d.get_length())
+            elif spatial:
+                shape.append(spatial.pop(0))
+            else:
+                raise ValueError("La entrada {} de {} tiene dimensiones dinámicas sin valor".format(model_input.get_any_name(), model.friendly_name))
+        shapes[model_input.get_any_name()] = shape
+    return shapes
+
+
+class VariantCatalog:
+    """
+    Catálogo de variantes de un directorio de modelos (`variants/variants.json`).
+
+    `variants` asocia cada variante (ruta relativa al directorio de modelos) con su
+    modelo base, lote, resolución (`hw`, solo el detector) y precisión.
+    `benchmarks` guarda, por dispositivo, los segundos por lote de cada variante y
+    del modelo base dinámico con las mismas formas.
+
+    Args:
+        models_dir (str): Directorio de los IR base.
+    """
+
+    def __init__(self, models_dir):
+        self.models_dir = Path(models_dir)
+        self.path = self.models_dir / VARIANTS_DIR / CATALOG_NAME
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            catalog = {}
+        catalog.setdefault("variants", {})
+        catalog.setdefault("benchmarks", {})
+        return catalog
+
+    def _save(self, catalog):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(catalog, indent=1, sort_keys=True).encode("utf-8"))
+
+    def add_variant(self, name, base, batch, hw=None, precision="fp32"):
+        with self._lock:
+            catalog = self._load()
+            catalog["variants"][name] = {"base": base, "batch": batch, "hw": None if hw is None else list(hw), "precision": precision}
+            self._save(catalog)
+
+    def variants(self, base=None):
+        """
+        Variantes del catálogo cuyo IR existe (todas, o solo las de `base`).
+        """
+        with self._lock:
+            variants = self._load()["variants"]
+        return {
+            name: info
+            for name, info in variants.items()
+            if (base is None or info["base"] == base) and (self.models_dir / name).exists()
+        }
+
+    def set_benchmarks(self, device, rows):
+        with self._lock:
+            catalog = self._load()
+            catalog["benchmarks"][device] = rows
+            self._save(catalog)
+
+    def benchmarks(self, device, base=None):
+        """
+        Medidas de `device` (todas, o solo las de `base`) cuyo IR sigue existiendo.
+        """
+        with self._lock:
+            rows = self._load()["benchmarks"].get(device, [])
+        return [r for r in rows if (base is None or r["base"] == base) and (self.models_dir / r["model"]).exists()]
+
+
+def measure(core, model_path, device, shapes, repeat=5):
+    """
+    Mediana de segundos por inferencia de `model_path` con entradas aleatorias de `shapes`.
+    """
+    compiled_model = core.compile_model(str(model_path), device)
+    rng = np.random.default_rng(0)
+    inputs = {}
+    for model_input in compiled_model.inputs:
+        name = model_input.get_any_name()
+        dtype = model_input.get_element_type().to_dtype()
+        if np.issubdtype(dtype, np.integer):
+            inputs[name] = rng.integers(0, 256, size=shapes[name]).astype(dtype)
+        else:
+            inputs[name] = rng.random(shapes[name], dtype=np.float32).astype(dtype)
+    request = compiled_model.create_infer_request()
+    # La primera inferencia paga la inicialización y no cuenta
+    request.infer(inputs)
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        request.infer(inputs)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def benchmark_variants(models_dir, device="CPU", repeat=5):
+    """
+    Mide todas las variantes del catálogo y, con las mismas formas, su modelo base dinámico.
+
+    El resultado se guarda en el catálogo para `ov_inference.select_model_variant`.
+
+    Returns:
+        list: Una fila por medida (`model`, `base`, `batch`, `hw`, `precision`, `static`, `seconds_per_batch`).
+    """
+    catalog = VariantCatalog(models_dir)
+    core = ov.Core()
+    rows, measured_bases = [], set()
+    for name, info in sorted(catalog.variants().items()):
+        base_path = catalog.models_dir / info["base"]
+        shapes = static_shapes(core.read_model(str(catalog.models_dir / name)), info["batch"])
+        rows.append(dict(info, model=name, static=True, seconds_per_batch=measure(core, catalog.models_dir / name, device, shapes, repeat)))
+        key = (info["base"], info["batch"], tuple(info["hw"] or ()))
+        if base_path.exists() and key not in measured_bases:
+            measured_bases.add(key)
+            base_shapes = static_shapes(core.read_model(str(base_path)), info["batch"], info["hw"])
+            seconds = measure(core, base_path, device, base_shapes, repeat)
+            rows.append(dict(info, model=info["base"], precision="base", static=False, seconds_per_batch=seconds))
+    catalog.set_benchmarks(device, rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide las variantes de los modelos y guarda los tiempos en variants/variants.json.")
+    parser.add_argument("--models_dir", default=os.path.abspath("../miwav2lipv6/models"))
+    parser.add_argument("--device", default="CPU")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = benchmark_variants(args.models_dir, args.device, args.repeat)
+    if not rows:
+        print("No hay variantes que medir; expórtalas primero con convert_models.py.")
+        return
+    print("\n| modelo | lote | resolución | precisión | s/lote | ms/fotograma |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        hw = "-" if r["hw"] is None else "{}x{}".format(*r["hw"])
+        print("| {} | {} | {} | {} | {:.3f} | {:.2f} |".format(r["model"], r["batch"], hw, r["precision"], r["seconds_per_batch"], 1000 * r["seconds_per_batch"] / r["batch"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,36 @@
 from glob import glob
 from enum import Enum
+import itertools
 import math
+import os
+import queue
 import subprocess
+import threading
+import time
+import warnings
 
 import cv2
 import numpy as np
+from scipy.io import wavfile
 from tqdm import tqdm
-import torch
-import torch.nn.functional as F
 
-from Wav2Lip import audio
 import openvino as ov
 
+from model_registry import get_registry
+from model_variants import VariantCatalog, detection_hw
+from avatar_pack import AvatarPack
+from frame_source import VideoFrameSource, prefetch
+from video_encoder import DEFAULT_PRESET, FFmpegPipeWriter, mux_audio
+from segment_writer import SegmentedWriter
+from sharded_render import print_shard_report, render_sharded
+from voice_activity import gate_batches, speech_weights
+from mel_windows import MelWindows, mel_chunk_starts
+from mel_stream import HOP_SIZE, PCM_INPUT_ARGS, MelStream, melspectrogram
+from lipsync_pipeline import LipSyncPipeline, print_report
+from face_tracking import frames_to_redetect, interpolate_track, select_keyframes
+from sfd_postprocess import batch_nms, postprocess_batch
+from profiling import profile_iter, profile_job, span
+
 
 device = "cpu"
 
@@ -57,13 +76,13 @@ def encode(matched, priors, variances):
     """Encode the variances from the priorbox layers into the ground truth boxes
     we have matched (based on jaccard overlap) with the prior boxes.
     Args:
-        matched: (tensor) Coords of ground truth for each prior in point-form
+        matched: (ndarray) Coords of ground truth for each prior in point-form
             Shape: [num_priors, 4].
-        priors: (tensor) Prior boxes in center-offset form
+        priors: (ndarray) Prior boxes in center-offset form
             Shape: [num_priors,4].
         variances: (list[float]) Variances of priorboxes
     Return:
-        encoded boxes (tensor), Shape: [num_priors, 4]
+        encoded boxes (ndarray), Shape: [num_priors, 4]
     """
 
     # dist b/t match center and prior's center
@@ -72,25 +91,25 @@ def encode(matched, priors, variances):
     g_cxcy /= variances[0] * priors[:, 2:]
     # match wh / prior wh
     g_wh = (matched[:, 2:] - matched[:, :2]) / priors[:, 2:]
-    g_wh = torch.log(g_wh) / variances[1]
+    g_wh = np.log(g_wh) / variances[1]
     # return target for smooth_l1_loss
-    return torch.cat([g_cxcy, g_wh], 1)  # [num_priors,4]
+    return np.concatenate([g_cxcy, g_wh], 1)  # [num_priors,4]
 
 
 def decode(loc, priors, variances):
     """Decode locations from predictions using priors to undo
     the encoding we did for offset regression at train time.
     Args:
-        loc (tensor): location predictions for loc layers,
+        loc (ndarray): location predictions for loc layers,
             Shape: [num_priors,4]
-        priors (tensor): Prior boxes in center-offset form.
+        priors (ndarray): Prior boxes in center-offset form.
             Shape: [num_priors,4].
         variances: (list[float]) Variances of priorboxes
     Return:
         decoded bounding box predictions
     """
 
-    boxes = torch.cat((priors[:, :2] + loc[:, :2] * variances[0] * priors[:, 2:], priors[:, 2:] * torch.exp(loc[:, 2:] * variances[1])), 1)
+    boxes = np.concatenate((priors[:, :2] + loc[:, :2] * variances[0] * priors[:, 2:], priors[:, 2:] * np.exp(loc[:, 2:] * variances[1])), 1)
     boxes[:, :2] -= boxes[:, 2:] / 2
     boxes[:, 2:] += boxes[:, :2]
     return boxes
@@ -100,16 +119,16 @@ def batch_decode(loc, priors, variances):
     """Decode locations from predictions using priors to undo
     the encoding we did for offset regression at train time.
     Args:
-        loc (tensor): location predictions for loc layers,
+        loc (ndarray): location predictions for loc layers,
             Shape: [num_priors,4]
-        priors (tensor): Prior boxes in center-offset form.
+        priors (ndarray): Prior boxes in center-offset form.
             Shape: [num_priors,4].
         variances: (list[float]) Variances of priorboxes
     Return:
         decoded bounding box predictions
     """
 
-    boxes = torch.cat((priors[:, :, :2] + loc[:, :, :2] * variances[0] * priors[:, :, 2:], priors[:, :, 2:] * torch.exp(loc[:, :, 2:] * variances[1])), 2)
+    boxes = np.concatenate((priors[:, :, :2] + loc[:, :, :2] * variances[0] * priors[:, :, 2:], priors[:, :, 2:] * np.exp(loc[:, :, 2:] * variances[1])), 2)
     boxes[:, :, :2] -= boxes[:, :, 2:] / 2
     boxes[:, :, 2:] += boxes[:, :, :2]
     return boxes
@@ -130,75 +149,32 @@ def detect(net, img, device):
     img = img.transpose(2, 0, 1)
     img = img.reshape((1,) + img.shape)
 
-    img = torch.from_numpy(img).float().to(device)
-    BB, CC, HH, WW = img.size()
+    # The IR runs on OpenVINO; ``device`` is kept for the original Wav2Lip signature
+    img = np.ascontiguousarray(img, dtype=np.float32)
 
     results = net({"x": img})
-    olist = [torch.Tensor(results[i]) for i in range(12)]
-
-    bboxlist = []
-    for i in range(len(olist) // 2):
-        olist[i * 2] = F.softmax(olist[i * 2], dim=1)
-    olist = [oelem.data.cpu() for oelem in olist]
-    for i in range(len(olist) // 2):
-        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
-        FB, FC, FH, FW = ocls.size()  # feature map size
-        stride = 2 ** (i + 2)  # 4,8,16,32,64,128
-        anchor = stride * 4
-        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
-        for Iindex, hindex, windex in poss:
-            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
-            score = ocls[0, 1, hindex, windex]
-            loc = oreg[0, :, hindex, windex].contiguous().view(1, 4)
-            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]])
-            variances = [0.1, 0.2]
-            box = decode(loc, priors, variances)
-            x1, y1, x2, y2 = box[0] * 1.0
-            # cv2.rectangle(imgshow,(int(x1),int(y1)),(int(x2),int(y2)),(0,0,255),1)
-            bboxlist.append([x1, y1, x2, y2, score])
-    bboxlist = np.array(bboxlist)
-    if 0 == len(bboxlist):
-        bboxlist = np.zeros((1, 5))
-
-    return bboxlist
+    return postprocess_batch([results[i] for i in range(12)])[:, 0, :]
 
 
 def batch_detect(net, imgs, device):
-    imgs = imgs - np.array([104, 117, 123])
-    imgs = imgs.transpose(0, 3, 1, 2)
-
-    imgs = torch.from_numpy(imgs).float().to(device)
-    BB, CC, HH, WW = imgs.size()
-
-    results = net({"x": imgs.numpy()})
-    olist = [torch.Tensor(results[i]) for i in range(12)]
-
-    bboxlist = []
-    for i in range(len(olist) // 2):
-        olist[i * 2] = F.softmax(olist[i * 2], dim=1)
-        # olist[i * 2] = (olist[i * 2], dim=1)
-    olist = [oelem.data.cpu() for oelem in olist]
-    for i in range(len(olist) // 2):
-        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
-        FB, FC, FH, FW = ocls.size()  # feature map size
-        stride = 2 ** (i + 2)  # 4,8,16,32,64,128
-        anchor = stride * 4
-        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
-        for Iindex, hindex, windex in poss:
-            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
-            score = ocls[:, 1, hindex, windex]
-            loc = oreg[:, :, hindex, windex].contiguous().view(BB, 1, 4)
-            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]]).view(1, 1, 4)
-            variances = [0.1, 0.2]
-            box = batch_decode(loc, priors, variances)
-            box = box[:, 0] * 1.0
-            # cv2.rectangle(imgshow,(int(x1),int(y1)),(int(x2),int(y2)),(0,0,255),1)
-            bboxlist.append(torch.cat([box, score.unsqueeze(1)], 1).cpu().numpy())
-    bboxlist = np.array(bboxlist)
-    if 0 == len(bboxlist):
-        bboxlist = np.zeros((1, BB, 5))
+    with span("face_detection.pre", len(imgs)):
+        imgs = imgs - np.array([104, 117, 123])
+        imgs = np.ascontiguousarray(imgs.transpose(0, 3, 1, 2), dtype=np.float32)
 
-    return bboxlist
+    with span("face_detection.infer", len(imgs)):
+        results = net({"x": imgs})
+    with span("face_detection.post", len(imgs)):
+        return postprocess_batch([results[i] for i in range(12)])
+
+
+def batch_detect_u8(net, imgs):
+    # The u8 IR does BGR->RGB, mean subtraction and NHWC->NCHW inside the graph
+    with span("face_detection.pre", len(imgs)):
+        imgs = np.ascontiguousarray(imgs, dtype=np.uint8)
+    with span("face_detection.infer", len(imgs)):
+        results = net({"x": imgs})
+    with span("face_detection.post", len(imgs)):
+        return postprocess_batch([results[i] for i in range(12)])
 
 
 def flip_detect(net, img, device):
@@ -240,7 +216,7 @@ class OVFaceDetector(object):
         image. The input can be either the image itself or the path to it.
 
         Arguments:
-            tensor_or_path {numpy.ndarray, torch.tensor or string} -- the path
+            tensor_or_path {numpy.ndarray, torch.Tensor or string} -- the path
             to an image or the image itself.
 
         Example::
@@ -318,18 +294,18 @@ class OVFaceDetector(object):
 
     @staticmethod
     def tensor_or_path_to_ndarray(tensor_or_path, rgb=True):
-        """Convert path (represented as a string) or torch.tensor to a numpy.ndarray
+        """Convert path (represented as a string) or torch.Tensor to a numpy.ndarray
 
         Arguments:
-            tensor_or_path {numpy.ndarray, torch.tensor or string} -- path to the image, or the image itself
+            tensor_or_path {numpy.ndarray, torch.Tensor or string} -- path to the image, or the image itself
         """
         if isinstance(tensor_or_path, str):
             return cv2.imread(tensor_or_path) if not rgb else cv2.imread(tensor_or_path)[..., ::-1]
-        elif torch.is_tensor(tensor_or_path):
-            # Call cpu in case its coming from cuda
-            return tensor_or_path.cpu().numpy()[..., ::-1].copy() if not rgb else tensor_or_path.cpu().numpy()
         elif isinstance(tensor_or_path, np.ndarray):
             return tensor_or_path[..., ::-1].copy() if not rgb else tensor_or_path
+        elif type(tensor_or_path).__module__.startswith("torch"):
+            # Tensors are duck-typed so that inference never imports torch; cpu() in case it comes from cuda
+            return tensor_or_path.cpu().numpy()[..., ::-1].copy() if not rgb else tensor_or_path.cpu().numpy()
         else:
             raise TypeError
 
@@ -338,26 +314,31 @@ class OVSFDDetector(OVFaceDetector):
     def __init__(self, device, path_to_detector="models/face_detection.xml", verbose=False):
         super(OVSFDDetector, self).__init__(device, verbose)
 
-        core = ov.Core()
-        self.face_detector = core.compile_model(path_to_detector, self.device)
+        self.face_detector = get_registry().get(path_to_detector, self.device)
+        self.embedded_preprocessing = self.face_detector.compiled_model.input(0).get_element_type() == ov.Type.u8
 
     def detect_from_image(self, tensor_or_path):
         image = self.tensor_or_path_to_ndarray(tensor_or_path)
 
-        bboxlist = detect(self.face_detector, image, device="cpu")
-        keep = nms(bboxlist, 0.3)
-        bboxlist = bboxlist[keep, :]
-        bboxlist = [x for x in bboxlist if x[-1] > 0.5]
+        if self.embedded_preprocessing:
+            bboxlist = batch_detect_u8(self.face_detector, image[None, ..., ::-1])[:, 0, :]
+        else:
+            bboxlist = detect(self.face_detector, image, device="cpu")
+        dets, counts = batch_nms(bboxlist[:, None, :], 0.3)
 
-        return bboxlist
+        return list(dets[0, : counts[0]])
 
     def detect_from_batch(self, images):
-        bboxlists = batch_detect(self.face_detector, images, device="cpu")
-        keeps = [nms(bboxlists[:, i, :], 0.3) for i in range(bboxlists.shape[1])]
-        bboxlists = [bboxlists[keep, i, :] for i, keep in enumerate(keeps)]
-        bboxlists = [[x for x in bboxlist if x[-1] > 0.5] for bboxlist in bboxlists]
+        """Returns ``(dets, counts)``: padded ``(N, K, 5)`` detections and valid boxes per frame.
 
-        return bboxlists
+        ``images`` are BGR when the detector embeds its preprocessing, RGB otherwise.
+        """
+        if self.embedded_preprocessing:
+            bboxlists = batch_detect_u8(self.face_detector, images)
+        else:
+            bboxlists = batch_detect(self.face_detector, images, device="cpu")
+        with span("face_detection.nms", 0):
+            return batch_nms(bboxlists, 0.3)
 
     @property
     def reference_scale(self):
@@ -403,41 +384,98 @@ class NetworkSize(Enum):
 
 class OVFaceAlignment:
     def __init__(
-        self, landmarks_type, network_size=NetworkSize.LARGE, device="CPU", flip_input=False, verbose=False, path_to_detector="models/face_detection.xml"
+        self,
+        landmarks_type,
+        network_size=NetworkSize.LARGE,
+        device="CPU",
+        flip_input=False,
+        verbose=False,
+        path_to_detector="models/face_detection.xml",
+        det_long_edge=None,
     ):
         self.device = device
         self.flip_input = flip_input
         self.landmarks_type = landmarks_type
         self.verbose = verbose
+        self.det_long_edge = det_long_edge
 
         network_size = int(network_size)
 
         self.face_detector = OVSFDDetector(device=device, path_to_detector=path_to_detector, verbose=verbose)
 
     def get_detections_for_batch(self, images):
-        images = images[..., ::-1]
-        detected_faces = self.face_detector.detect_from_batch(images.copy())
-        results = []
+        with span("face_detection.pre", 0):
+            images, scale = downscale_for_detection(images, self.det_long_edge)
+            if not self.face_detector.embedded_preprocessing:
+                images = images[..., ::-1].copy()
+        dets, counts = self.face_detector.detect_from_batch(images)
+        boxes = np.clip(dets[:, 0, :4] * scale, 0, None).astype(int)
 
-        for i, d in enumerate(detected_faces):
-            if len(d) == 0:
-                results.append(None)
-                continue
-            d = d[0]
-            d = np.clip(d, 0, None)
+        return [tuple(map(int, b)) if n > 0 else None for b, n in zip(boxes, counts)]
 
-            x1, y1, x2, y2 = map(int, d[:-1])
-            results.append((x1, y1, x2, y2))
 
-        return results
+def downscale_for_detection(images, long_edge):
+    """Resize a ``(B, H, W, C)`` batch so its long edge is ``long_edge``.
 
+    Returns the detector input and the ``(sx, sy, sx, sy)`` factors that map its boxes back to full resolution.
+    """
+    h, w = images.shape[1:3]
+    dh, dw = detection_hw(h, w, long_edge)
+    if (dh, dw) == (h, w):
+        return images, np.ones(4, dtype=np.float32)
 
-def face_detect_ov(images, device, face_det_batch_size, pads, nosmooth, path_to_detector):
-    detector = OVFaceAlignment(LandmarksType._2D, flip_input=False, device=device, path_to_detector=path_to_detector)
+    small = np.stack([cv2.resize(img, (dw, dh), interpolation=cv2.INTER_AREA) for img in images])
+    return small, np.array([w / dw, h / dh, w / dw, h / dh], dtype=np.float32)
 
-    batch_size = face_det_batch_size
 
-    print("face_detect_ov images[0].shape: ", images[0].shape)
+def select_model_variant(model_path, device="CPU", frames=None, input_hw=None):
+    """Pick the fastest measured variant of ``model_path`` for a job of ``frames`` frames.
+
+    Uses the timings that ``model_variants.py`` stores next to the models. A static batch of
+    ``B`` costs the same whether it is full or padded, so short jobs favour small batches and
+    long or streamed (``frames=None``) jobs the best per-frame throughput. Detector variants
+    only fit inputs of exactly ``input_hw``.
+
+    Returns ``(path, batch_size)``, or ``(model_path, None)`` when nothing was measured.
+    """
+    catalog = VariantCatalog(os.path.dirname(os.path.abspath(model_path)))
+    rows = [
+        r
+        for r in catalog.benchmarks(device, os.path.basename(model_path))
+        if r["hw"] is None or (input_hw is not None and tuple(r["hw"]) == tuple(input_hw))
+    ]
+    if not rows:
+        return model_path, None
+
+    def cost(r):
+        if frames is None:
+            return r["seconds_per_batch"] / r["batch"]
+        return math.ceil(frames / r["batch"]) * r["seconds_per_batch"]
+
+    best = min(rows, key=cost)
+    return os.path.join(str(catalog.models_dir), best["model"]), best["batch"]
+
+
+def wav_chunk_count(wav_path, fps, mel_step_size=16):
+    """Number of mel chunks of ``wav_path``, read from the WAV header without decoding the audio.
+
+    ``audio.load_wav`` resamples to ``ceil(n * 16000 / rate)`` samples and ``melspectrogram``
+    gives one column per hop, so the variants (and the render-cache key) are known before the
+    mel spectrogram is computed.
+    """
+    with warnings.catch_warnings():
+        # Non-audio chunks of the WAV
+        warnings.simplefilter("ignore", wavfile.WavFileWarning)
+        try:
+            rate, samples = wavfile.read(wav_path, mmap=True)
+        except ValueError:
+            # Formats that cannot be memory-mapped (e.g. 24-bit PCM)
+            rate, samples = wavfile.read(wav_path)
+    n_samples = math.ceil(len(samples) * 16000 / rate)
+    return len(mel_chunk_starts(1 + n_samples // HOP_SIZE, fps, mel_step_size))
+
+
+def detect_faces_batched(detector, images, batch_size):
     while 1:
         predictions = []
         try:
@@ -451,22 +489,55 @@ def face_detect_ov(images, device, face_det_batch_size, pads, nosmooth, path_to_
             continue
         break
 
-    results = []
-    pady1, pady2, padx1, padx2 = pads
-    for rect, image in zip(predictions, images):
+    return predictions, batch_size
+
+
+def detect_face_rects(detector, images, batch_size, keyframe_interval=1, redetect_threshold=0.1):
+    """Run S3FD on the keyframes (and drifted frames) of ``images`` and interpolate the rest.
+
+    Returns one ``(x1, y1, x2, y2)`` rect per image and the batch size that fit in memory.
+    """
+    # S3FD only runs on keyframes and on frames whose face region drifted since the last detection
+    detections = {}
+    pending = select_keyframes(len(images), keyframe_interval)
+    while pending:
+        predictions, batch_size = detect_faces_batched(detector, [images[i] for i in pending], batch_size)
+        detections.update(zip(pending, predictions))
+        pending = frames_to_redetect(images, detections, redetect_threshold) if keyframe_interval > 1 else []
+
+    for i, rect in detections.items():
         if rect is None:
             # check this frame where the face was not detected.
-            cv2.imwrite("temp/faulty_frame.jpg", image)
+            cv2.imwrite("temp/faulty_frame.jpg", images[i])
             raise ValueError("Face not detected! Ensure the video contains a face in all the frames.")
 
+    print("Face detection ran on {}/{} frames ({} detector calls saved)".format(len(detections), len(images), len(images) - len(detections)))
+    return interpolate_track(detections, len(images)), batch_size
+
+
+def pad_rects(rects, image_shape, pads):
+    results = []
+    pady1, pady2, padx1, padx2 = pads
+    for rect in rects:
         y1 = max(0, rect[1] - pady1)
-        y2 = min(image.shape[0], rect[3] + pady2)
+        y2 = min(image_shape[0], rect[3] + pady2)
         x1 = max(0, rect[0] - padx1)
-        x2 = min(image.shape[1], rect[2] + padx2)
+        x2 = min(image_shape[1], rect[2] + padx2)
 
         results.append([x1, y1, x2, y2])
 
-    boxes = np.array(results)
+    return np.array(results)
+
+
+def face_detect_ov(
+    images, device, face_det_batch_size, pads, nosmooth, path_to_detector, keyframe_interval=1, redetect_threshold=0.1, det_long_edge=None
+):
+    detector = OVFaceAlignment(LandmarksType._2D, flip_input=False, device=device, path_to_detector=path_to_detector, det_long_edge=det_long_edge)
+
+    print("face_detect_ov images[0].shape: ", images[0].shape)
+    predictions, _ = detect_face_rects(detector, images, face_det_batch_size, keyframe_interval, redetect_threshold)
+
+    boxes = pad_rects(predictions, images[0].shape, pads)
     if not nosmooth:
         boxes = get_smoothened_boxes(boxes, T=5)
     results = [[image[y1:y2, x1:x2], (y1, y2, x1, x2)] for image, (x1, y1, x2, y2) in zip(images, boxes)]
@@ -475,21 +546,93 @@ def face_detect_ov(images, device, face_det_batch_size, pads, nosmooth, path_to_
     return results
 
 
-def datagen(frames, mels, box, static, face_det_batch_size, pads, nosmooth, img_size, wav2lip_batch_size, path_to_detector):
+def face_track_streaming(
+    frames,
+    device,
+    face_det_batch_size,
+    pads,
+    nosmooth,
+    path_to_detector,
+    keyframe_interval=1,
+    redetect_threshold=0.1,
+    det_long_edge=None,
+    chunk_size=64,
+):
+    """Streaming counterpart of ``face_detect_ov``: only ``chunk_size`` frames are held at a time.
+
+    Returns an ``(N, 4)`` int array of ``(y1, y2, x1, x2)`` coords. Smoothing runs over the
+    whole track at the end, so the boxes match the in-memory path up to the extra keyframe
+    at each chunk boundary.
+    """
+    detector = OVFaceAlignment(LandmarksType._2D, flip_input=False, device=device, path_to_detector=path_to_detector, det_long_edge=det_long_edge)
+
+    # Chunks start on a keyframe of the global schedule
+    interval = max(1, keyframe_interval)
+    chunk_size = max(interval, chunk_size - chunk_size % interval)
+
+    batch_size = face_det_batch_size
+    boxes, chunk = [], []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) == chunk_size:
+            rects, batch_size = detect_face_rects(detector, chunk, batch_size, keyframe_interval, redetect_threshold)
+            boxes.append(pad_rects(rects, chunk[0].shape, pads))
+            chunk = []
+    if chunk:
+        rects, batch_size = detect_face_rects(detector, chunk, batch_size, keyframe_interval, redetect_threshold)
+        boxes.append(pad_rects(rects, chunk[0].shape, pads))
+    del chunk, detector
+
+    if not boxes:
+        raise ValueError("No frames to run face detection on")
+    boxes = np.concatenate(boxes)
+    if not nosmooth:
+        boxes = get_smoothened_boxes(boxes, T=5)
+    return boxes[:, [1, 3, 0, 2]].astype(np.int32)
+
+
+def datagen(
+    frames,
+    mels,
+    box,
+    static,
+    face_det_batch_size,
+    pads,
+    nosmooth,
+    img_size,
+    wav2lip_batch_size,
+    path_to_detector,
+    keyframe_interval=1,
+    redetect_threshold=0.1,
+    det_long_edge=None,
+    face_track_cache=None,
+    face_track_key=None,
+    fused=False,
+):
     img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
 
-    if box[0] == -1:
+    cached_coords = face_track_cache.load(face_track_key) if face_track_cache is not None and box[0] == -1 else None
+    if cached_coords is not None:
+        print("Using the cached face track instead of face detection...")
+        face_det_results = [[f[y1:y2, x1:x2], (y1, y2, x1, x2)] for f, (y1, y2, x1, x2) in zip(frames, cached_coords)]
+    elif box[0] == -1:
         if not static:
             # BGR2RGB for CNN face detection
-            face_det_results = face_detect_ov(frames, "CPU", face_det_batch_size, pads, nosmooth, path_to_detector)
+            face_det_results = face_detect_ov(
+                frames, "CPU", face_det_batch_size, pads, nosmooth, path_to_detector, keyframe_interval, redetect_threshold, det_long_edge
+            )
         else:
-            face_det_results = face_detect_ov([frames[0]], "CPU", face_det_batch_size, pads, nosmooth, path_to_detector)
+            face_det_results = face_detect_ov([frames[0]], "CPU", face_det_batch_size, pads, nosmooth, path_to_detector, det_long_edge=det_long_edge)
+        if face_track_cache is not None:
+            face_track_cache.store(face_track_key, [coords for _, coords in face_det_results])
     else:
         print("Using the specified bounding box instead of face detection...")
         y1, y2, x1, x2 = box
         face_det_results = [[f[y1:y2, x1:x2], (y1, y2, x1, x2)] for f in frames]
 
-    for i, m in enumerate(mels):
+    batch_start = 0
+    # Iterating (rather than range(len(mels))) lets a streaming mel hand out chunks as they arrive
+    for i, _ in enumerate(mels):
         idx = 0 if static else i % len(frames)
         frame_to_save = frames[idx].copy()
         face, coords = face_det_results[idx].copy()
@@ -497,34 +640,177 @@ def datagen(frames, mels, box, static, face_det_batch_size, pads, nosmooth, img_
         face = cv2.resize(face, (img_size, img_size))
 
         img_batch.append(face)
-        mel_batch.append(m)
         frame_batch.append(frame_to_save)
         coords_batch.append(coords)
 
         if len(img_batch) >= wav2lip_batch_size:
-            img_batch, mel_batch = np.asarray(img_batch), np.asarray(mel_batch)
-
-            img_masked = img_batch.copy()
-            img_masked[:, img_size // 2 :] = 0
-
-            img_batch = np.concatenate((img_masked, img_batch), axis=3) / 255.0
-            mel_batch = np.reshape(mel_batch, [len(mel_batch), mel_batch.shape[1], mel_batch.shape[2], 1])
+            # The whole mel batch is gathered in one go from the strided windows
+            img_batch, mel_batch = prepare_batch(img_batch, mels[batch_start : i + 1], img_size, fused)
 
             yield img_batch, mel_batch, frame_batch, coords_batch
             img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
+            batch_start = i + 1
 
     if len(img_batch) > 0:
-        img_batch, mel_batch = np.asarray(img_batch), np.asarray(mel_batch)
+        img_batch, mel_batch = prepare_batch(img_batch, mels[batch_start:], img_size, fused)
+
+        yield img_batch, mel_batch, frame_batch, coords_batch
+
+
+def prepare_batch(img_batch, mel_batch, img_size, fused=False):
+    with span("batch_prep", len(img_batch)):
+        # The fused Wav2Lip IR masks and normalizes u8 NHWC faces itself
+        if fused:
+            return np.asarray(img_batch, dtype=np.uint8), np.asarray(mel_batch, dtype=np.float32)
+
+        img_batch, mel_batch = np.asarray(img_batch), np.asarray(mel_batch, dtype=np.float32)
 
         img_masked = img_batch.copy()
         img_masked[:, img_size // 2 :] = 0
 
         img_batch = np.concatenate((img_masked, img_batch), axis=3) / 255.0
         mel_batch = np.reshape(mel_batch, [len(mel_batch), mel_batch.shape[1], mel_batch.shape[2], 1])
+        return img_batch, mel_batch
+
+
+def is_fused_wav2lip(compiled_wav2lip_model):
+    return compiled_wav2lip_model.compiled_model.input("face_sequences").get_element_type() == ov.Type.u8
+
+
+def read_video_frames(face_path, resize_factor=1, rotate=False, crop=[0, -1, 0, -1]):
+    source = VideoFrameSource(face_path, resize_factor, rotate, crop)
+    full_frames = list(profile_iter(source, "decode"))
+    return full_frames, source.fps
+
+
+def stream_datagen(source, mels, coords, static, img_size, wav2lip_batch_size, fused=False, frame_queue_size=16, first_frame=0):
+    """Like ``datagen`` but decodes frames lazily from a ``VideoFrameSource``.
+
+    ``coords`` holds the ``(y1, y2, x1, x2)`` face box of every tracked frame (a single row
+    for a fixed ``--box``); frame ``i`` uses row ``i % len(coords)``. At most
+    ``frame_queue_size`` decoded frames wait ahead of the current batch. ``first_frame`` is
+    the output frame index of ``mels[0]``, for a shard that starts mid-video.
+    """
+    if static:
+        still = next(source.frames(1))
+        frames = (still.copy() for _ in itertools.count())
+    else:
+        frames = prefetch(profile_iter(source.cycle(start=first_frame), "decode"), frame_queue_size)
+
+    img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
+    batch_start = 0
+    # The mel chunks drive the loop so that a streaming mel can end it; the decoder is released afterwards
+    for i, (_, frame) in enumerate(zip(mels, frames)):
+        y1, y2, x1, x2 = map(int, coords[0 if static else (first_frame + i) % len(coords)])
+
+        img_batch.append(cv2.resize(frame[y1:y2, x1:x2], (img_size, img_size)))
+        frame_batch.append(frame)
+        coords_batch.append((y1, y2, x1, x2))
+
+        if len(img_batch) >= wav2lip_batch_size:
+            img_batch, mel_batch = prepare_batch(img_batch, mels[batch_start : i + 1], img_size, fused)
+
+            yield img_batch, mel_batch, frame_batch, coords_batch
+            img_batch, mel_batch, frame_batch, coords_batch = [], [], [], []
+            batch_start = i + 1
+    frames.close()
+
+    if len(img_batch) > 0:
+        img_batch, mel_batch = prepare_batch(img_batch, mels[batch_start:], img_size, fused)
 
         yield img_batch, mel_batch, frame_batch, coords_batch
 
 
+def stream_face_coords(
+    source,
+    n_frames,
+    box,
+    static,
+    face_det_batch_size,
+    pads,
+    nosmooth,
+    path_to_detector,
+    keyframe_interval=1,
+    redetect_threshold=0.1,
+    det_long_edge=None,
+    face_track_cache=None,
+    face_track_key=None,
+    frame_queue_size=16,
+):
+    """Face coords for ``stream_datagen``, from ``--box``, the face-track cache or a streaming detection pass."""
+    if box[0] != -1:
+        print("Using the specified bounding box instead of face detection...")
+        return np.array([box], dtype=np.int32)
+
+    coords = face_track_cache.load(face_track_key) if face_track_key is not None else None
+    if coords is not None:
+        print("Using the cached face track instead of face detection...")
+        return coords
+
+    # A cached track covers the whole video so that it does not depend on the audio length
+    limit = 1 if static else (None if face_track_key is not None else n_frames)
+    coords = face_track_streaming(
+        prefetch(profile_iter(source.frames(limit), "decode"), frame_queue_size),
+        "CPU",
+        face_det_batch_size,
+        pads,
+        nosmooth,
+        path_to_detector,
+        keyframe_interval,
+        redetect_threshold,
+        det_long_edge,
+    )
+    if face_track_key is not None:
+        face_track_cache.store(face_track_key, coords)
+    return coords
+
+
+def streaming_memory_bound(frame_shape, wav2lip_batch_size, infer_jobs=2, frame_queue_size=16, chunk_size=64, queue_size=1):
+    """Upper bound, in bytes, of the decoded frames held at once in streaming mode.
+
+    The face-tracking pass holds one chunk plus the prefetch queue; the render pass holds
+    ``LipSyncPipeline.max_live_batches`` batches of full frames plus the prefetch queue.
+    Model weights, OpenVINO buffers and the mel spectrogram come on top and do not
+    depend on the video length either.
+    """
+    frame_bytes = int(np.prod(frame_shape))
+    tracking = chunk_size + frame_queue_size
+    rendering = wav2lip_batch_size * LipSyncPipeline.max_live_batches(infer_jobs, queue_size) + frame_queue_size
+    return frame_bytes * max(tracking, rendering)
+
+
+def pack_datagen(pack, mels, static, img_size, wav2lip_batch_size, fused=False, first_frame=0):
+    """Like ``datagen`` but streams precomputed face crops and coordinates from an ``AvatarPack``."""
+    for start, mel_batch in mels.batches(wav2lip_batch_size):
+        start += first_frame
+        idx = np.zeros(len(mel_batch), dtype=np.int64) if static else np.arange(start, start + len(mel_batch)) % len(pack)
+
+        # One gather from the memory-mapped crops; frames are copied because the mouths are pasted on them
+        img_batch, mel_batch = prepare_batch(pack.faces[idx], mel_batch, img_size, fused)
+        frame_batch = [np.array(pack.frames[i]) for i in idx]
+        coords_batch = [tuple(map(int, c)) for c in pack.coords[idx]]
+
+        yield img_batch, mel_batch, frame_batch, coords_batch
+
+
+def compose_batch(out, pred_ov, frames, plan):
+    """Pastes the mouths of a ``gate_batches`` batch onto its frames and writes them to ``out``."""
+    mouths = iter(pred_ov if pred_ov is not None else ())
+    with span("composite", len(frames)):
+        for f, (c, weight) in zip(frames, plan):
+            if weight > 0:
+                y1, y2, x1, x2 = c
+                p = cv2.resize(next(mouths), (x2 - x1, y2 - y1))
+                if weight < 1:
+                    p = cv2.addWeighted(p, weight, f[y1:y2, x1:x2], 1.0 - weight, 0)
+
+                f[y1:y2, x1:x2] = p
+    with span("encode", len(frames)):
+        for f in frames:
+            out.write(f)
+
+
+@profile_job("ov_inference")
 def ov_inference(
     face_path,
     audio_path,
@@ -543,95 +829,343 @@ def ov_inference(
     face_det_batch_size=16,
     pads=[0, 10, 0, 0],
     nosmooth=False,
+    keyframe_interval=1,
+    redetect_threshold=0.1,
+    det_long_edge=None,
+    face_track_cache=None,
+    infer_jobs=2,
+    avatar_pack=None,
+    stream_frames=False,
+    frame_queue_size=16,
+    encoder_preset=DEFAULT_PRESET,
+    copy_audio=False,
+    temp_dir=None,
+    silence_threshold_db=None,
+    min_silence_frames=3,
+    crossfade_frames=2,
+    segment_dir=None,
+    segment_seconds=2.0,
+    segment_format="hls",
+    on_segment=None,
+    audio_stream=None,
+    render_cache=None,
+    shards=1,
+    shard_threads=None,
+    select_variants=True,
 ):
-    print("Reading video frames...")
-
-    video_stream = cv2.VideoCapture(face_path)
-    fps = video_stream.get(cv2.CAP_PROP_FPS)
-
-    full_frames = []
-    while 1:
-        still_reading, frame = video_stream.read()
-        if not still_reading:
-            video_stream.release()
-            break
-        if resize_factor > 1:
-            frame = cv2.resize(frame, (frame.shape[1] // resize_factor, frame.shape[0] // resize_factor))
-
-        if rotate:
-            frame = cv2.rotate(frame, cv2.cv2.ROTATE_90_CLOCKWISE)
-
-        y1, y2, x1, x2 = crop
-        if x2 == -1:
-            x2 = frame.shape[1]
-        if y2 == -1:
-            y2 = frame.shape[0]
-
-        frame = frame[y1:y2, x1:x2]
-
-        full_frames.append(frame)
-
-    print("Number of frames available for inference: " + str(len(full_frames)))
-
-    core = ov.Core()
-
-    if not audio_path.endswith(".wav"):
-        print("Extracting raw audio...")
-        command = "ffmpeg -y -i {} -strict -2 {}".format(audio_path, "temp/temp.wav")
-
-        subprocess.call(command, shell=True)
-        audio_path = "temp/temp.wav"
-
-    wav = audio.load_wav(audio_path, 16000)
-    mel = audio.melspectrogram(wav)
-    print(mel.shape)
-
-    if np.isnan(mel.reshape(-1)).sum() > 0:
-        raise ValueError("Mel contains nan! Using a TTS voice? Add a small epsilon noise to the wav file and try again")
-
-    mel_chunks = []
-    mel_idx_multiplier = 80.0 / fps
-    i = 0
-    while 1:
-        start_idx = int(i * mel_idx_multiplier)
-        if start_idx + mel_step_size > len(mel[0]):
-            mel_chunks.append(mel[:, len(mel[0]) - mel_step_size :])
-            break
-        mel_chunks.append(mel[:, start_idx : start_idx + mel_step_size])
-        i += 1
-
-    print("Length of mel chunks: {}".format(len(mel_chunks)))
+    job_start = time.perf_counter()
+    if shards > 1 and (audio_stream is not None or segment_dir is not None):
+        raise ValueError("Sharded rendering needs the whole audio up front and a single output file")
+    if shards > 1:
+        # The workers decode their own frames; the parent only reads the audio and tracks the face
+        stream_frames = True
+
+    if avatar_pack is not None:
+        print("Using avatar pack {}...".format(avatar_pack))
+        pack = AvatarPack(avatar_pack)
+        fps = pack.fps
+        frame_h, frame_w = pack.frame_shape[:2]
+    else:
+        # Only the first frame is decoded here; the whole video waits until the render cache misses
+        source = VideoFrameSource(face_path, resize_factor, rotate, crop)
+        fps = source.fps
+        frame_h, frame_w = source.frame_shape[:2]
+
+    n_chunks = None
+    if audio_stream is None:
+        # The original audio is muxed into the output; only the mel spectrogram needs the wav
+        output_audio_path = audio_path
+        if not audio_path.endswith(".wav"):
+            print("Extracting raw audio...")
+            wav_path = os.path.join(temp_dir or "temp", "temp.wav")
+            command = "ffmpeg -y -i {} -strict -2 {}".format(audio_path, wav_path)
+
+            subprocess.call(command, shell=True)
+            audio_path = wav_path
+        n_chunks = wav_chunk_count(audio_path, fps, mel_step_size)
+
+    face_track_key = None
+    if avatar_pack is None and face_track_cache is not None and box[0] == -1:
+        # The whole video is tracked so that the cache entry does not depend on the audio length
+        face_track_key = face_track_cache.make_key(
+            face_path,
+            face_detection_path,
+            pads=pads,
+            resize_factor=resize_factor,
+            crop=crop,
+            rotate=rotate,
+            nosmooth=nosmooth,
+            static=static,
+            keyframe_interval=keyframe_interval,
+            redetect_threshold=redetect_threshold,
+            det_long_edge=det_long_edge,
+        )
+
+    if select_variants and avatar_pack is None and box[0] == -1:
+        # Chosen after the face track key so that cached tracks stay valid for every variant
+        n_detect = 1 if static else (None if n_chunks is None else math.ceil(n_chunks / max(1, keyframe_interval)))
+        face_detection_path, det_batch = select_model_variant(face_detection_path, "CPU", n_detect, detection_hw(frame_h, frame_w, det_long_edge))
+        if det_batch is not None:
+            face_det_batch_size = det_batch
+            print("Face detection model: {} (batch {})".format(face_detection_path, det_batch))
+
+    if select_variants:
+        wav2lip_path, batch = select_model_variant(wav2lip_path, inference_device, n_chunks)
+        if batch is not None:
+            wav2lip_batch_size = batch
+            print("Wav2Lip model: {} (batch {})".format(wav2lip_path, batch))
+
+    render_key = None
+    if render_cache is not None and audio_stream is None and segment_dir is None:
+        # Identical requests (same avatar, audio samples, resolved models and parameters) reuse the finished video
+        render_key = render_cache.make_key(
+            avatar_pack or face_path,
+            output_audio_path,
+            face_detection_path,
+            wav2lip_path,
+            inference_device=inference_device,
+            wav2lip_batch_size=wav2lip_batch_size,
+            resize_factor=resize_factor,
+            rotate=rotate,
+            crop=crop,
+            mel_step_size=mel_step_size,
+            box=box,
+            static=static,
+            img_size=img_size,
+            face_det_batch_size=face_det_batch_size,
+            pads=pads,
+            nosmooth=nosmooth,
+            keyframe_interval=keyframe_interval,
+            redetect_threshold=redetect_threshold,
+            det_long_edge=det_long_edge,
+            encoder_preset=encoder_preset,
+            copy_audio=copy_audio,
+            silence_threshold_db=silence_threshold_db,
+            min_silence_frames=min_silence_frames,
+            crossfade_frames=crossfade_frames,
+        )
+        if render_cache.load(render_key, outfile) is not None:
+            print("Using the cached render: {:.3f} s".format(time.perf_counter() - job_start))
+            return outfile
+
+    if avatar_pack is not None:
+        print("Number of frames available for inference: " + str(len(pack.frames)))
+    elif stream_frames:
+        print("Streaming video frames...")
+        print(
+            "Decoded frames held at once: at most {:.0f} MB".format(
+                streaming_memory_bound(source.frame_shape, wav2lip_batch_size, infer_jobs, frame_queue_size) / 2**20
+            )
+        )
+    else:
+        print("Reading video frames...")
+        full_frames = list(profile_iter(source, "decode"))
+        print("Number of frames available for inference: " + str(len(full_frames)))
+
+    audio_input_args = None
+    if audio_stream is not None:
+        # Mel chunks are published as the PCM blocks arrive; the render starts with the first batch
+        if silence_threshold_db is not None:
+            raise ValueError("Silence gating needs the whole mel spectrogram and cannot be used with audio_stream")
+        print("Streaming audio...")
+        os.makedirs(temp_dir or "temp", exist_ok=True)
+        output_audio_path = os.path.join(temp_dir or "temp", "stream_audio.f32")
+        audio_input_args = PCM_INPUT_ARGS
+        mel_stream = MelStream(audio_stream, fps, output_audio_path, mel_step_size)
+        mel_chunks = mel_stream.windows
+    else:
+        # Lazy: the rest of the module, and the offline benchmark suite, work without the Wav2Lip checkout
+        from Wav2Lip import audio
+
+        wav = audio.load_wav(audio_path, 16000)
+        # Same engine as the streaming path, so both give bit-identical mel chunks
+        with span("mel"):
+            mel = melspectrogram(wav)
+        print(mel.shape)
+
+        if np.isnan(mel.reshape(-1)).sum() > 0:
+            raise ValueError("Mel contains nan! Using a TTS voice? Add a small epsilon noise to the wav file and try again")
+
+        # Strided float32 view: chunk i starts at int(i * 80 / fps), the last one is clamped to the end
+        mel_chunks = MelWindows(mel, fps, mel_step_size)
+        # Only the float32 copy inside the windows is kept for the rest of the render
+        del wav, mel
+
+        print("Length of mel chunks: {}".format(len(mel_chunks)))
+
+    if face_track_key is None and avatar_pack is None and not stream_frames and audio_stream is None:
+        full_frames = full_frames[: len(mel_chunks)]
+
+    coords = None
+    if avatar_pack is not None:
+        if pack.img_size != img_size:
+            raise ValueError("The avatar pack was built with img_size={}, expected {}".format(pack.img_size, img_size))
+    elif stream_frames:
+        coords = stream_face_coords(
+            source,
+            # The audio length is unknown while it streams: the whole video is tracked and cycled
+            None if audio_stream is not None else len(mel_chunks),
+            box,
+            static,
+            face_det_batch_size,
+            pads,
+            nosmooth,
+            face_detection_path,
+            keyframe_interval,
+            redetect_threshold,
+            det_long_edge,
+            face_track_cache,
+            face_track_key,
+            frame_queue_size,
+        )
+
+    # Silent chunks keep the original frame; weights in (0, 1) crossfade the mouth at speech boundaries
+    if silence_threshold_db is not None:
+        weights = speech_weights(mel_chunks, silence_threshold_db, min_silence_frames, crossfade_frames)
+    else:
+        weights = None
+
+    if shards > 1:
+        # Contiguous frame ranges are rendered in worker processes and stitched without re-encoding
+        report = render_sharded(
+            outfile,
+            mel_chunks,
+            output_audio_path,
+            (frame_w, frame_h),
+            fps,
+            wav2lip_path,
+            inference_device,
+            shards,
+            shard_threads,
+            video_path=None if avatar_pack is not None else face_path,
+            avatar_pack=avatar_pack,
+            coords=coords,
+            weights=weights,
+            resize_factor=resize_factor,
+            rotate=rotate,
+            crop=crop,
+            static=static,
+            img_size=img_size,
+            wav2lip_batch_size=wav2lip_batch_size,
+            frame_queue_size=frame_queue_size,
+            encoder_preset=encoder_preset,
+            copy_audio=copy_audio,
+            temp_dir=temp_dir,
+        )
+        print_shard_report(report)
+        if render_key is not None:
+            render_cache.store(render_key, outfile)
+        return outfile
+
+    compiled_wav2lip_model = get_registry().get(wav2lip_path, inference_device)
+    fused = is_fused_wav2lip(compiled_wav2lip_model)
+    print("Model loaded")
+    if compiled_wav2lip_model.static_batch is not None and wav2lip_batch_size > compiled_wav2lip_model.static_batch:
+        # A static-batch variant cannot take larger batches; smaller ones are padded
+        wav2lip_batch_size = compiled_wav2lip_model.static_batch
 
-    full_frames = full_frames[: len(mel_chunks)]
     batch_size = wav2lip_batch_size
-    gen = datagen(full_frames.copy(), mel_chunks, box, static, face_det_batch_size, pads, nosmooth, img_size, wav2lip_batch_size, face_detection_path)
-    for i, (img_batch, mel_batch, frames, coords) in enumerate(tqdm(gen, total=int(np.ceil(float(len(mel_chunks)) / batch_size)))):
-        if i == 0:
-            img_batch = torch.FloatTensor(np.transpose(img_batch, (0, 3, 1, 2))).to(device)
-            mel_batch = torch.FloatTensor(np.transpose(mel_batch, (0, 3, 1, 2))).to(device)
-            compiled_wav2lip_model = core.compile_model(wav2lip_path, inference_device)
-            print("Model loaded")
-            
-            frame_h, frame_w = full_frames[0].shape[:-1]
-            out = cv2.VideoWriter("C:/programacionEjercicios/miwav2lipv6/src/Wav2Lip/temp/result.avi", cv2.VideoWriter_fourcc(*"DIVX"), fps, (frame_w, frame_h))
-            pred_ov = compiled_wav2lip_model({"audio_sequences": mel_batch.numpy(), "face_sequences": img_batch.numpy()})[0]
-        else:
-            img_batch = np.transpose(img_batch, (0, 3, 1, 2))
-            mel_batch = np.transpose(mel_batch, (0, 3, 1, 2))
-            pred_ov = compiled_wav2lip_model({"audio_sequences": mel_batch, "face_sequences": img_batch})[0]
-
-        pred_ov = compiled_wav2lip_model({"audio_sequences": mel_batch, "face_sequences": img_batch})[0]
-        pred_ov = pred_ov.transpose(0, 2, 3, 1) * 255.0
-        for p, f, c in zip(pred_ov, frames, coords):
-            y1, y2, x1, x2 = c
-            p = cv2.resize(p.astype(np.uint8), (x2 - x1, y2 - y1))
+    if avatar_pack is not None:
+        gen = pack_datagen(pack, mel_chunks, static, img_size, wav2lip_batch_size, fused)
+    elif stream_frames:
+        gen = stream_datagen(source, mel_chunks, coords, static, img_size, wav2lip_batch_size, fused, frame_queue_size)
+    else:
+        gen = datagen(
+            full_frames.copy(),
+            mel_chunks,
+            box,
+            static,
+            face_det_batch_size,
+            pads,
+            nosmooth,
+            img_size,
+            wav2lip_batch_size,
+            face_detection_path,
+            keyframe_interval,
+            redetect_threshold,
+            det_long_edge,
+            face_track_cache,
+            face_track_key,
+            fused,
+        )
+
+    gen = gate_batches(gen, weights)
+
+    def write_batch(pred_ov, frames, plan):
+        compose_batch(out, pred_ov, frames, plan)
+
+    # Frames are encoded and muxed with the audio in a single ffmpeg pass as they are composed
+    if segment_dir is not None:
+        # Independently playable segments are published as soon as their frames are composed
+        out = SegmentedWriter(
+            segment_dir,
+            fps,
+            (frame_w, frame_h),
+            output_audio_path,
+            segment_seconds,
+            segment_format,
+            encoder_preset,
+            on_segment,
+            start_time=job_start,
+            audio_input_args=audio_input_args,
+            audio_ready=mel_stream.wait_for if audio_stream is not None else None,
+        )
+    elif audio_stream is not None:
+        # ffmpeg would stop reading the audio at the current end of the growing PCM file, so it is muxed at the end
+        out = FFmpegPipeWriter(os.path.join(temp_dir or "temp", "stream_video.mp4"), fps, (frame_w, frame_h), None, encoder_preset, temp_dir=temp_dir)
+    else:
+        out = FFmpegPipeWriter(outfile, fps, (frame_w, frame_h), output_audio_path, encoder_preset, copy_audio, temp_dir)
+    with out:
+        # Streaming keeps a single prepared batch queued so that the frames held stay within streaming_memory_bound
+        pipeline = LipSyncPipeline(compiled_wav2lip_model, fused, write_batch, infer_jobs=infer_jobs, queue_size=1 if stream_frames else 4)
+        total = None if audio_stream is not None else int(np.ceil(float(len(mel_chunks)) / batch_size))
+        print_report(pipeline.run(gen, total=total))
+        encode_start = time.perf_counter()
+    if audio_stream is not None and segment_dir is None:
+        mux_audio(out.outfile, output_audio_path, outfile, audio_input_args, temp_dir=temp_dir)
+        os.remove(out.outfile)
+    print("Encoder flush: {:.2f} s ({} frames, preset {})".format(time.perf_counter() - encode_start, out.frames_written, encoder_preset))
+    if weights is not None:
+        skipped = int(np.sum(weights == 0))
+        print("Silence: skipped Wav2Lip on {}/{} frames ({:.1%})".format(skipped, len(weights), skipped / max(1, len(weights))))
+
+    if segment_dir is not None:
+        print(
+            "Time to first segment: {:.2f} s ({} segments, total {:.2f} s)".format(
+                out.time_to_first_segment or 0.0, len(out.segments), time.perf_counter() - job_start
+            )
+        )
+        return out.playlist_path if segment_format == "hls" else out.segment_dir
+
+    if render_key is not None:
+        render_cache.store(render_key, outfile)
+    return outfile
 
-            f[y1:y2, x1:x2] = p
-            out.write(f)
 
-    out.release()
+def ov_inference_segments(*args, **kwargs):
+    """Run ``ov_inference`` in a background thread and yield each segment dict as soon as it is ready.
 
-    command = "ffmpeg -y -i {} -i {} -strict -2 -q:v 1 {}".format(audio_path, "C:/programacionEjercicios/miwav2lipv6/src/Wav2Lip/temp/result.avi", outfile)
-    subprocess.call(command, shell=True)
+    Takes the same arguments as ``ov_inference``; ``segment_dir`` is required.
+    """
+    if kwargs.get("segment_dir") is None:
+        raise ValueError("ov_inference_segments needs segment_dir")
+    segments = queue.Queue()
 
-    return outfile
+    def run():
+        try:
+            ov_inference(*args, on_segment=segments.put, **kwargs)
+        except BaseException as e:
+            segments.put(e)
+            return
+        segments.put(None)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        item = segments.get()
+        if item is None:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
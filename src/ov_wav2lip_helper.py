@@ -1,27 +1,49 @@
 import numpy as np
 import sys
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import openvino as ov
-import torch
+from openvino.preprocess import ColorFormat, PrePostProcessor
+
+try:
+    import openvino.opset13 as ops
+except ImportError:  # openvino < 2025
+    import openvino.runtime.opset13 as ops
 
 from pathlib import Path
 # Añade `src` al `sys.path` para que Python encuentre `utils/notebook_utils.py`
 sys.path.append(str(Path(__file__).resolve().parent))
 
-# Importa `download_file` desde `notebook_utils`
-from utils.notebook_utils import download_file
-from huggingface_hub import hf_hub_download
-from Wav2Lip.face_detection.detection.sfd.net_s3fd import s3fd
-from Wav2Lip.models import Wav2Lip
+from conversion_manifest import ConversionManifest, save_model_atomic
+from model_variants import PRECISIONS, VARIANTS_DIR, VariantCatalog, static_shapes, variant_name
+
+# torch, Wav2Lip, huggingface_hub y notebook_utils se importan dentro de las funciones:
+# si los IR están al día, `convert_models.py` no los carga ni toca la red.
+
+FACE_DETECTION_URL = "https://www.adrianbulat.com/downloads/python-fan/s3fd-619a316812.pth"
+FACE_DETECTION_CHECKPOINT = "checkpoints/face_detection.pth"
+# `hf_hub_download(..., local_dir="checkpoints")` deja el archivo en esta ruta
+WAV2LIP_CHECKPOINT = "checkpoints/Wav2lip/wav2lip.pth"
 
+# Súbelo al cambiar cómo se exporta un modelo para que el manifiesto lo reconvierta
+# (2: los IR base guardan los pesos en FP32; las variantes FP16 se exportan aparte)
+CONVERSION_REVISION = 2
+FACE_DETECTION_OPTIONS = {"revision": CONVERSION_REVISION, "example_input": [1, 3, 768, 576]}
+WAV2LIP_OPTIONS = {"revision": CONVERSION_REVISION, "example_input": {"audio_sequences": [123, 1, 80, 16], "face_sequences": [123, 6, 96, 96]}}
+FACE_DETECTION_U8_OPTIONS = {"revision": CONVERSION_REVISION, "layout": "NHWC", "color": "BGR", "mean": [104.0, 117.0, 123.0]}
 
 
 def _load(checkpoint_path):
+    import torch
+
     checkpoint = torch.load(checkpoint_path, map_location=lambda storage, loc: storage)
     return checkpoint
 
 
 def load_model(path):
+    from Wav2Lip.models import Wav2Lip
+
     model = Wav2Lip()
     print("Load checkpoint from: {}".format(path))
     checkpoint = _load(path)
@@ -34,35 +56,220 @@ def load_model(path):
     return model.eval()
 
 
-def download_and_convert_models(ov_face_detection_model_path, ov_wav2lip_model_path):
-    models_urls = {"s3fd": "https://www.adrianbulat.com/downloads/python-fan/s3fd-619a316812.pth"}
-    path_to_detector = "checkpoints/face_detection.pth"
-    # Convert Face Detection Model
-    print("Convert Face Detection Model ...")
-    if not os.path.isfile(path_to_detector):
-        download_file(models_urls["s3fd"])
-        if not os.path.exists("checkpoints"):
-            os.mkdir("checkpoints")
-        os.replace("s3fd-619a316812.pth", path_to_detector)
-    model_weights = torch.load(path_to_detector)
+def fetch_face_detection_checkpoint():
+    """
+    Ruta del checkpoint de S3FD; solo lo descarga si no está ya en `checkpoints/`.
+    """
+    if not os.path.isfile(FACE_DETECTION_CHECKPOINT):
+        from utils.notebook_utils import download_file
 
-    face_detector = s3fd()
-    face_detector.load_state_dict(model_weights)
+        download_file(FACE_DETECTION_URL)
+        os.makedirs(os.path.dirname(FACE_DETECTION_CHECKPOINT), exist_ok=True)
+        os.replace("s3fd-619a316812.pth", FACE_DETECTION_CHECKPOINT)
+    return FACE_DETECTION_CHECKPOINT
+
+
+def fetch_wav2lip_checkpoint():
+    """
+    Ruta del checkpoint de Wav2Lip; solo llama a Hugging Face si no está ya en `checkpoints/`.
+    """
+    if not os.path.isfile(WAV2LIP_CHECKPOINT):
+        from huggingface_hub import hf_hub_download
+
+        return hf_hub_download(repo_id="numz/wav2lip_studio", filename="Wav2lip/wav2lip.pth", local_dir="checkpoints")
+    return WAV2LIP_CHECKPOINT
 
-    if not ov_face_detection_model_path.exists():
-        face_detection_dummy_inputs = torch.FloatTensor(np.random.rand(1, 3, 768, 576))
-        face_detection_ov_model = ov.convert_model(face_detector, example_input=face_detection_dummy_inputs)
-        ov.save_model(face_detection_ov_model, ov_face_detection_model_path)
+
+def convert_face_detection(path_to_detector, ov_face_detection_model_path):
+    import torch
+    from Wav2Lip.face_detection.detection.sfd.net_s3fd import s3fd
+
+    print("Convert Face Detection Model ...")
+    face_detector = s3fd()
+    face_detector.load_state_dict(torch.load(path_to_detector))
+    face_detection_dummy_inputs = torch.FloatTensor(np.random.rand(*FACE_DETECTION_OPTIONS["example_input"]))
+    face_detection_ov_model = ov.convert_model(face_detector, example_input=face_detection_dummy_inputs)
+    save_model_atomic(face_detection_ov_model, ov_face_detection_model_path, compress_to_fp16=False)
     print("Converted face detection OpenVINO model: ", ov_face_detection_model_path)
+    return ov_face_detection_model_path
+
+
+def convert_wav2lip(path_to_wav2lip, ov_wav2lip_model_path):
+    import torch
 
     print("Convert Wav2Lip Model ...")
-    path_to_wav2lip = hf_hub_download(repo_id="numz/wav2lip_studio", filename="Wav2lip/wav2lip.pth", local_dir="checkpoints")
     wav2lip = load_model(path_to_wav2lip)
-    img_batch = torch.FloatTensor(np.random.rand(123, 6, 96, 96))
-    mel_batch = torch.FloatTensor(np.random.rand(123, 1, 80, 16))
-
-    if not ov_wav2lip_model_path.exists():
-        example_inputs = {"audio_sequences": mel_batch, "face_sequences": img_batch}
-        wav2lip_ov_model = ov.convert_model(wav2lip, example_input=example_inputs)
-        ov.save_model(wav2lip_ov_model, ov_wav2lip_model_path)
-    print("Converted face detection OpenVINO model: ", ov_wav2lip_model_path)
+    shapes = WAV2LIP_OPTIONS["example_input"]
+    example_inputs = {name: torch.FloatTensor(np.random.rand(*shape)) for name, shape in shapes.items()}
+    wav2lip_ov_model = ov.convert_model(wav2lip, example_input=example_inputs)
+    save_model_atomic(wav2lip_ov_model, ov_wav2lip_model_path, compress_to_fp16=False)
+    print("Converted Wav2Lip OpenVINO model: ", ov_wav2lip_model_path)
+    return ov_wav2lip_model_path
+
+
+def download_and_convert_models(ov_face_detection_model_path, ov_wav2lip_model_path, force=False, jobs=None):
+    """
+    Convierte a IR el detector S3FD y Wav2Lip, solo si hace falta.
+
+    Cada IR se compara con su entrada en `conversion_manifest.json` (hash del
+    checkpoint, versiones de OpenVINO y torch y opciones de exportación) y se
+    omite si está al día; en ese caso no se descarga nada aunque falte el
+    checkpoint. Los checkpoints que ya están en `checkpoints/` se usan sin red.
+    Los modelos pendientes se convierten en procesos separados (`jobs`, por
+    defecto uno por modelo), así que el script que llama debe tener un bloque
+    `if __name__ == "__main__"`.
+
+    Args:
+        force (bool): Reconvierte aunque el manifiesto diga que el IR está al día.
+        jobs (int): Procesos de conversión; 1 convierte en este mismo proceso.
+
+    Returns:
+        list: IR que se han (re)generado.
+    """
+    tasks = [
+        (convert_face_detection, fetch_face_detection_checkpoint, FACE_DETECTION_CHECKPOINT, Path(ov_face_detection_model_path), FACE_DETECTION_OPTIONS),
+        (convert_wav2lip, fetch_wav2lip_checkpoint, WAV2LIP_CHECKPOINT, Path(ov_wav2lip_model_path), WAV2LIP_OPTIONS),
+    ]
+    pending = []
+    for convert, fetch, checkpoint, ir_path, options in tasks:
+        if not force and ConversionManifest(ir_path.parent).is_up_to_date(ir_path, {"checkpoint": checkpoint}, options):
+            print("OpenVINO model up to date: ", ir_path)
+            continue
+        pending.append((convert, fetch(), ir_path, options))
+    if not pending:
+        return []
+
+    jobs = len(pending) if jobs is None else max(1, min(jobs, len(pending)))
+    if jobs == 1:
+        results = [(convert(checkpoint, ir_path), checkpoint, options) for convert, checkpoint, ir_path, options in pending]
+    else:
+        # spawn: torch no se lleva bien con fork y cada conversión carga su propio modelo
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [(pool.submit(convert, checkpoint, ir_path), checkpoint, options) for convert, checkpoint, ir_path, options in pending]
+            results = [(future.result(), checkpoint, options) for future, checkpoint, options in futures]
+
+    # El manifiesto lo escribe solo este proceso, después de que cada IR esté completo en disco
+    for ir_path, checkpoint, options in results:
+        ConversionManifest(ir_path.parent).record(ir_path, {"checkpoint": checkpoint}, options)
+    return [ir_path for ir_path, _, _ in results]
+
+
+def convert_face_detection_u8(ov_face_detection_model_path, ov_face_detection_u8_model_path, force=False):
+    """
+    Genera una variante del detector S3FD que acepta lotes u8 NHWC en BGR.
+
+    La conversión BGR->RGB, el paso a float, la resta de la media `[104, 117, 123]`
+    y el cambio de layout NHWC->NCHW quedan dentro del grafo mediante el
+    PrePostProcessor de OpenVINO, así que Python pasa los fotogramas tal cual.
+    Si el IR base no ha cambiado desde la última conversión, no hace nada.
+    """
+    manifest = ConversionManifest(Path(ov_face_detection_u8_model_path).parent)
+    sources = {"model": ov_face_detection_model_path}
+    if not force and manifest.is_up_to_date(ov_face_detection_u8_model_path, sources, FACE_DETECTION_U8_OPTIONS):
+        print("OpenVINO model up to date: ", ov_face_detection_u8_model_path)
+        return ov_face_detection_u8_model_path
+    model = ov.Core().read_model(ov_face_detection_model_path)
+    ppp = PrePostProcessor(model)
+    ppp.input().tensor().set_element_type(ov.Type.u8).set_layout(ov.Layout("NHWC")).set_color_format(ColorFormat.BGR)
+    ppp.input().model().set_layout(ov.Layout("NCHW"))
+    ppp.input().preprocess().convert_element_type(ov.Type.f32).convert_color(ColorFormat.RGB).mean(FACE_DETECTION_U8_OPTIONS["mean"])
+    save_model_atomic(ppp.build(), ov_face_detection_u8_model_path, compress_to_fp16=False)
+    manifest.record(ov_face_detection_u8_model_path, sources, FACE_DETECTION_U8_OPTIONS)
+    print("Converted face detection u8 OpenVINO model: ", ov_face_detection_u8_model_path)
+    return ov_face_detection_u8_model_path
+
+
+def convert_wav2lip_fused(ov_wav2lip_model_path, ov_wav2lip_fused_model_path, img_size=96, force=False):
+    """
+    Genera una variante de Wav2Lip con el enmascarado y la normalización dentro del grafo.
+
+    Entradas del modelo resultante:
+        face_sequences: recortes u8 NHWC `(B, img_size, img_size, 3)`.
+        audio_sequences: ventanas de mel float32 `(B, 80, 16)`.
+    Salida: bocas u8 NHWC `(B, img_size, img_size, 3)`.
+
+    El grafo reproduce lo que hacían `datagen` y el bucle de `ov_inference`: pone a
+    cero la mitad inferior de la cara, concatena cara enmascarada y de referencia
+    (6 canales), divide entre 255, pasa a NCHW y, a la salida, vuelve a NHWC,
+    multiplica por 255 y trunca a u8. Como `convert_face_detection_u8`, solo se
+    regenera si cambia el IR base o las opciones.
+    """
+    manifest = ConversionManifest(Path(ov_wav2lip_fused_model_path).parent)
+    sources = {"model": ov_wav2lip_model_path}
+    options = {"revision": CONVERSION_REVISION, "img_size": img_size}
+    if not force and manifest.is_up_to_date(ov_wav2lip_fused_model_path, sources, options):
+        print("OpenVINO model up to date: ", ov_wav2lip_fused_model_path)
+        return ov_wav2lip_fused_model_path
+    model = ov.Core().read_model(ov_wav2lip_model_path)
+    old_face = model.input("face_sequences").get_node()
+    old_audio = model.input("audio_sequences").get_node()
+
+    face = ops.parameter(ov.PartialShape([-1, img_size, img_size, 3]), ov.Type.u8, name="face_sequences")
+    audio = ops.parameter(ov.PartialShape([-1, 80, 16]), ov.Type.f32, name="audio_sequences")
+
+    reference = ops.divide(ops.convert(face, ov.Type.f32), np.float32(255.0))
+    mask = np.ones((1, img_size, img_size, 1), dtype=np.float32)
+    mask[:, img_size // 2 :] = 0
+    face_6ch = ops.concat([ops.multiply(reference, mask), reference], axis=3)
+    face_nchw = ops.transpose(face_6ch, np.array([0, 3, 1, 2], dtype=np.int64))
+    audio_nchw = ops.unsqueeze(audio, np.array([1], dtype=np.int64))
+
+    for target in old_face.output(0).get_target_inputs():
+        target.replace_source_output(face_nchw.output(0))
+    for target in old_audio.output(0).get_target_inputs():
+        target.replace_source_output(audio_nchw.output(0))
+
+    prediction = model.output(0).get_node().input_value(0)
+    mouths = ops.transpose(prediction, np.array([0, 2, 3, 1], dtype=np.int64))
+    mouths = ops.clamp(ops.floor(ops.multiply(mouths, np.float32(255.0))), 0.0, 255.0)
+    mouths = ops.convert(mouths, ov.Type.u8)
+    mouths.output(0).set_names({"mouths"})
+
+    fused_model = ov.Model([mouths], [audio, face], "wav2lip_fused")
+    save_model_atomic(fused_model, ov_wav2lip_fused_model_path, compress_to_fp16=False)
+    manifest.record(ov_wav2lip_fused_model_path, sources, options)
+    print("Converted fused Wav2Lip OpenVINO model: ", ov_wav2lip_fused_model_path)
+    return ov_wav2lip_fused_model_path
+
+
+def export_static_variants(base_model_path, batch_sizes, hws=(None,), precisions=PRECISIONS, force=False):
+    """
+    Exporta variantes de forma estática y precisión de un IR ya convertido.
+
+    No vuelve a trazar con PyTorch: lee el IR base, fija el lote (y, en el
+    detector, la resolución `hw`) con `reshape` y lo guarda con los pesos en FP32
+    o comprimidos a FP16. Las variantes quedan en `models/variants/`, registradas
+    en su `variants.json`, y solo se regeneran si cambia el IR base.
+
+    Args:
+        base_model_path (str): IR base (p. ej. `wav2lip_fused.xml` o `face_detection_u8.xml`).
+        batch_sizes (list): Lotes estáticos.
+        hws (list): Resoluciones `(alto, ancho)` del detector; `(None,)` si el modelo
+            solo tiene dinámico el lote.
+        precisions (list): "fp32" y/o "fp16".
+        force (bool): Reexporta aunque la variante esté al día.
+
+    Returns:
+        list: Rutas de las variantes.
+    """
+    base_model_path = Path(base_model_path)
+    models_dir = base_model_path.parent
+    catalog = VariantCatalog(models_dir)
+    manifest = ConversionManifest(models_dir / VARIANTS_DIR)
+    sources = {"model": base_model_path}
+    paths = []
+    for hw in hws:
+        for batch in batch_sizes:
+            for precision in precisions:
+                name = variant_name(base_model_path.name, batch, hw, precision)
+                ir_path = models_dir / name
+                options = {"revision": CONVERSION_REVISION, "batch": batch, "hw": None if hw is None else list(hw), "precision": precision}
+                if force or not manifest.is_up_to_date(ir_path, sources, options):
+                    model = ov.Core().read_model(base_model_path)
+                    model.reshape(static_shapes(model, batch, hw))
+                    save_model_atomic(model, ir_path, compress_to_fp16=precision == "fp16")
+                    manifest.record(ir_path, sources, options)
+                    print("Exported OpenVINO model variant: ", ir_path)
+                catalog.add_variant(name, base_model_path.name, batch, hw, precision)
+                paths.append(ir_path)
+    return paths
@@ -0,0 +1,115 @@
+# prebuild_models.py
+#
+# Llena la caché de modelos compilados (ver `model_cache.py`) durante el despliegue,
+# para que el primer `run_inference.py` no pague la compilación. Compila cada modelo
+# dos veces con un `ov.Core` nuevo, como un proceso recién arrancado: la primera
+# desde el IR (o desde la caché si ya estaba) y la segunda desde el blob, e imprime
+# una tabla con los tiempos en frío y en caliente.
+#
+# Uso:
+#   python src/prebuild_models.py --cache_dir ../miwav2lipv6/cache/ov_models \
+#       --models ../miwav2lipv6/models/face_detection.xml ../miwav2lipv6/models/wav2lip.xml --devices CPU
+
+import argparse
+import os
+import sys
+
+import openvino as ov
+
+from model_cache import PRECISION_HINT, ModelCache
+from model_registry import ModelRegistry
+from model_variants import VariantCatalog
+
+DEFAULT_MODELS = [
+    os.path.abspath(p)
+    for p in (
+        "../miwav2lipv6/models/face_detection.xml",
+        "../miwav2lipv6/models/face_detection_u8.xml",
+        "../miwav2lipv6/models/wav2lip.xml",
+        "../miwav2lipv6/models/wav2lip_fused.xml",
+    )
+]
+DEFAULT_CACHE_DIR = os.path.abspath("../miwav2lipv6/cache/ov_models")
+
+
+def compile_with_cache(model_cache, model_path, device, config):
+    """
+    Compila `model_path` con un `ov.Core` nuevo, como lo haría un proceso recién arrancado.
+
+    Returns:
+        CompiledModelEntry: Entrada compilada, con `compile_time` y `cache_state`.
+    """
+    return ModelRegistry(ov.Core(), model_cache=model_cache).get(model_path, device, config)
+
+
+def prebuild(cache_dir, models, devices=("CPU",), precisions=(None,)):
+    """
+    Compila cada combinación de modelo, dispositivo y precisión con la caché activada.
+
+    Returns:
+        list: Por combinación, tiempos de la primera compilación y de la compilación
+        desde la caché, con su estado ("cold"/"warm") y el tamaño de los blobs.
+    """
+    model_cache = ModelCache(cache_dir)
+    rows = []
+    for model_path in models:
+        for device in devices:
+            for precision in precisions:
+                config = {PRECISION_HINT: precision} if precision else {}
+                first = compile_with_cache(model_cache, model_path, device, config)
+                again = compile_with_cache(model_cache, model_path, device, config)
+                blob_bytes = sum(p.stat().st_size for p in first.cache_dir.glob("*.blob")) if first.cache_dir is not None else 0
+                rows.append(
+                    {
+                        "model_path": model_path,
+                        "device": device,
+                        "precision": precision or "default",
+                        "first_s": first.compile_time,
+                        "first_state": first.cache_state,
+                        "cached_s": again.compile_time,
+                        "cached_state": again.cache_state,
+                        "blob_bytes": blob_bytes,
+                    }
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila los modelos y guarda los blobs en la caché de modelos.")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--models", nargs="+", default=None, help="Modelos IR .xml (por defecto, los de models/ que existan).")
+    parser.add_argument("--devices", nargs="+", default=["CPU"])
+    parser.add_argument("--precisions", nargs="+", default=None, help="Valores de INFERENCE_PRECISION_HINT (p. ej. f32 bf16); por defecto, el del dispositivo.")
+    parser.add_argument("--variants", action="store_true", help="Compila también las variantes de forma estática de models/variants (ver model_variants.py).")
+    args = parser.parse_args()
+
+    models = args.models or [p for p in DEFAULT_MODELS if os.path.exists(p)]
+    if args.variants:
+        models_dirs = dict.fromkeys(os.path.dirname(os.path.abspath(p)) for p in models)
+        models += [os.path.join(d, name) for d in models_dirs for name in sorted(VariantCatalog(d).variants())]
+    if not models:
+        print("No hay modelos que compilar; convierte primero los modelos con convert_models.py o indica --models.")
+        sys.exit(1)
+
+    rows = prebuild(args.cache_dir, models, args.devices, args.precisions or [None])
+    print("\n| modelo | dispositivo | precisión | primera (s) | estado | desde caché (s) | estado | blobs (MB) |")
+    print("|---|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(
+            "| {} | {} | {} | {:.2f} | {} | {:.2f} | {} | {:.1f} |".format(
+                os.path.basename(r["model_path"]),
+                r["device"],
+                r["precision"],
+                r["first_s"],
+                r["first_state"] or "-",
+                r["cached_s"],
+                r["cached_state"] or "-",
+                r["blob_bytes"] / 2**20,
+            )
+        )
+    if any(r["cached_state"] != "warm" for r in rows):
+        print("Aviso: algún modelo no se cargó desde la caché (¿el dispositivo no admite EXPORT_IMPORT?).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# profiling.py
+#
+# Instrumentación ligera por etapas del render. Cada tramo ("span") guarda su
+# tiempo de pared, los fotogramas que procesó y, en modo "memory", los bytes
+# asignados según `tracemalloc`. Se exporta como traza JSON de Chrome
+# (chrome://tracing o https://ui.perfetto.dev) y como archivo de texto de
+# Prometheus (formato del textfile collector de node_exporter).
+#
+# Se activa con la variable de entorno VIDEO_AVATAR_PROFILE ("1"/"time" o
+# "memory") o llamando a `enable`. Desactivado, `span` devuelve un contexto vacío
+# compartido y `profile_iter` devuelve el iterable tal cual, así que el coste es
+# una llamada a función.
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+PROFILE_ENV = "VIDEO_AVATAR_PROFILE"
+PROFILE_DIR_ENV = "VIDEO_AVATAR_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+PROFILE_MODES = ("time", "memory")
+METRIC_PREFIX = "videoavatar_span"
+
+
+class _NullSpan:
+    # Contexto vacío que se devuelve con el perfilado desactivado
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_frames(self, frames):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Tramo medido; se usa como contexto (ver `span`).
+
+    Attributes:
+        name (str): Etapa, con puntos para las subetapas (p. ej. "face_detection.infer").
+        frames (int): Fotogramas procesados (se pueden sumar dentro con `add_frames`).
+    """
+
+    __slots__ = ("profiler", "name", "frames", "start", "_bytes")
+
+    def __init__(self, profiler, name, frames=0):
+        self.profiler = profiler
+        self.name = name
+        self.frames = frames
+
+    def add_frames(self, frames):
+        self.frames += frames
+
+    def discard(self):
+        """
+        No registra el tramo al salir (p. ej. el `next()` que solo agota un iterador).
+        """
+        self.profiler = None
+
+    def __enter__(self):
+        self._bytes = tracemalloc.get_traced_memory()[0] if self.profiler.mode == "memory" else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is None:
+            return False
+        end = time.perf_counter()
+        allocated = tracemalloc.get_traced_memory()[0] - self._bytes if self._bytes is not None else None
+        self.profiler._add(self.name, self.start, end, self.frames, allocated)
+        return False
+
+
+class Profiler:
+    """
+    Recoge los tramos de todos los hilos del proceso.
+
+    Args:
+        mode (str): None (desactivado), "time" o "memory". En modo "memory" se
+            activa `tracemalloc` (más lento) y cada tramo guarda la variación neta de
+            la memoria de Python durante el tramo; como `tracemalloc` es global,
+            incluye lo que asignen a la vez otros hilos.
+    """
+
+    def __init__(self, mode=None):
+        self.mode = None
+        self.origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "frames": 0, "bytes": 0})
+        self._lock = threading.Lock()
+        self.enable(mode)
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def enable(self, mode="time"):
+        if mode not in (None,) + PROFILE_MODES:
+            raise ValueError("Modo de perfilado desconocido: {} (disponibles: {})".format(mode, ", ".join(PROFILE_MODES)))
+        if mode == "memory" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.mode = mode
+
+    def disable(self):
+        self.mode = None
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+        self.clear_trace()
+
+    def clear_trace(self):
+        """
+        Descarta los tramos de la traza pero conserva los totales de las métricas, que
+        siguen acumulándose entre renders (son contadores de Prometheus).
+        """
+        with self._lock:
+            self._events = []
+            self._threads = {}
+            self.origin = time.perf_counter()
+
+    def span(self, name, frames=0):
+        if self.mode is None:
+            return _NULL_SPAN
+        return Span(self, name, frames)
+
+    def record(self, name, seconds, frames=0, end=None):
+        """
+        Registra un tramo ya medido (p. ej. la latencia de un infer request de OpenVINO).
+
+        Args:
+            name (str): Etapa.
+            seconds (float): Duración.
+            frames (int): Fotogramas procesados.
+            end (float): Fin del tramo en `time.perf_counter()` (por defecto, ahora).
+        """
+        if self.mode is None:
+            return
+        end = time.perf_counter() if end is None else end
+        self._add(name, end - seconds, end, frames, None)
+
+    def _add(self, name, start, end, frames, allocated):
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads[thread.native_id] = thread.name
+            self._events.append((name, start, end, frames, allocated, thread.native_id))
+            entry = self._totals[name]
+            entry["calls"] += 1
+            entry["seconds"] += end - start
+            entry["frames"] += frames
+            entry["bytes"] += allocated or 0
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def summary(self):
+        """
+        Agregado por etapa desde el último `reset`: llamadas, segundos, fotogramas,
+        fotogramas por segundo y bytes.
+
+        Returns:
+            dict: Etapa -> métricas, ordenado por tiempo total descendente.
+        """
+        with self._lock:
+            totals = {name: dict(entry) for name, entry in self._totals.items()}
+        for entry in totals.values():
+            entry["fps"] = entry["frames"] / entry["seconds"] if entry["seconds"] > 0 else 0.0
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def chrome_trace(self):
+        """
+        Traza en formato "Trace Event" de Chrome: un evento completo ("X") por tramo.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events, threads = list(self._events), dict(self._threads)
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in threads.items()]
+        for name, start, end, frames, allocated, tid in events:
+            args = {"frames": frames}
+            if frames and end > start:
+                args["fps"] = frames / (end - start)
+            if allocated is not None:
+                args["bytes"] = allocated
+            trace.append(
+                {
+                    "name": name,
+                    "cat": name.split(".")[0],
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def prometheus_text(self):
+        """
+        Métricas agregadas por etapa en el formato de texto de Prometheus.
+        """
+        metrics = (
+            ("seconds_total", "counter", "Tiempo de pared acumulado por etapa.", "seconds"),
+            ("calls_total", "counter", "Número de tramos por etapa.", "calls"),
+            ("frames_total", "counter", "Fotogramas procesados por etapa.", "frames"),
+            ("frames_per_second", "gauge", "Fotogramas por segundo de pared dentro de la etapa.", "fps"),
+            ("allocated_bytes_total", "counter", "Variación neta de memoria de Python acumulada (modo memory).", "bytes"),
+        )
+        summary = self.summary()
+        lines = []
+        for suffix, kind, help_text, key in metrics:
+            if key == "bytes" and self.mode != "memory":
+                continue
+            metric = "{}_{}".format(METRIC_PREFIX, suffix)
+            lines.append("# HELP {} {}".format(metric, help_text))
+            lines.append("# TYPE {} {}".format(metric, kind))
+            for name, entry in summary.items():
+                lines.append('{}{{span="{}"}} {}'.format(metric, name.replace("\\", "\\\\").replace('"', '\\"'), repr(float(entry[key]))))
+        return "\n".join(lines) + "\n"
+
+    def export(self, out_dir=None, tag=None, metrics=True):
+        """
+        Escribe la traza de Chrome (`trace_<tag>.json`) y las métricas (`videoavatar.prom`) en `out_dir`.
+
+        Args:
+            out_dir (str): Directorio de salida (por defecto, `VIDEO_AVATAR_PROFILE_DIR` o "profiles").
+            tag (str): Sufijo de la traza (por defecto, la fecha y hora y el PID).
+            metrics (bool): False para escribir solo la traza (p. ej. desde los procesos de un render repartido).
+
+        Returns:
+            tuple: Rutas `(traza, métricas)`; las métricas son None si no se escribieron.
+        """
+        out_dir = Path(out_dir or os.environ.get(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        if tag is None:
+            now = time.time()
+            tag = "{}.{:03d}_{}".format(time.strftime("%Y%m%d-%H%M%S", time.localtime(now)), int(now % 1 * 1000), os.getpid())
+        trace_path = out_dir / "trace_{}.json".format(tag)
+        metrics_path = out_dir / "videoavatar.prom"
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        if not metrics:
+            return trace_path, None
+        # El textfile collector lee el archivo en cualquier momento: se sustituye de forma atómica
+        tmp_path = metrics_path.with_suffix(".prom.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, metrics_path)
+        return trace_path, metrics_path
+
+
+def _mode_from_env():
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "off"):
+        return None
+    return "memory" if value == "memory" else "time"
+
+
+_profiler = Profiler(_mode_from_env())
+
+
+def get_profiler():
+    """
+    Devuelve el perfilador del proceso.
+    """
+    return _profiler
+
+
+def enable(mode="time"):
+    """
+    Activa el perfilado del proceso ("time" o "memory"; None lo desactiva).
+
+    También fija `VIDEO_AVATAR_PROFILE` para que lo hereden los procesos hijos.
+    """
+    _profiler.enable(mode)
+    if mode is None:
+        os.environ.pop(PROFILE_ENV, None)
+    else:
+        os.environ[PROFILE_ENV] = mode
+
+
+def enabled():
+    return _profiler.mode is not None
+
+
+def span(name, frames=0):
+    """
+    Contexto que mide un tramo de la etapa `name`.
+
+    Ejemplo:
+        with span("face_detection.infer", frames=len(images)):
+            results = net(inputs)
+    """
+    if _profiler.mode is None:
+        return _NULL_SPAN
+    return Span(_profiler, name, frames)
+
+
+def record(name, seconds, frames=0, end=None):
+    """
+    Registra un tramo ya medido (ver `Profiler.record`).
+    """
+    if _profiler.mode is not None:
+        _profiler.record(name, seconds, frames, end)
+
+
+def profile_job(name):
+    """
+    Decorador para un punto de entrada: con el perfilado activo, mide la llamada
+    completa como el tramo `name` y exporta la traza y las métricas al terminar.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _profiler.mode is None:
+                return fn(*args, **kwargs)
+            try:
+                with Span(_profiler, name):
+                    return fn(*args, **kwargs)
+            finally:
+                # También si falla: sus tramos no deben acabar en la traza del siguiente trabajo
+                trace_path, metrics_path = _profiler.export()
+                # En un servidor, cada render tiene su traza; las métricas siguen acumulando
+                _profiler.clear_trace()
+                print("Perfil: {} y {}".format(trace_path, metrics_path))
+
+        return wrapper
+
+    return decorator
+
+
+def profile_iter(iterable, name):
+    """
+    Mide cada `next()` de `iterable` como un tramo de un fotograma (p. ej. la decodificación).
+
+    Con el perfilado desactivado devuelve `iterable` sin envolver.
+    """
+    if _profiler.mode is None:
+        return iterable
+    return _profiled(iterable, name)
+
+
+def _profiled(iterable, name):
+    iterator = iter(iterable)
+    try:
+        while True:
+            with Span(_profiler, name, 1) as current:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    current.discard()
+                    return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,97 @@
+# render_cache.py
+
+import hashlib
+import os
+from pathlib import Path
+
+from cache_utils import LRUDiskCache, atomic_copy_file, hash_audio, hash_file, hash_model, hash_params
+
+# Presupuesto por defecto de la caché de renders (cada entrada es un MP4 terminado)
+DEFAULT_RENDER_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+PACK_FILES = ("meta.json", "frames.npy", "faces.npy", "coords.npy")
+
+
+def hash_avatar_pack(pack_dir):
+    """
+    Hash de un avatar pack: combina sus arrays y `meta.json`.
+    """
+    return hashlib.sha256("".join(hash_file(Path(pack_dir) / name) for name in PACK_FILES).encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    Caché persistente de videos ya renderizados.
+
+    La clave combina el hash del video (o del avatar pack), el de las muestras
+    del audio, los de los modelos y todos los parámetros que afectan al
+    resultado. Cada entrada es el MP4 terminado, de modo que un acierto solo
+    copia el archivo a `outfile` en lugar de volver a renderizar. Usa
+    `LRUDiskCache`, así que el presupuesto, la expulsión LRU y los contadores de
+    aciertos y fallos se conservan entre reinicios.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_RENDER_CACHE_BYTES):
+        self.cache = LRUDiskCache(cache_dir, max_bytes)
+        self._file_hashes = {}
+
+    def _hash(self, path, hasher, stat_path=None):
+        # Los hashes se recuerdan por tamaño y fecha de modificación: un archivo modificado se vuelve a hashear
+        stat = os.stat(stat_path or path)
+        memo_key = (str(path), hasher.__name__, stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._file_hashes:
+            self._file_hashes[memo_key] = hasher(path)
+        return self._file_hashes[memo_key]
+
+    def make_key(self, video_path, audio_path, detector_path, wav2lip_path, **params):
+        """
+        Construye la clave de caché.
+
+        Args:
+            video_path (str): Video del avatar o directorio de un avatar pack.
+            audio_path (str): Audio de entrada.
+            detector_path (str): Ruta del modelo `face_detection.xml`.
+            wav2lip_path (str): Ruta del modelo de Wav2Lip.
+            **params: Parámetros que afectan al render (`pads`, `box`, `static`,
+                `resize_factor`, preset de codificación, ...).
+
+        Returns:
+            str: Clave hexadecimal.
+        """
+        if os.path.isdir(video_path):
+            # `write_avatar_pack` sustituye el directorio entero, así que basta con mirar `meta.json`
+            video = self._hash(video_path, hash_avatar_pack, stat_path=os.path.join(video_path, PACK_FILES[0]))
+        else:
+            video = self._hash(video_path, hash_file)
+        return hash_params(
+            video=video,
+            audio=self._hash(audio_path, hash_audio),
+            detector=self._hash(detector_path, hash_model),
+            wav2lip=self._hash(wav2lip_path, hash_model),
+            **params,
+        )
+
+    def load(self, key, outfile):
+        """
+        Copia el render guardado para `key` a `outfile`.
+
+        Returns:
+            Path: `outfile`, o None si no está en caché.
+        """
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        try:
+            atomic_copy_file(path, outfile)
+        except FileNotFoundError:
+            # Otro proceso lo ha expulsado entre la consulta y la copia
+            return None
+        return Path(outfile)
+
+    def store(self, key, video_path):
+        """
+        Guarda el video terminado `video_path` como entrada `key`.
+        """
+        return self.cache.put_file(key, video_path, suffix=Path(video_path).suffix or ".mp4")
+
+    def stats(self):
+        return self.cache.stats()
@@ -1,21 +1,42 @@
+import argparse
 import os
-from ov_inference import ov_inference
+import sys
+from ov_inference import ov_inference, select_model_variant
+from avatar_pack import AvatarPack
+from face_track_cache import FaceTrackCache
+from render_cache import RenderCache
+from model_registry import get_registry, preload_models, set_model_cache
+from video_encoder import DEFAULT_PRESET, ENCODER_PRESETS
+from segment_writer import SEGMENT_FORMATS
+from voice_activity import DEFAULT_SILENCE_THRESHOLD_DB
+from mel_stream import iter_pcm_blocks
+import profiling
 import soundfile as sf
 import cv2
 
-def verificar_archivos(video_path, audio_path):
+def verificar_archivos(video_path, audio_path, avatar_pack=None):
     """
     Verifica que los archivos de video y audio existen y son legibles.
 
     Args:
         video_path (str): Ruta del archivo de video.
         audio_path (str): Ruta del archivo de audio.
+        avatar_pack (str): Directorio del avatar pack; si se indica, se verifica el
+            pack en lugar del video, que no hace falta.
 
     Returns:
         bool: True si ambos archivos son legibles, False en caso contrario.
     """
+    if avatar_pack is not None:
+        # Verificar el avatar pack (meta.json y arrays)
+        try:
+            AvatarPack(avatar_pack)
+        except (OSError, ValueError) as e:
+            print(f"Error: No se puede leer el avatar pack en {avatar_pack}: {e}")
+            return False
+        print(f"Avatar pack {avatar_pack} está accesible.")
     # Verificar el archivo de video
-    if not os.path.exists(video_path):
+    elif not os.path.exists(video_path):
         print(f"Error: El archivo de video no existe en la ruta {video_path}")
         return False
     else:
@@ -28,6 +49,10 @@ def verificar_archivos(video_path, audio_path):
             print(f"Archivo de video {video_path} está accesible.")
         cap.release()
 
+    # El audio llega por la entrada estándar a medida que se genera
+    if audio_path == "-":
+        return True
+
     # Verificar el archivo de audio
     if not os.path.exists(audio_path):
         print(f"Error: El archivo de audio no existe en la ruta {audio_path}")
@@ -49,19 +74,110 @@ video_path = os.path.abspath("../miwav2lipv6/assets/video/data_video_sun.mp4")
 #audio_path = os.path.abspath("../miwav2lipv6/assets/audio/grabacion_gradio.wav")
 audio_path = os.path.abspath("../miwav2lipv6/assets/audio/audio.wav")
 face_detection_path = os.path.abspath("../miwav2lipv6/models/face_detection.xml")
+# Variante con el preprocesado dentro del grafo (generada por convert_models.py)
+face_detection_u8_path = os.path.abspath("../miwav2lipv6/models/face_detection_u8.xml")
+if os.path.exists(face_detection_u8_path):
+    face_detection_path = face_detection_u8_path
 wav2lip_path = os.path.abspath("../miwav2lipv6/models/wav2lip.xml")
+# Variante con enmascarado y normalización dentro del grafo (generada por convert_models.py)
+wav2lip_fused_path = os.path.abspath("../miwav2lipv6/models/wav2lip_fused.xml")
+if os.path.exists(wav2lip_fused_path):
+    wav2lip_path = wav2lip_fused_path
 outfile = os.path.abspath("../miwav2lipv6/results/result_voice.mp4")
+face_track_cache_dir = os.path.abspath("../miwav2lipv6/cache/face_tracks")
+model_cache_dir = os.path.abspath("../miwav2lipv6/cache/ov_models")
+
+parser = argparse.ArgumentParser(description="Sincroniza los labios del video con el audio usando Wav2Lip y OpenVINO.")
+parser.add_argument("--video", default=video_path, help="Ruta del video del avatar.")
+parser.add_argument("--audio", default=audio_path, help="Ruta del archivo de audio ('-' para leer PCM s16le mono a 16 kHz de la entrada estándar mientras se genera).")
+parser.add_argument("--outfile", default=outfile, help="Ruta del video resultante.")
+parser.add_argument("--resize_factor", type=int, default=2, help="Factor de reducción de resolución del video.")
+parser.add_argument("--keyframe_interval", type=int, default=1, help="Ejecuta el detector de caras solo cada N fotogramas (1 = todos).")
+parser.add_argument("--redetect_threshold", type=float, default=0.1, help="Deriva de la cara (0-1) a partir de la cual se vuelve a detectar entre fotogramas clave.")
+parser.add_argument("--det_long_edge", type=int, default=None, help="Lado largo (px) de los fotogramas que recibe el detector de caras; las cajas se reescalan a resolución completa.")
+parser.add_argument("--face_track_cache", default=face_track_cache_dir, help="Directorio de la caché de pistas de cara (cadena vacía para desactivarla).")
+parser.add_argument("--face_track_cache_mb", type=int, default=256, help="Tamaño máximo de la caché de pistas de cara en MB.")
+parser.add_argument("--render_cache", default="", help="Directorio de la caché de videos renderizados; una petición idéntica devuelve el video guardado (vacío = desactivada).")
+parser.add_argument("--render_cache_mb", type=int, default=2048, help="Tamaño máximo de la caché de videos renderizados en MB.")
+parser.add_argument("--model_cache", default=model_cache_dir, help="Directorio de la caché de modelos compilados de OpenVINO (cadena vacía para desactivarla); se llena de antemano con prebuild_models.py.")
+parser.add_argument("--infer_jobs", type=int, default=2, help="Lotes de Wav2Lip en vuelo a la vez en OpenVINO.")
+parser.add_argument("--stream_frames", action="store_true", help="Decodifica el video bajo demanda en lugar de cargarlo entero; la memoria no crece con la duración del video.")
+parser.add_argument("--frame_queue_size", type=int, default=16, help="Fotogramas decodificados por adelantado en modo --stream_frames.")
+parser.add_argument("--encoder_preset", choices=sorted(ENCODER_PRESETS), default=DEFAULT_PRESET, help="Perfil de codificación del video de salida (velocidad/tamaño).")
+parser.add_argument("--copy_audio", action="store_true", help="Copia el audio sin recodificarlo (el contenedor debe admitir su códec).")
+parser.add_argument("--temp_dir", default=None, help="Directorio para los archivos temporales de la codificación.")
+parser.add_argument("--skip_silence", action="store_true", help="No ejecuta Wav2Lip en los fragmentos de silencio; reutiliza el fotograma original.")
+parser.add_argument("--silence_threshold_db", type=float, default=DEFAULT_SILENCE_THRESHOLD_DB, help="Nivel (dB, -100 = silencio digital) por debajo del cual un fragmento de audio es silencio.")
+parser.add_argument("--segment_dir", default=None, help="Escribe la salida en segmentos reproducibles en este directorio en lugar de un único video.")
+parser.add_argument("--segment_seconds", type=float, default=2.0, help="Duración de cada segmento en modo --segment_dir.")
+parser.add_argument("--segment_format", choices=sorted(SEGMENT_FORMATS), default="hls", help="hls: segmentos .ts con lista index.m3u8; mp4: segmentos .mp4 independientes.")
+parser.add_argument("--avatar_pack", default=None, help="Directorio de un avatar pack (ver avatar_pack.py); evita decodificar el video y detectar caras.")
+parser.add_argument("--shards", type=int, default=1, help="Reparte el render en N procesos con tramos contiguos de fotogramas (1 = un solo proceso).")
+parser.add_argument("--shard_threads", type=int, default=None, help="Hilos de inferencia por proceso en modo --shards (por defecto, las CPUs disponibles entre N).")
+parser.add_argument("--no_model_variants", action="store_true", help="Usa los modelos tal cual, sin elegir entre las variantes de forma estática medidas con model_variants.py.")
+parser.add_argument("--profile", choices=profiling.PROFILE_MODES, default=None, help="Mide cada etapa y exporta una traza de Chrome y métricas de Prometheus (memory: también los bytes asignados, más lento). Equivale a VIDEO_AVATAR_PROFILE.")
+parser.add_argument("--profile_dir", default=None, help="Directorio de las trazas y las métricas (por defecto, VIDEO_AVATAR_PROFILE_DIR o 'profiles').")
 
-# Verificar archivos antes de llamar a ov_inference
-if verificar_archivos(video_path, audio_path):
-    ov_inference(
-        video_path,
-        audio_path,
-        face_detection_path=face_detection_path,
-        wav2lip_path=wav2lip_path,
-        inference_device="CPU",
-        outfile=outfile,
-        resize_factor = 2,
-    )
-else:
-    print("No se pudo proceder con la inferencia debido a problemas con los archivos.")
+# Los procesos de --shards importan este script al arrancar (spawn); solo el principal ejecuta el render
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.profile_dir:
+        # Por el entorno, para que también lo usen los procesos de --shards
+        os.environ[profiling.PROFILE_DIR_ENV] = args.profile_dir
+    if args.profile:
+        profiling.enable(args.profile)
+    # Antes de la precarga, para que el detector y Wav2Lip se importen del blob compilado
+    set_model_cache(args.model_cache or None)
+
+    face_track_cache = FaceTrackCache(args.face_track_cache, args.face_track_cache_mb * 1024 * 1024) if args.face_track_cache else None
+    render_cache = RenderCache(args.render_cache, args.render_cache_mb * 1024 * 1024) if args.render_cache else None
+
+    # Verificar archivos antes de llamar a ov_inference
+    if verificar_archivos(args.video, args.audio, args.avatar_pack):
+        # Compila y calienta los modelos mientras se decodifica el video
+        if args.shards > 1:
+            # Cada proceso compila su propio Wav2Lip; aquí solo hace falta el detector
+            get_registry().preload(face_detection_path, "CPU", warmup_shapes={})
+        else:
+            # Sin conocer aún la duración del audio, la variante con mejor rendimiento por fotograma
+            preload_wav2lip_path = wav2lip_path if args.no_model_variants else select_model_variant(wav2lip_path, "CPU")[0]
+            preload_models(face_detection_path, preload_wav2lip_path, device="CPU")
+        ov_inference(
+            args.video,
+            None if args.audio == "-" else args.audio,
+            face_detection_path=face_detection_path,
+            wav2lip_path=wav2lip_path,
+            inference_device="CPU",
+            outfile=args.outfile,
+            resize_factor=args.resize_factor,
+            keyframe_interval=args.keyframe_interval,
+            redetect_threshold=args.redetect_threshold,
+            det_long_edge=args.det_long_edge,
+            face_track_cache=face_track_cache,
+            infer_jobs=args.infer_jobs,
+            avatar_pack=args.avatar_pack,
+            stream_frames=args.stream_frames,
+            frame_queue_size=args.frame_queue_size,
+            encoder_preset=args.encoder_preset,
+            copy_audio=args.copy_audio,
+            temp_dir=args.temp_dir,
+            silence_threshold_db=args.silence_threshold_db if args.skip_silence else None,
+            segment_dir=args.segment_dir,
+            segment_seconds=args.segment_seconds,
+            segment_format=args.segment_format,
+            audio_stream=iter_pcm_blocks(sys.stdin.buffer) if args.audio == "-" else None,
+            render_cache=render_cache,
+            shards=args.shards,
+            shard_threads=args.shard_threads,
+            select_variants=not args.no_model_variants,
+        )
+        if face_track_cache is not None:
+            print("Caché de pistas de cara:", face_track_cache.stats())
+        if render_cache is not None:
+            print("Caché de renders:", render_cache.stats())
+        for model_info in get_registry().stats():
+            cache = {"warm": " (desde la caché)", "cold": " (guardado en la caché)"}.get(model_info["cache"], "")
+            batch = " (lote fijo {})".format(model_info["static_batch"]) if model_info["static_batch"] else ""
+            print("Modelo {model_path}: {state}, compilación {compile_time:.2f} s".format(**model_info) + batch + cache)
+    else:
+        print("No se pudo proceder con la inferencia debido a problemas con los archivos.")
@@ -0,0 +1,184 @@
+# segment_writer.py
+
+import math
+import time
+from pathlib import Path
+
+from cache_utils import atomic_write_bytes
+from video_encoder import FFmpegPipeWriter
+
+# Formatos de segmento: extensión y argumentos del contenedor
+SEGMENT_FORMATS = {
+    # MPEG-TS para HLS: los segmentos se concatenan sin cortes gracias a `output_ts_offset`
+    "hls": (".ts", ["-f", "mpegts"]),
+    # MP4 independientes, cada uno reproducible por separado
+    "mp4": (".mp4", ["-movflags", "+faststart"]),
+}
+PLAYLIST_NAME = "index.m3u8"
+
+
+class SegmentedWriter:
+    """
+    Escribe el video en segmentos de `segment_seconds` que se pueden reproducir en
+    cuanto se cierran, sin esperar al resto del render.
+
+    Cada segmento se codifica con su propio `FFmpegPipeWriter` junto con el tramo
+    de audio correspondiente. En formato "hls" se mantiene además una lista de
+    reproducción `index.m3u8` que se reescribe (de forma atómica) tras cada segmento.
+
+    Args:
+        segment_dir (str): Directorio de los segmentos y de la lista de reproducción.
+        fps (float): Fotogramas por segundo.
+        frame_size (tuple): `(ancho, alto)` de los fotogramas.
+        audio_path (str): Audio completo; cada segmento mezcla su tramo.
+        segment_seconds (float): Duración de cada segmento.
+        segment_format (str): Clave de `SEGMENT_FORMATS`.
+        preset (str): Preset de `ENCODER_PRESETS`.
+        on_segment (callable): Se llama con el dict de cada segmento en cuanto está listo.
+        playlist_size (int): Segmentos en la lista HLS (0 = todos; si no, ventana deslizante).
+        start_time (float): Referencia de `time.perf_counter()` para medir el tiempo
+            hasta el primer segmento (por defecto, la creación del escritor).
+        audio_input_args (list): Argumentos de entrada del audio (p. ej. formato de un PCM crudo).
+        audio_ready (callable): Si el audio aún se está escribiendo, `audio_ready(t)` espera a
+            que cubra hasta el segundo `t`; se llama antes de abrir cada segmento.
+    """
+
+    def __init__(
+        self,
+        segment_dir,
+        fps,
+        frame_size,
+        audio_path=None,
+        segment_seconds=2.0,
+        segment_format="hls",
+        preset="fast",
+        on_segment=None,
+        playlist_size=0,
+        start_time=None,
+        audio_input_args=None,
+        audio_ready=None,
+    ):
+        if segment_format not in SEGMENT_FORMATS:
+            raise ValueError("Formato de segmento desconocido: {} (disponibles: {})".format(segment_format, ", ".join(SEGMENT_FORMATS)))
+        self.segment_dir = Path(segment_dir)
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.frame_size = frame_size
+        self.audio_path = audio_path
+        self.segment_format = segment_format
+        self.preset = preset
+        self.on_segment = on_segment
+        self.playlist_size = playlist_size
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.audio_input_args = audio_input_args
+        self.audio_ready = audio_ready
+        self.frames_per_segment = max(1, round(segment_seconds * fps))
+        self.frames_written = 0
+        self.segments = []
+        self._current = None
+        self._current_frames = 0
+
+    @property
+    def playlist_path(self):
+        return self.segment_dir / PLAYLIST_NAME
+
+    @property
+    def time_to_first_segment(self):
+        """
+        Segundos desde `start_time` hasta que el primer segmento estuvo listo (None si aún no hay ninguno).
+        """
+        return self.segments[0]["ready_s"] if self.segments else None
+
+    def _open_segment(self):
+        index = len(self.segments)
+        suffix, output_args = SEGMENT_FORMATS[self.segment_format]
+        start = index * self.frames_per_segment / self.fps
+        if self.segment_format == "hls":
+            output_args = output_args + ["-output_ts_offset", "{:.6f}".format(start)]
+        if self.audio_ready is not None:
+            # ffmpeg lee el audio al abrir el segmento, así que todo su tramo tiene que estar ya en disco
+            self.audio_ready(start + self.frames_per_segment / self.fps)
+        self._current = FFmpegPipeWriter(
+            self.segment_dir / "segment_{:05d}{}".format(index, suffix),
+            self.fps,
+            self.frame_size,
+            self.audio_path,
+            self.preset,
+            temp_dir=self.segment_dir,
+            audio_start=start,
+            output_args=output_args,
+            audio_input_args=self.audio_input_args,
+        )
+        self._current_frames = 0
+
+    def _close_segment(self):
+        path = self._current.close()
+        index = len(self.segments)
+        segment = {
+            "index": index,
+            "path": str(path),
+            "start": index * self.frames_per_segment / self.fps,
+            "duration": self._current_frames / self.fps,
+            "frames": self._current_frames,
+            "ready_s": time.perf_counter() - self.start_time,
+        }
+        self.segments.append(segment)
+        self._current = None
+        if self.segment_format == "hls":
+            self._write_playlist(ended=False)
+        if self.on_segment is not None:
+            self.on_segment(segment)
+
+    def _write_playlist(self, ended):
+        segments = self.segments[-self.playlist_size :] if self.playlist_size else self.segments
+        target = math.ceil(max((s["duration"] for s in self.segments), default=1))
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:{}".format(target)]
+        lines.append("#EXT-X-MEDIA-SEQUENCE:{}".format(segments[0]["index"] if segments else 0))
+        if not self.playlist_size:
+            lines.append("#EXT-X-PLAYLIST-TYPE:EVENT")
+        for segment in segments:
+            lines.append("#EXTINF:{:.3f},".format(segment["duration"]))
+            lines.append(Path(segment["path"]).name)
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+        atomic_write_bytes(self.playlist_path, ("\n".join(lines) + "\n").encode("utf-8"))
+
+    def write(self, frame):
+        """
+        Añade un fotograma BGR u8; cierra el segmento en curso al completarse.
+        """
+        if self._current is None:
+            self._open_segment()
+        self._current.write(frame)
+        self._current_frames += 1
+        self.frames_written += 1
+        if self._current_frames == self.frames_per_segment:
+            self._close_segment()
+
+    def close(self):
+        """
+        Cierra el último segmento (aunque esté incompleto) y marca el final de la lista HLS.
+
+        Returns:
+            Path: Lista de reproducción (HLS) o directorio de los segmentos (MP4).
+        """
+        if self._current is not None:
+            self._close_segment()
+        if self.segment_format == "hls":
+            self._write_playlist(ended=True)
+            return self.playlist_path
+        return self.segment_dir
+
+    def abort(self):
+        if self._current is not None:
+            self._current.abort()
+            self._current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
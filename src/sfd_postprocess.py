@@ -0,0 +1,184 @@
+# sfd_postprocess.py
+
+from functools import lru_cache
+
+import numpy as np
+
+# Parámetros de decodificación de S3FD (idénticos a los de `ov_inference.decode`)
+SFD_VARIANCES = (0.1, 0.2)
+SFD_SCORE_THRESHOLD = 0.05
+SFD_NUM_STRIDES = 6
+
+
+@lru_cache(maxsize=32)
+def anchor_grid(feature_shapes):
+    """
+    Precalcula las anclas de S3FD para un conjunto de tamaños de mapa de características.
+
+    El resultado se guarda en caché por forma de entrada, de modo que solo se calcula
+    una vez por resolución de video.
+
+    Args:
+        feature_shapes (tuple): Tupla de `(FH, FW)` por cada stride (4, 8, ..., 128).
+
+    Returns:
+        list: Por cada stride, un array `(FH * FW, 4)` float32 con `(cx, cy, w, h)`.
+    """
+    grids = []
+    for i, (fh, fw) in enumerate(feature_shapes):
+        stride = 2 ** (i + 2)
+        cy, cx = np.meshgrid(
+            stride / 2 + np.arange(fh) * stride,
+            stride / 2 + np.arange(fw) * stride,
+            indexing="ij",
+        )
+        grid = np.empty((fh * fw, 4), dtype=np.float32)
+        grid[:, 0] = cx.reshape(-1)
+        grid[:, 1] = cy.reshape(-1)
+        grid[:, 2:] = stride * 4
+        grid.setflags(write=False)
+        grids.append(grid)
+    return grids
+
+
+def face_scores(ocls):
+    """
+    Probabilidad de "cara" de la salida de clasificación de S3FD (softmax de 2 clases).
+
+    Args:
+        ocls (np.ndarray): Logits `(B, 2, FH, FW)`.
+
+    Returns:
+        np.ndarray: Probabilidades `(B, FH, FW)` en float32.
+    """
+    ocls = np.asarray(ocls, dtype=np.float32)
+    m = np.maximum(ocls[:, 0], ocls[:, 1])
+    e0, e1 = np.exp(ocls[:, 0] - m), np.exp(ocls[:, 1] - m)
+    return e1 / (e0 + e1)
+
+
+def decode_boxes(loc, priors, variances=SFD_VARIANCES):
+    """
+    Versión NumPy de `ov_inference.batch_decode` para cualquier número de ejes iniciales.
+
+    Args:
+        loc (np.ndarray): Regresiones `(..., 4)`.
+        priors (np.ndarray): Anclas `(..., 4)` en forma `(cx, cy, w, h)`.
+        variances (tuple): Varianzas de las anclas.
+
+    Returns:
+        np.ndarray: Cajas `(..., 4)` en forma `(x1, y1, x2, y2)`.
+    """
+    boxes = np.concatenate(
+        (
+            priors[..., :2] + loc[..., :2] * variances[0] * priors[..., 2:],
+            priors[..., 2:] * np.exp(loc[..., 2:] * variances[1]),
+        ),
+        axis=-1,
+    )
+    boxes[..., :2] -= boxes[..., 2:] / 2
+    boxes[..., 2:] += boxes[..., :2]
+    return boxes
+
+
+def postprocess_batch(outputs, threshold=SFD_SCORE_THRESHOLD):
+    """
+    Decodifica de una vez todas las anclas candidatas de todos los strides y fotogramas.
+
+    Sustituye al bucle por ancla de `batch_detect`. Una posición es candidata si su
+    puntuación supera `threshold` en al menos un fotograma del lote; para cada
+    candidata se devuelven la caja y la puntuación de todos los fotogramas, igual
+    que antes. El bucle original repetía la fila cuando varias imágenes superaban
+    el umbral en la misma posición; esos duplicados los suprime siempre la NMS, por
+    lo que aquí se emiten una sola vez.
+
+    Args:
+        outputs (list): Las 12 salidas del detector, alternando clasificación
+            `(B, 2, FH, FW)` y regresión `(B, 4, FH, FW)`.
+        threshold (float): Puntuación mínima para considerar un ancla.
+
+    Returns:
+        np.ndarray: Array `(N, B, 5)` float32 con `(x1, y1, x2, y2, score)`, o
+        ceros `(1, B, 5)` si no hay candidatas.
+    """
+    ocls_list = [np.asarray(outputs[i * 2]) for i in range(SFD_NUM_STRIDES)]
+    oreg_list = [np.asarray(outputs[i * 2 + 1]) for i in range(SFD_NUM_STRIDES)]
+    batch = ocls_list[0].shape[0]
+    grids = anchor_grid(tuple(o.shape[2:] for o in ocls_list))
+
+    scores, locs, priors = [], [], []
+    for ocls, oreg, grid in zip(ocls_list, oreg_list, grids):
+        score = face_scores(ocls).reshape(batch, -1)
+        pos = np.flatnonzero((score > threshold).any(axis=0))
+        if pos.size == 0:
+            continue
+        scores.append(score[:, pos])
+        locs.append(oreg.reshape(batch, 4, -1)[:, :, pos])
+        priors.append(grid[pos])
+
+    if not scores:
+        return np.zeros((1, batch, 5))
+
+    scores = np.concatenate(scores, axis=1).T
+    locs = np.concatenate(locs, axis=2).transpose(2, 0, 1).astype(np.float32, copy=False)
+    priors = np.concatenate(priors, axis=0)[:, None, :]
+
+    bboxlist = np.empty(scores.shape + (5,), dtype=np.float32)
+    bboxlist[..., :4] = decode_boxes(locs, priors)
+    bboxlist[..., 4] = scores
+    return bboxlist
+
+
+def batch_nms(bboxlists, thresh=0.3, score_threshold=0.5, top_k=750):
+    """
+    NMS de todos los fotogramas de un lote a la vez sobre arrays rellenados.
+
+    Equivale a aplicar `ov_inference.nms` fotograma a fotograma y filtrar después
+    las cajas con puntuación `<= score_threshold`: como una caja descartada por
+    puntuación solo puede suprimir cajas de menor puntuación, el filtro se aplica
+    antes. Después se truncan las `top_k` mejores candidatas por fotograma y se
+    suprimen con una matriz de IoU `(N, K, K)`.
+
+    Args:
+        bboxlists (np.ndarray): Candidatas `(C, N, 5)` tal como las devuelve `postprocess_batch`.
+        thresh (float): IoU máxima permitida entre dos cajas conservadas.
+        score_threshold (float): Puntuación mínima (exclusiva) de una caja.
+        top_k (int): Número máximo de candidatas por fotograma antes de la supresión.
+
+    Returns:
+        tuple: `(dets, counts)`, donde `dets` es un array `(N, K, 5)` float32 con las
+        cajas conservadas ordenadas por puntuación descendente (rellenado con ceros)
+        y `counts` un array `(N,)` con el número de cajas válidas por fotograma.
+    """
+    dets = np.asarray(bboxlists, dtype=np.float32).transpose(1, 0, 2)
+    n_frames = dets.shape[0]
+
+    scores = np.where(dets[..., 4] > score_threshold, dets[..., 4], -np.inf)
+    k = int(min(top_k, np.max((scores > -np.inf).sum(axis=1), initial=0)))
+    if k == 0:
+        return np.zeros((n_frames, 1, 5), dtype=np.float32), np.zeros(n_frames, dtype=np.int64)
+
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    dets = np.take_along_axis(dets, order[..., None], axis=1)
+    valid = np.take_along_axis(scores, order, axis=1) > -np.inf
+
+    x1, y1, x2, y2 = dets[..., 0], dets[..., 1], dets[..., 2], dets[..., 3]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    w = np.maximum(0.0, np.minimum(x2[:, :, None], x2[:, None, :]) - np.maximum(x1[:, :, None], x1[:, None, :]) + 1)
+    h = np.maximum(0.0, np.minimum(y2[:, :, None], y2[:, None, :]) - np.maximum(y1[:, :, None], y1[:, None, :]) + 1)
+    inter = w * h
+    with np.errstate(divide="ignore", invalid="ignore"):
+        overlaps = ~(inter / (areas[:, :, None] + areas[:, None, :] - inter) <= thresh)
+    overlaps &= np.triu(np.ones((k, k), dtype=bool), 1)
+
+    keep = np.zeros_like(valid)
+    suppressed = ~valid
+    for j in range(k):
+        keep[:, j] = ~suppressed[:, j]
+        suppressed |= keep[:, j, None] & overlaps[:, j, :]
+
+    counts = keep.sum(axis=1)
+    rank = np.argsort(~keep, axis=1, kind="stable")[:, : max(int(counts.max()), 1)]
+    out = np.take_along_axis(dets, rank[..., None], axis=1)
+    out[np.arange(out.shape[1])[None, :] >= counts[:, None]] = 0
+    return out, counts
@@ -0,0 +1,315 @@
+# sharded_render.py
+#
+# Render repartido entre procesos: el rango de fotogramas se divide en tramos
+# contiguos, cada proceso compila su propio Wav2Lip con un número fijo de hilos y
+# codifica su tramo a un MP4 sin audio, y al final los tramos se concatenan sin
+# recodificar y se mezclan con el audio en una sola pasada de ffmpeg.
+
+import concurrent.futures
+import functools
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Argumentos de ffmpeg para leer la lista de tramos con el demuxer concat
+CONCAT_INPUT_ARGS = ["-f", "concat", "-safe", "0"]
+
+
+def available_cpus():
+    """
+    CPUs en las que puede ejecutarse el proceso (respeta la afinidad heredada, p. ej. en contenedores).
+
+    Returns:
+        list: Identificadores de CPU.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def shard_ranges(n_frames, n_shards, min_frames=1):
+    """
+    Divide los fotogramas `[0, n_frames)` en tramos contiguos de tamaño parecido.
+
+    Args:
+        n_frames (int): Número de fotogramas del render.
+        n_shards (int): Número de tramos deseado.
+        min_frames (int): Tamaño mínimo de un tramo (p. ej. un lote de Wav2Lip);
+            si no da para `n_shards` tramos se usan menos.
+
+    Returns:
+        list: Tuplas `(inicio, fin)` que cubren todos los fotogramas sin solaparse.
+    """
+    n_shards = max(1, min(n_shards, n_frames // max(1, min_frames)))
+    bounds = np.linspace(0, n_frames, n_shards + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def shard_cpus(cpus, n_shards):
+    """
+    Reparte las CPUs en `n_shards` grupos disjuntos y contiguos.
+
+    Con más tramos que CPUs cada tramo recibe una CPU, repartidas de forma circular.
+
+    Returns:
+        list: Una lista de CPUs por tramo.
+    """
+    if n_shards > len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(n_shards)]
+    return [group.tolist() for group in np.array_split(np.asarray(cpus), n_shards)]
+
+
+def render_shard(task):
+    """
+    Renderiza un tramo de fotogramas a un MP4 sin audio. Se ejecuta en un proceso del pool.
+
+    Args:
+        task (dict): Parámetros del tramo (ver `render_sharded`).
+
+    Returns:
+        dict: Índice, rango, fotogramas escritos y tiempos del tramo.
+    """
+    start_time = time.perf_counter()
+    if task["cpus"] is not None:
+        # El proceso y sus hijos (ffmpeg) quedan fijados a sus CPUs
+        os.sched_setaffinity(0, task["cpus"])
+
+    import cv2
+
+    import profiling
+    from lipsync_pipeline import LipSyncPipeline
+    from model_registry import get_registry
+    from ov_inference import compose_batch, is_fused_wav2lip, pack_datagen, stream_datagen
+    from video_encoder import DEFAULT_PRESET, FFmpegPipeWriter
+    from voice_activity import gate_batches
+
+    threads = task["threads"]
+    cv2.setNumThreads(threads)
+    # Un solo stream de inferencia con los hilos del tramo, para que los procesos no se pisen
+    config = {"INFERENCE_NUM_THREADS": threads, "NUM_STREAMS": 1} if task["device"] == "CPU" else {}
+    model = get_registry().get(task["wav2lip_path"], task["device"], config)
+    fused = is_fused_wav2lip(model)
+    compile_s = time.perf_counter() - start_time
+
+    mels = task["mels"]
+    first, stop = task["start"], task["stop"]
+    if task["avatar_pack"] is not None:
+        from avatar_pack import AvatarPack
+
+        gen = pack_datagen(AvatarPack(task["avatar_pack"]), mels, task["static"], task["img_size"], task["wav2lip_batch_size"], fused, first)
+    else:
+        from frame_source import VideoFrameSource
+
+        source = VideoFrameSource(task["video_path"], task["resize_factor"], task["rotate"], task["crop"])
+        gen = stream_datagen(
+            source, mels, task["coords"], task["static"], task["img_size"], task["wav2lip_batch_size"], fused, task["frame_queue_size"], first
+        )
+    gen = gate_batches(gen, task["weights"])
+
+    out = FFmpegPipeWriter(
+        task["shard_path"],
+        task["fps"],
+        task["frame_size"],
+        None,
+        task["encoder_preset"] or DEFAULT_PRESET,
+        temp_dir=task["temp_dir"],
+        output_args=["-threads", str(threads)],
+    )
+    with out:
+        pipeline = LipSyncPipeline(
+            model, fused, functools.partial(compose_batch, out), infer_jobs=1, queue_size=4 if task["avatar_pack"] is not None else 1
+        )
+        report = pipeline.run(gen, total=math.ceil(len(mels) / task["wav2lip_batch_size"]))
+    if out.frames_written != stop - first:
+        raise RuntimeError("El tramo {} escribió {} fotogramas, se esperaban {}".format(task["index"], out.frames_written, stop - first))
+    if profiling.enabled():
+        # Cada proceso deja su propia traza (con su PID); las métricas agregadas son las del proceso principal
+        profiling.get_profiler().export(tag="shard{}_{}".format(task["index"], os.getpid()), metrics=False)
+
+    return {
+        "index": task["index"],
+        "start": first,
+        "stop": stop,
+        "frames": out.frames_written,
+        "threads": threads,
+        "cpus": task["cpus"],
+        "compile_s": compile_s,
+        "pipeline_s": report["wall_s"],
+        "wall_s": time.perf_counter() - start_time,
+        "path": str(task["shard_path"]),
+    }
+
+
+def stitch_shards(shard_paths, audio_path, outfile, copy_audio=False, temp_dir=None, ffmpeg="ffmpeg"):
+    """
+    Concatena los tramos sin recodificar y mezcla el audio completo en la misma pasada.
+
+    Cada tramo empieza en un fotograma clave y contiene exactamente sus
+    fotogramas, así que la unión es exacta al fotograma.
+
+    Args:
+        shard_paths (list): MP4 sin audio, en orden.
+        audio_path (str): Audio del render completo.
+        outfile (str): Ruta del video final.
+        copy_audio (bool): Copia el flujo de audio sin recodificar.
+        temp_dir (str): Directorio para la lista de tramos y el archivo temporal.
+        ffmpeg (str): Ejecutable de ffmpeg.
+
+    Returns:
+        Path: Ruta del video final.
+    """
+    from video_encoder import mux_audio
+
+    fd, list_path = tempfile.mkstemp(dir=temp_dir, prefix="shards_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for path in shard_paths:
+                # Comillas simples escapadas según la sintaxis del demuxer concat
+                f.write("file '{}'\n".format(str(Path(path).resolve()).replace("'", "'\\''")))
+        return mux_audio(list_path, audio_path, outfile, temp_dir=temp_dir, ffmpeg=ffmpeg, video_input_args=CONCAT_INPUT_ARGS, copy_audio=copy_audio)
+    finally:
+        os.remove(list_path)
+
+
+def render_sharded(
+    outfile,
+    mel_chunks,
+    audio_path,
+    frame_size,
+    fps,
+    wav2lip_path,
+    device="CPU",
+    shards=2,
+    threads=None,
+    video_path=None,
+    avatar_pack=None,
+    coords=None,
+    weights=None,
+    resize_factor=1,
+    rotate=False,
+    crop=[0, -1, 0, -1],
+    static=False,
+    img_size=96,
+    wav2lip_batch_size=128,
+    frame_queue_size=16,
+    encoder_preset=None,
+    copy_audio=False,
+    temp_dir=None,
+    pin_cpus=True,
+):
+    """
+    Renderiza `mel_chunks` repartiendo tramos contiguos de fotogramas entre procesos.
+
+    Cada proceso recibe solo las columnas del mel de su tramo (`MelWindows.shard`),
+    compila su propio Wav2Lip con `threads` hilos y, si `pin_cpus`, queda fijado a un
+    grupo disjunto de CPUs. Los procesos se crean con `spawn` para no heredar los
+    hilos de OpenVINO del proceso padre.
+
+    Args:
+        outfile (str): Ruta del video final.
+        mel_chunks (MelWindows): Fragmentos de mel del audio completo.
+        audio_path (str): Audio que se mezcla con el resultado.
+        frame_size (tuple): `(ancho, alto)` de los fotogramas.
+        fps (float): Fotogramas por segundo.
+        wav2lip_path (str): Ruta del modelo de Wav2Lip.
+        device (str): Dispositivo de OpenVINO.
+        shards (int): Número de procesos (y de tramos).
+        threads (int): Hilos de inferencia por proceso (por defecto, las CPUs de su grupo).
+        video_path (str): Video del avatar; cada proceso decodifica solo su tramo.
+        avatar_pack (str): Directorio de un avatar pack, en lugar de `video_path`.
+        coords (np.ndarray): Cajas de cara de `stream_face_coords` (solo con `video_path`).
+        weights (np.ndarray): Pesos de `speech_weights` de todo el render, o None.
+        resize_factor, rotate, crop: Transformaciones del video, como en `ov_inference`.
+        static (bool): Usa solo el primer fotograma.
+        img_size (int): Tamaño de los recortes de cara.
+        wav2lip_batch_size (int): Tamaño de lote de Wav2Lip (también el tramo mínimo).
+        frame_queue_size (int): Fotogramas decodificados por adelantado en cada proceso.
+        encoder_preset (str): Clave de `ENCODER_PRESETS` (None = `DEFAULT_PRESET`).
+        copy_audio (bool): Copia el audio sin recodificar.
+        temp_dir (str): Directorio para los tramos y los archivos temporales.
+        pin_cpus (bool): Fija cada proceso a su grupo de CPUs (solo donde existe `sched_setaffinity`).
+
+    Returns:
+        dict: Informe con el tiempo total, el de la unión y los datos de cada tramo.
+    """
+    start_time = time.perf_counter()
+    ranges = shard_ranges(len(mel_chunks), shards, min_frames=wav2lip_batch_size)
+    cpus = available_cpus()
+    groups = shard_cpus(cpus, len(ranges))
+    pin_cpus = pin_cpus and hasattr(os, "sched_setaffinity")
+
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+    shard_dir = Path(tempfile.mkdtemp(dir=temp_dir, prefix="shards_"))
+    tasks = []
+    for index, (start, stop) in enumerate(ranges):
+        tasks.append(
+            {
+                "index": index,
+                "start": start,
+                "stop": stop,
+                "mels": mel_chunks.shard(start, stop),
+                "weights": None if weights is None else weights[start:stop],
+                "cpus": groups[index] if pin_cpus else None,
+                "threads": threads or (len(groups[index]) if pin_cpus else max(1, len(cpus) // len(ranges))),
+                "shard_path": shard_dir / "shard_{:03d}.mp4".format(index),
+                "wav2lip_path": wav2lip_path,
+                "device": device,
+                "video_path": video_path,
+                "avatar_pack": avatar_pack,
+                "coords": coords,
+                "resize_factor": resize_factor,
+                "rotate": rotate,
+                "crop": crop,
+                "static": static,
+                "img_size": img_size,
+                "wav2lip_batch_size": wav2lip_batch_size,
+                "frame_queue_size": frame_queue_size,
+                "fps": fps,
+                "frame_size": frame_size,
+                "encoder_preset": encoder_preset,
+                "temp_dir": temp_dir,
+            }
+        )
+
+    print("Render repartido: {} fotogramas en {} tramos: {}".format(len(mel_chunks), len(ranges), ", ".join("[{}, {})".format(a, b) for a, b in ranges)))
+    try:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=len(tasks), mp_context=multiprocessing.get_context("spawn"))
+        try:
+            results = list(executor.map(render_shard, tasks))
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown()
+        render_s = time.perf_counter() - start_time
+
+        stitch_start = time.perf_counter()
+        stitch_shards([r["path"] for r in results], audio_path, outfile, copy_audio, temp_dir)
+        stitch_s = time.perf_counter() - stitch_start
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    return {
+        "frames": len(mel_chunks),
+        "shards": results,
+        "render_s": render_s,
+        "stitch_s": stitch_s,
+        "wall_s": time.perf_counter() - start_time,
+    }
+
+
+def print_shard_report(report):
+    print("Render repartido: {} fotogramas en {:.2f} s ({:.1f} fps)".format(report["frames"], report["wall_s"], report["frames"] / report["wall_s"]))
+    for shard in report["shards"]:
+        print(
+            "  tramo {index:>2} [{start}, {stop})  {threads} hilos  compilación {compile_s:5.2f} s  pipeline {pipeline_s:6.2f} s  total {wall_s:6.2f} s".format(
+                **shard
+            )
+        )
+    print("  unión y audio: {:.2f} s".format(report["stitch_s"]))
@@ -0,0 +1,192 @@
+# video_encoder.py
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from profiling import span
+
+# Perfiles de codificación: argumentos de video de ffmpeg para cada compromiso velocidad/tamaño
+ENCODER_PRESETS = {
+    # Lo más rápido posible; archivos más grandes
+    "fast": ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "23", "-tune", "zerolatency"],
+    # Por defecto: buena calidad con un coste de CPU moderado
+    "balanced": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20"],
+    # Archivos pequeños para enviar por red; más lento
+    "small": ["-c:v", "libx264", "-preset", "slow", "-crf", "26"],
+    # Calidad casi transparente
+    "quality": ["-c:v", "libx264", "-preset", "medium", "-crf", "16"],
+}
+DEFAULT_PRESET = "balanced"
+
+
+class FFmpegPipeWriter:
+    """
+    Codifica los fotogramas BGR en una sola pasada a través de un proceso ffmpeg persistente.
+
+    Los fotogramas se escriben en crudo por la entrada estándar de ffmpeg, que los
+    codifica y mezcla con el audio al vuelo. El resultado se escribe primero en
+    `temp_dir` y se mueve a `outfile` al cerrar, así que una salida a medias nunca
+    sustituye a un resultado anterior.
+
+    Args:
+        outfile (str): Ruta del video final.
+        fps (float): Fotogramas por segundo.
+        frame_size (tuple): `(ancho, alto)` de los fotogramas.
+        audio_path (str): Audio que se mezcla con el video (None para video sin audio).
+        preset (str): Clave de `ENCODER_PRESETS`.
+        copy_audio (bool): Copia el flujo de audio sin recodificar. El contenedor
+            tiene que admitir el códec de origen.
+        temp_dir (str): Directorio para el archivo temporal (por defecto, el del sistema).
+        ffmpeg (str): Ejecutable de ffmpeg.
+        audio_start (float): Segundo del audio en el que empieza este video (para segmentos).
+        output_args (list): Argumentos del contenedor de salida; por defecto, MP4 con `faststart`.
+        audio_input_args (list): Argumentos de entrada del audio (p. ej. formato de un PCM crudo).
+    """
+
+    def __init__(
+        self,
+        outfile,
+        fps,
+        frame_size,
+        audio_path=None,
+        preset=DEFAULT_PRESET,
+        copy_audio=False,
+        temp_dir=None,
+        ffmpeg="ffmpeg",
+        audio_start=None,
+        output_args=None,
+        audio_input_args=None,
+    ):
+        if preset not in ENCODER_PRESETS:
+            raise ValueError("Preset de codificación desconocido: {} (disponibles: {})".format(preset, ", ".join(ENCODER_PRESETS)))
+        if shutil.which(ffmpeg) is None:
+            raise FileNotFoundError("No se encontró ffmpeg ({}); instálalo o añádelo al PATH.".format(ffmpeg))
+
+        self.outfile = Path(outfile)
+        self.frame_size = tuple(int(v) for v in frame_size)
+        self.frames_written = 0
+        self._temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.gettempdir())
+        self._temp_dir.mkdir(parents=True, exist_ok=True)
+        self._tmp_out = self._temp_dir / ".{}.{}{}".format(self.outfile.stem, os.getpid(), self.outfile.suffix or ".mp4")
+        self._log = tempfile.TemporaryFile(dir=self._temp_dir)
+
+        width, height = self.frame_size
+        command = [ffmpeg, "-y", "-loglevel", "error"]
+        command += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-s", "{}x{}".format(width, height), "-r", str(fps), "-i", "-"]
+        if audio_path is not None:
+            if audio_start:
+                command += ["-ss", "{:.6f}".format(audio_start)]
+            command += list(audio_input_args or [])
+            command += ["-i", str(audio_path), "-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+            command += ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", "128k"]
+        command += ENCODER_PRESETS[preset]
+        # yuv420p con dimensiones pares para que cualquier reproductor lo abra
+        command += ["-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command += ["-movflags", "+faststart"] if output_args is None else list(output_args)
+        command += [str(self._tmp_out)]
+        self.command = command
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self._log)
+
+    def write(self, frame):
+        """
+        Envía un fotograma BGR u8 `(alto, ancho, 3)` a ffmpeg.
+        """
+        if frame.shape[1::-1] != self.frame_size:
+            raise ValueError("Tamaño de fotograma {} distinto del esperado {}".format(frame.shape[1::-1], self.frame_size))
+        try:
+            self._process.stdin.write(memoryview(frame if frame.flags.c_contiguous else frame.copy()))
+        except BrokenPipeError:
+            self._fail()
+        self.frames_written += 1
+
+    def _fail(self):
+        self._process.wait()
+        self._log.seek(0)
+        message = self._log.read().decode(errors="replace").strip()
+        self._log.close()
+        if self._tmp_out.exists():
+            self._tmp_out.unlink()
+        raise RuntimeError("ffmpeg terminó con código {}: {}".format(self._process.returncode, message[-2000:]))
+
+    def close(self):
+        """
+        Cierra la entrada de ffmpeg, espera a que termine y mueve el resultado a `outfile`.
+
+        Returns:
+            Path: Ruta del video final.
+        """
+        with span("encode.flush", self.frames_written):
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = self._process.wait()
+        if returncode != 0:
+            self._fail()
+        self._log.close()
+        self.outfile.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(self._tmp_out), str(self.outfile))
+        return self.outfile
+
+    def abort(self):
+        """
+        Detiene ffmpeg y descarta la salida parcial.
+        """
+        self._process.kill()
+        self._process.wait()
+        self._log.close()
+        if self._tmp_out.exists():
+            self._tmp_out.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def mux_audio(video_path, audio_path, outfile, audio_input_args=None, temp_dir=None, ffmpeg="ffmpeg", video_input_args=None, copy_audio=False):
+    """
+    Mezcla un audio con un video ya codificado, copiando el flujo de video sin recodificarlo.
+
+    Se usa cuando el audio no estaba completo mientras se codificaba el video, y
+    para unir los tramos de un render repartido (ver `sharded_render`).
+
+    Args:
+        video_path (str): Video sin audio.
+        audio_path (str): Audio que se mezcla.
+        outfile (str): Ruta del video final.
+        audio_input_args (list): Argumentos de entrada del audio (p. ej. formato de un PCM crudo).
+        temp_dir (str): Directorio para el archivo temporal (por defecto, el del sistema).
+        ffmpeg (str): Ejecutable de ffmpeg.
+        video_input_args (list): Argumentos de entrada del video (p. ej. `-f concat` para una lista de tramos).
+        copy_audio (bool): Copia el flujo de audio sin recodificar.
+
+    Returns:
+        Path: Ruta del video final.
+    """
+    outfile = Path(outfile)
+    temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.gettempdir())
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    tmp_out = temp_dir / ".{}.{}.mux{}".format(outfile.stem, os.getpid(), outfile.suffix or ".mp4")
+    command = [ffmpeg, "-y", "-loglevel", "error"] + list(video_input_args or []) + ["-i", str(video_path)]
+    command += list(audio_input_args or []) + ["-i", str(audio_path)]
+    command += ["-map", "0:v:0", "-map", "1:a:0", "-shortest", "-c:v", "copy"]
+    command += ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", "128k"]
+    command += ["-movflags", "+faststart", str(tmp_out)]
+    with span("mux"):
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if tmp_out.exists():
+            tmp_out.unlink()
+        message = result.stderr.decode(errors="replace").strip()
+        raise RuntimeError("ffmpeg terminó con código {}: {}".format(result.returncode, message[-2000:]))
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(tmp_out), str(outfile))
+    return outfile
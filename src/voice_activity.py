@@ -0,0 +1,103 @@
+# voice_activity.py
+
+import numpy as np
+
+# Normalización simétrica del mel de Wav2Lip: [-MEL_MAX_ABS, MEL_MAX_ABS] <-> [MIN_LEVEL_DB, 0] dB
+MEL_MAX_ABS = 4.0
+MIN_LEVEL_DB = -100.0
+
+DEFAULT_SILENCE_THRESHOLD_DB = -60.0
+
+
+def mel_level_db(mel_chunk):
+    """
+    Nivel de un fragmento de mel normalizado por `audio.melspectrogram`.
+
+    Deshace la normalización simétrica y devuelve el nivel de la banda más fuerte
+    del fragmento, en dB relativos a `ref_level_db` (-100 dB = silencio digital).
+
+    Args:
+        mel_chunk (np.ndarray): Fragmento `(80, mel_step_size)`.
+
+    Returns:
+        float: Nivel en dB, entre -100 y 0.
+    """
+    peak = np.max(np.clip(mel_chunk, -MEL_MAX_ABS, MEL_MAX_ABS))
+    return float((peak + MEL_MAX_ABS) / (2 * MEL_MAX_ABS) * -MIN_LEVEL_DB + MIN_LEVEL_DB)
+
+
+def speech_weights(mel_chunks, threshold_db=DEFAULT_SILENCE_THRESHOLD_DB, min_silence_frames=3, crossfade_frames=2):
+    """
+    Clasifica cada fotograma como voz o silencio y calcula el peso de la boca generada.
+
+    Un fotograma es silencio si todo su fragmento de mel (unos 200 ms) queda por
+    debajo de `threshold_db`. Los tramos de silencio más cortos que
+    `min_silence_frames` se tratan como voz para no hacer parpadear la boca en
+    pausas breves. Los fotogramas de voz junto a un silencio reciben un peso
+    intermedio, de modo que la boca generada entra y sale con un fundido.
+
+    Args:
+        mel_chunks (list): Fragmentos de mel, uno por fotograma.
+        threshold_db (float): Nivel por debajo del cual un fragmento es silencio.
+        min_silence_frames (int): Longitud mínima de un tramo de silencio que se salta.
+        crossfade_frames (int): Fotogramas de fundido a cada lado de un silencio.
+
+    Returns:
+        np.ndarray: Pesos float32 en [0, 1]; 0 = se reutiliza el fotograma original
+        sin inferencia, 1 = boca generada completa.
+    """
+    n = len(mel_chunks)
+    silent = np.array([mel_level_db(m) < threshold_db for m in mel_chunks], dtype=bool)
+
+    # Descarta los tramos de silencio demasiado cortos
+    i = 0
+    while i < n:
+        if not silent[i]:
+            i += 1
+            continue
+        j = i
+        while j < n and silent[j]:
+            j += 1
+        if j - i < min_silence_frames:
+            silent[i:j] = False
+        i = j
+
+    if not silent.any():
+        return np.ones(n, dtype=np.float32)
+
+    # Distancia (en fotogramas) de cada fotograma al silencio más cercano
+    distance = np.full(n, np.inf)
+    last = -np.inf
+    for i in range(n):
+        if silent[i]:
+            last = i
+        distance[i] = i - last
+    last = np.inf
+    for i in range(n - 1, -1, -1):
+        if silent[i]:
+            last = i
+        distance[i] = min(distance[i], last - i)
+
+    return np.minimum(1.0, distance / (crossfade_frames + 1)).astype(np.float32)
+
+
+def gate_batches(batches, weights):
+    """
+    Quita de cada lote los fotogramas de silencio antes de la inferencia.
+
+    Args:
+        batches: Lotes `(img_batch, mel_batch, frames, coords)` de `datagen`.
+        weights (np.ndarray): Pesos de `speech_weights`, uno por fotograma (None =
+            todos a 1, p. ej. cuando la duración del audio aún no se conoce).
+
+    Yields:
+        tuple: `(img_batch, mel_batch, frames, plan)`, donde `img_batch` y
+        `mel_batch` solo contienen los fotogramas con peso > 0 (pueden quedar
+        vacíos) y `plan` es una lista `(coords, peso)` por fotograma.
+    """
+    start = 0
+    for img_batch, mel_batch, frames, coords in batches:
+        batch_weights = np.ones(len(frames), dtype=np.float32) if weights is None else weights[start : start + len(frames)]
+        start += len(frames)
+        keep = batch_weights > 0
+        yield img_batch[keep], mel_batch[keep], frames, list(zip(coords, batch_weights.tolist()))
@@ -1,12 +1,10 @@
 # whisper_audio_transcriber.py
 
 import os
+import threading
 from pathlib import Path
-import requests
-import librosa
-from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq, pipeline
-from transformers.utils import logging
-import soundfile as sf
+
+# transformers, librosa y requests tardan segundos en importarse: se cargan en el primer uso
 
 # Definición de modelos
 model_ids = {
@@ -36,12 +34,48 @@ def download_file(url, filename, directory="."):
     """
     Descarga un archivo desde una URL y lo guarda en el directorio especificado.
     """
+    import requests
+
     os.makedirs(directory, exist_ok=True)
     filepath = Path(directory) / filename
     response = requests.get(url)
     filepath.write_bytes(response.content)
     return filepath
 
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(model_name):
+    """
+    Devuelve el pipeline de transcripción de `model_name`, cargándolo solo la primera vez.
+
+    Se puede llamar desde un hilo de fondo para precargar el modelo; una llamada
+    concurrente espera a esa carga en lugar de repetirla.
+
+    Args:
+        model_name (str): Nombre del modelo de Whisper.
+
+    Returns:
+        Pipeline de `transformers` para "automatic-speech-recognition".
+    """
+    with _pipelines_lock:
+        if model_name not in _pipelines:
+            from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq, pipeline
+
+            processor = AutoProcessor.from_pretrained(model_name)
+            model = AutoModelForSpeechSeq2Seq.from_pretrained(model_name)
+
+            # Crear pipeline para transcripción
+            _pipelines[model_name] = pipeline(
+                "automatic-speech-recognition",
+                model=model,
+                tokenizer=processor.tokenizer,
+                feature_extractor=processor.feature_extractor,
+                device="cpu",  # Cambiar a "cuda" si tienes una GPU disponible
+            )
+        return _pipelines[model_name]
+
 def transcribe_audio(file_path, model_name):
     """
     Transcribe el audio utilizando un modelo de Whisper.
@@ -53,17 +87,9 @@ def transcribe_audio(file_path, model_name):
     Returns:
         str: Transcripción del audio.
     """
-    processor = AutoProcessor.from_pretrained(model_name)
-    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_name)
-    
-    # Crear pipeline para transcripción
-    pipe = pipeline(
-        "automatic-speech-recognition",
-        model=model,
-        tokenizer=processor.tokenizer,
-        feature_extractor=processor.feature_extractor,
-        device="cpu",  # Cambiar a "cuda" si tienes una GPU disponible
-    )
+    import librosa
+
+    pipe = get_pipeline(model_name)
     
     # Cargar el archivo de audio
     audio_data, samplerate = librosa.load(file_path, sr=16000)
@@ -88,6 +114,8 @@ def guardar_transcripcion(texto, filename="transcripcion.txt", directory="../res
     print(f"Transcripción guardada en: {file_path}")
 
 def main():
+    from transformers.utils import logging
+
     # Configuración de logging para errores únicamente
     logging.set_verbosity_error()
     
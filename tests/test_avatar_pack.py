@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+# `avatar_pack` y `ov_inference` importan sus dependencias como módulos de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from avatar_pack import AvatarPack, write_avatar_pack
+from mel_windows import MelWindows
+from ov_inference import datagen, pack_datagen, read_video_frames
+
+IMG_SIZE = 16
+BOX = [40, 120, 60, 140]
+
+
+def _write_video(path, n_frames, size=(160, 128)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, size)
+    for i in range(n_frames):
+        frame = np.full((size[1], size[0], 3), (i * 20) % 256, dtype=np.uint8)
+        cv2.putText(frame, str(i), (50, 90), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_ida_y_vuelta(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (64, 80, 3), dtype=np.uint8) for _ in range(5)]
+    coords = [(8, 40, 10 + i, 50 + i) for i in range(5)]
+
+    write_avatar_pack(tmp_path / "pack", frames, coords, 29.97, IMG_SIZE, params={"pads": [0, 10, 0, 0]})
+    pack = AvatarPack(tmp_path / "pack")
+
+    assert len(pack) == 5 and pack.fps == 29.97 and pack.img_size == IMG_SIZE and pack.frame_shape == (64, 80, 3)
+    assert np.array_equal(pack.frames, np.stack(frames))
+    assert np.array_equal(pack.coords, coords)
+    expected_faces = [cv2.resize(f[y1:y2, x1:x2], (IMG_SIZE, IMG_SIZE)) for f, (y1, y2, x1, x2) in zip(frames, coords)]
+    assert np.array_equal(pack.faces, np.stack(expected_faces))
+    assert pack.meta["params"] == {"pads": [0, 10, 0, 0]}
+    assert not (tmp_path / "pack.tmp").exists()
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_pack_datagen_da_los_mismos_lotes(tmp_path, fused):
+    """
+    Verifica que el pack da los mismos lotes que `datagen` sobre el video, incluido el ciclo del video.
+    """
+    frames, fps = read_video_frames(str(_write_video(tmp_path / "avatar.avi", 7)))
+    write_avatar_pack(tmp_path / "pack", frames, [tuple(BOX)] * len(frames), fps, IMG_SIZE)
+    mels = MelWindows(np.random.default_rng(1).normal(size=(80, 120)).astype(np.float32), fps)
+
+    expected = datagen(frames, mels, BOX, False, 16, [0, 10, 0, 0], False, IMG_SIZE, 4, None, fused=fused)
+    actual = pack_datagen(AvatarPack(tmp_path / "pack"), mels, False, IMG_SIZE, 4, fused)
+
+    n = 0
+    for (img, mel, frame_batch, coords), (pack_img, pack_mel, pack_frames, pack_coords) in zip(expected, actual, strict=True):
+        assert np.array_equal(pack_img, img) and np.array_equal(pack_mel, mel)
+        assert all(np.array_equal(a, b) for a, b in zip(pack_frames, frame_batch, strict=True))
+        assert list(pack_coords) == [tuple(c) for c in coords]
+        n += len(frame_batch)
+    assert n == len(mels) > len(frames)
+
+
+def test_verificar_archivos_con_pack_sin_video(tmp_path):
+    """
+    Verifica que con `--avatar_pack` no hace falta el video, pero sí un pack legible.
+    """
+    pytest.importorskip("soundfile")
+    from run_inference import verificar_archivos
+
+    wavfile.write(tmp_path / "audio.wav", 16000, np.zeros(1600, dtype=np.int16))
+    write_avatar_pack(tmp_path / "pack", [np.zeros((32, 32, 3), dtype=np.uint8)], [(0, 16, 0, 16)], 25.0, IMG_SIZE)
+    audio = str(tmp_path / "audio.wav")
+
+    assert verificar_archivos(str(tmp_path / "no_existe.mp4"), audio, str(tmp_path / "pack"))
+    assert not verificar_archivos(str(tmp_path / "no_existe.mp4"), audio, str(tmp_path / "otro_pack"))
+    assert not verificar_archivos(str(tmp_path / "no_existe.mp4"), audio)
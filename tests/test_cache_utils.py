@@ -0,0 +1,98 @@
+import struct
+
+import numpy as np
+from scipy.io import wavfile
+
+from src.cache_utils import LRUDiskCache, hash_audio, hash_params
+
+
+def test_expulsion_lru_respeta_presupuesto(tmp_path):
+    """
+    Verifica que la caché expulsa la entrada usada hace más tiempo al superar el presupuesto de bytes.
+    """
+    cache = LRUDiskCache(tmp_path, max_bytes=250)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"x" * 100)
+    assert cache.get("a") is not None  # "a" pasa a ser la más reciente
+    cache.put("c", b"x" * 100)
+
+    assert cache.get("b") is None, "La entrada menos usada debería haberse expulsado."
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["bytes"] <= 250
+    assert stats["evictions"] == 1
+
+
+def test_indice_sobrevive_reinicios(tmp_path):
+    """
+    Verifica que las entradas y los contadores se recuperan desde `index.json` en una instancia nueva.
+    """
+    cache = LRUDiskCache(tmp_path, max_bytes=1000)
+    cache.put("clave", b"datos", suffix=".bin")
+    cache.get("clave")
+    cache.get("otra")
+
+    reopened = LRUDiskCache(tmp_path, max_bytes=1000)
+    assert reopened.get("clave").read_bytes() == b"datos"
+    stats = reopened.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_hash_params_independiente_del_orden():
+    assert hash_params(pads=[0, 10, 0, 0], rotate=False) == hash_params(rotate=False, pads=[0, 10, 0, 0])
+    assert hash_params(pads=[0, 10, 0, 0]) != hash_params(pads=[0, 0, 0, 0])
+
+
+def test_put_file_copia_y_respeta_presupuesto(tmp_path):
+    """
+    Verifica que `put_file` guarda una copia del archivo y descarta las entradas que superan el presupuesto.
+    """
+    cache = LRUDiskCache(tmp_path / "cache", max_bytes=100)
+    small, big = tmp_path / "small.mp4", tmp_path / "big.mp4"
+    small.write_bytes(b"v" * 60)
+    big.write_bytes(b"v" * 200)
+
+    stored = cache.put_file("small", small, suffix=".mp4")
+    small.write_bytes(b"cambiado")
+    assert stored.read_bytes() == b"v" * 60
+    assert cache.put_file("big", big, suffix=".mp4") is None
+    assert cache.stats()["bytes"] == 60
+
+
+def test_hash_audio_depende_solo_de_las_muestras(tmp_path):
+    """
+    Verifica que los metadatos del WAV no cambian el hash y que otras muestras sí.
+    """
+    samples = (np.random.default_rng(0).standard_normal(16000) * 1000).astype(np.int16)
+    plain, tagged, other = tmp_path / "plain.wav", tmp_path / "tagged.wav", tmp_path / "other.wav"
+    wavfile.write(plain, 16000, samples)
+    wavfile.write(other, 16000, samples[::-1])
+    # Mismo audio con un fragmento LIST de etiquetas al final
+    data = plain.read_bytes() + b"LIST" + struct.pack("<I", 12) + b"INFOISFT" + struct.pack("<I", 0)
+    tagged.write_bytes(data[:4] + struct.pack("<I", len(data) - 8) + data[8:])
+
+    assert hash_audio(plain) == hash_audio(tagged)
+    assert hash_audio(plain) != hash_audio(other)
+
+
+def _guardar_entradas(cache_dir, prefix):
+    cache = LRUDiskCache(cache_dir, max_bytes=10**6)
+    for i in range(20):
+        cache.put("{}{}".format(prefix, i), b"x" * 10)
+
+
+def test_indice_compartido_entre_procesos(tmp_path):
+    """
+    Verifica que dos procesos que escriben a la vez no pierden entradas del índice.
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    procesos = [ctx.Process(target=_guardar_entradas, args=(str(tmp_path), prefix)) for prefix in ("a", "b", "c")]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+
+    assert all(p.exitcode == 0 for p in procesos)
+    assert LRUDiskCache(tmp_path, max_bytes=10**6).stats()["entries"] == 60
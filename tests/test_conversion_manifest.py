@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+
+# `conversion_manifest` importa `cache_utils` como módulo de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from conversion_manifest import ConversionManifest, save_model_atomic
+
+
+def modelo(scale):
+    x = ops.parameter([1, 3, 8, 8], ov.Type.f32, name="x")
+    return ov.Model([ops.multiply(x, np.float32(scale))], [x], "escala")
+
+
+def test_al_dia_hasta_que_cambia_la_fuente(tmp_path):
+    """
+    Verifica que el IR se da por bueno con las mismas fuentes y opciones, y deja de estarlo si cambian.
+    """
+    checkpoint = tmp_path / "modelo.pth"
+    checkpoint.write_bytes(b"pesos v1")
+    ir_path = save_model_atomic(modelo(2.0), tmp_path / "models" / "modelo.xml")
+    manifest = ConversionManifest(tmp_path / "models")
+    sources, options = {"checkpoint": checkpoint}, {"revision": 1}
+
+    assert not manifest.is_up_to_date(ir_path, sources, options)
+    manifest.record(ir_path, sources, options)
+    assert manifest.is_up_to_date(ir_path, sources, options)
+    assert not manifest.is_up_to_date(ir_path, sources, {"revision": 2})
+
+    checkpoint.write_bytes(b"pesos v2")
+    assert not manifest.is_up_to_date(ir_path, sources, options)
+
+
+def test_sin_checkpoint_usa_el_hash_registrado(tmp_path):
+    """
+    Verifica que, sin el checkpoint en disco, un IR registrado sigue al día (conversión sin red).
+    """
+    checkpoint = tmp_path / "modelo.pth"
+    checkpoint.write_bytes(b"pesos")
+    ir_path = save_model_atomic(modelo(2.0), tmp_path / "modelo.xml")
+    manifest = ConversionManifest(tmp_path)
+    manifest.record(ir_path, {"checkpoint": checkpoint}, {})
+
+    checkpoint.unlink()
+
+    assert manifest.is_up_to_date(ir_path, {"checkpoint": checkpoint}, {})
+    assert not manifest.is_up_to_date(ir_path, {"otro": checkpoint}, {})
+
+
+def test_ir_modificado_no_esta_al_dia(tmp_path):
+    """
+    Verifica que reescribir el IR a mano invalida su entrada y que no quedan temporales.
+    """
+    ir_path = save_model_atomic(modelo(2.0), tmp_path / "modelo.xml")
+    manifest = ConversionManifest(tmp_path)
+    manifest.record(ir_path, {}, {})
+
+    save_model_atomic(modelo(3.0), ir_path)
+
+    assert not manifest.is_up_to_date(ir_path, {}, {})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["conversion_manifest.json", "modelo.bin", "modelo.xml"]
@@ -0,0 +1,29 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# `face_track_cache` importa `cache_utils` como módulo de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from face_track_cache import FaceTrackCache
+
+
+def test_video_sustituido_no_reutiliza_las_cajas(tmp_path):
+    """
+    Verifica que, en un proceso de larga duración, sustituir el video en la misma ruta cambia la clave.
+    """
+    video, detector = tmp_path / "avatar.mp4", tmp_path / "face_detection.xml"
+    video.write_bytes(b"video original")
+    detector.write_bytes(b"<net/>")
+    cache = FaceTrackCache(tmp_path / "cache")
+    key = cache.make_key(str(video), str(detector), pads=[0, 10, 0, 0])
+    cache.store(key, [[1, 2, 3, 4]])
+
+    video.write_bytes(b"otro video, otra cara")
+    os.utime(video, ns=(video.stat().st_atime_ns, video.stat().st_mtime_ns + 10**9))
+    new_key = cache.make_key(str(video), str(detector), pads=[0, 10, 0, 0])
+
+    assert new_key != key and cache.load(new_key) is None
+    assert np.array_equal(cache.load(key), [[1, 2, 3, 4]])
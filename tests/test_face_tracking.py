@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# `ov_inference` importa el resto de módulos de `src` como módulos de primer nivel
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from face_tracking import frames_to_redetect, interpolate_track, select_keyframes
+from ov_inference import detect_face_rects, detect_faces_batched
+
+BOX = (20, 10, 52, 42)
+
+
+class DetectorFalso:
+    """
+    Detector que "encuentra" la cara en el cuadrado más brillante de cada fotograma y cuenta las imágenes que recibe.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_detections_for_batch(self, images):
+        self.calls += len(images)
+        rects = []
+        for image in images:
+            ys, xs = np.nonzero(image[..., 0] == image[..., 0].max())
+            rects.append((int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1))
+        return rects
+
+
+def fotogramas(n, shift=0):
+    frames = []
+    for i in range(n):
+        frame = np.zeros((64, 80, 3), dtype=np.uint8)
+        x = i * shift
+        frame[10:42, 20 + x : 52 + x] = 200
+        frames.append(frame)
+    return frames
+
+
+def test_el_ultimo_fotograma_siempre_es_clave():
+    assert select_keyframes(10, 4) == [0, 4, 8, 9]
+    assert select_keyframes(9, 4) == [0, 4, 8]
+    assert select_keyframes(5, 1) == [0, 1, 2, 3, 4]
+    assert select_keyframes(1, 5) == [0]
+    assert select_keyframes(0, 5) == []
+
+
+def test_redetecta_el_primer_fotograma_con_deriva():
+    frames = fotogramas(9)
+    # La cara cambia dentro de la caja en los fotogramas 5 y 6; fuera de la caja no cuenta
+    for i in (5, 6):
+        frames[i][20:40, 30:50] = 20
+    frames[3][50:60, 0:10] = 255
+
+    assert frames_to_redetect(frames, {0: BOX, 8: BOX}, 0.1) == [5]
+    # Desde el 5, el 6 es igual y el 7 vuelve a la cara original
+    assert frames_to_redetect(frames, {0: BOX, 5: BOX, 8: BOX}, 0.1) == [7]
+    assert frames_to_redetect(fotogramas(9), {0: BOX, 8: BOX}, 0.1) == []
+
+
+def test_interpola_linealmente_entre_claves():
+    track = interpolate_track({0: (0, 0, 10, 10), 4: (4, 8, 14, 18)}, 6)
+
+    assert track[:5] == [(0, 0, 10, 10), (1, 2, 11, 12), (2, 4, 12, 14), (3, 6, 13, 16), (4, 8, 14, 18)]
+    # Tras el último fotograma clave se mantiene su caja
+    assert track[5] == (4, 8, 14, 18)
+
+
+def test_intervalo_1_equivale_a_detectar_todo():
+    frames = fotogramas(7, shift=3)
+    full, _ = detect_faces_batched(DetectorFalso(), frames, 4)
+    detector = DetectorFalso()
+
+    rects, _ = detect_face_rects(detector, frames, 4, keyframe_interval=1)
+
+    assert rects == full and detector.calls == len(frames)
+
+
+def test_intervalo_mayor_solo_detecta_claves_y_derivas():
+    frames = fotogramas(9)
+    # La cara se desplaza en el fotograma 6 y se queda ahí
+    for frame in frames[6:]:
+        frame[10:42, 20:52] = 150
+        frame[10:42, 40:72] = 200
+    detector = DetectorFalso()
+
+    rects, _ = detect_face_rects(detector, frames, 4, keyframe_interval=4)
+
+    # Claves 0, 4 y 8, y el 6, donde se movió
+    assert detector.calls == 4
+    assert rects[5] == (30, 10, 62, 42) and rects[6:] == [(40, 10, 72, 42)] * 3
@@ -0,0 +1,169 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from src.frame_source import VideoFrameSource, prefetch, transform_frame
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Recorre el video en lotes como `stream_datagen` e informa del pico de RSS del proceso (KB)
+RSS_SCRIPT = """
+import resource, sys
+from src.frame_source import VideoFrameSource, prefetch
+source = VideoFrameSource(sys.argv[1])
+batch = []
+for frame in prefetch(source.cycle(int(sys.argv[2])), 16):
+    batch.append(frame)
+    if len(batch) == 8:
+        batch = []
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+# Modo streaming completo con coords fijas: `stream_datagen` -> `LipSyncPipeline(queue_size=1)` con un
+# Wav2Lip fusionado de juguete; informa del pico de RSS (KB) y de `streaming_memory_bound` (bytes)
+PIPELINE_RSS_SCRIPT = """
+import resource, sys
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+sys.path.insert(0, "src")
+from frame_source import VideoFrameSource
+from lipsync_pipeline import LipSyncPipeline
+from ov_inference import stream_datagen, streaming_memory_bound
+
+img_size, batch_size, infer_jobs, frame_queue_size = 32, 8, 2, 16
+face = ops.parameter([-1, img_size, img_size, 3], ov.Type.u8, name="face_sequences")
+audio = ops.parameter([-1, 80, 16], ov.Type.f32, name="audio_sequences")
+level = ops.reshape(ops.reduce_mean(audio, np.array([1, 2], dtype=np.int64), keep_dims=False), np.array([-1, 1, 1, 1], dtype=np.int64), False)
+mouths = ops.convert(ops.add(ops.convert(face, ov.Type.f32), level), ov.Type.u8)
+model = ov.Core().compile_model(ov.Model([mouths], [audio, face], "wav2lip_fused"), "CPU")
+
+source = VideoFrameSource(sys.argv[1])
+n_frames = int(sys.argv[2])
+mels = np.zeros((n_frames, 80, 16), dtype=np.float32)
+coords = np.array([[40, 200, 80, 240]])
+gen = stream_datagen(source, mels, coords, False, img_size, batch_size, True, frame_queue_size)
+written = []
+pipeline = LipSyncPipeline(model, True, lambda m, frames, c: written.append(len(frames)), infer_jobs=infer_jobs, queue_size=1)
+pipeline.run(gen, total=None)
+assert sum(written) == n_frames
+print(streaming_memory_bound(source.frame_shape, batch_size, infer_jobs, frame_queue_size))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _write_video(path, n_frames, size=(320, 240)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, size)
+    for i in range(n_frames):
+        frame = np.full((size[1], size[0], 3), i % 256, dtype=np.uint8)
+        cv2.putText(frame, str(i), (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+
+def _pipeline_peak_rss_kb(video_path, n_frames):
+    result = subprocess.run(
+        [sys.executable, "-c", PIPELINE_RSS_SCRIPT, str(video_path), str(n_frames)], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    bound, rss = result.stdout.strip().splitlines()[-2:]
+    return int(rss), int(bound) / 1024
+
+
+def _peak_rss_kb(video_path, n_frames):
+    result = subprocess.run([sys.executable, "-c", RSS_SCRIPT, str(video_path), str(n_frames)], cwd=ROOT, capture_output=True, text=True, check=True)
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def test_fuente_coincide_con_lectura_completa(tmp_path):
+    """
+    Verifica que la fuente perezosa entrega los mismos fotogramas transformados que la lectura completa.
+    """
+    video_path = tmp_path / "video.avi"
+    _write_video(video_path, 12)
+
+    capture = cv2.VideoCapture(str(video_path))
+    expected = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        expected.append(transform_frame(frame, 2, True, [5, -1, 10, 100]))
+    capture.release()
+
+    source = VideoFrameSource(str(video_path), resize_factor=2, rotate=True, crop=[5, -1, 10, 100])
+    frames = list(prefetch(source.frames(), maxsize=2))
+
+    assert source.frame_shape == expected[0].shape
+    assert len(frames) == len(expected)
+    assert all(np.array_equal(a, b) for a, b in zip(frames, expected))
+
+
+def test_cycle_vuelve_al_principio(tmp_path):
+    """
+    Verifica que `cycle` repite el video cuando el audio es más largo, como `i % len(frames)` en `datagen`.
+    """
+    video_path = tmp_path / "video.avi"
+    _write_video(video_path, 5)
+    source = VideoFrameSource(str(video_path))
+
+    frames = list(source.cycle(12))
+    first_pass = list(source.frames())
+
+    assert len(frames) == 12
+    assert all(np.array_equal(frames[i], first_pass[i % 5]) for i in range(12))
+
+
+def test_rss_no_crece_con_la_duracion(tmp_path):
+    """
+    Prueba de regresión de memoria: el pico de RSS al recorrer un video 8 veces más
+    largo no debe crecer más que unos pocos fotogramas (cargarlo entero son ~110 MB más).
+    """
+    pytest.importorskip("resource")
+    short_path, long_path = tmp_path / "short.avi", tmp_path / "long.avi"
+    _write_video(short_path, 200)
+    _write_video(long_path, 1600)
+
+    short_rss = _peak_rss_kb(short_path, 200)
+    long_rss = _peak_rss_kb(long_path, 1600)
+
+    frame_kb = 320 * 240 * 3 / 1024
+    assert long_rss - short_rss < 40 * frame_kb, f"RSS pico {short_rss} KB -> {long_rss} KB"
+
+
+def test_rss_del_render_en_streaming_acotado(tmp_path):
+    """
+    Prueba de regresión de memoria del modo streaming completo (`stream_datagen` y
+    `LipSyncPipeline`): con un video 8 veces más largo, el pico de RSS crece menos que
+    `streaming_memory_bound`. Guardar los fotogramas en datagen, en las coords o en el
+    pipeline supondría ~320 MB más.
+    """
+    pytest.importorskip("resource")
+    short_path, long_path = tmp_path / "short.avi", tmp_path / "long.avi"
+    _write_video(short_path, 200)
+    _write_video(long_path, 1600)
+
+    short_rss, bound_kb = _pipeline_peak_rss_kb(short_path, 200)
+    long_rss, _ = _pipeline_peak_rss_kb(long_path, 1600)
+
+    assert long_rss - short_rss < bound_kb, f"RSS pico {short_rss} KB -> {long_rss} KB (cota {bound_kb:.0f} KB)"
+
+
+@pytest.mark.parametrize("start", [0, 3, 5, 13])
+def test_cycle_desde_un_fotograma_intermedio(tmp_path, start):
+    """
+    Verifica que `cycle(start=k)` genera los mismos fotogramas que `cycle()` a partir del `k`, también con `k` mayor que el video.
+    """
+    video_path = tmp_path / "video.avi"
+    _write_video(video_path, 5)
+    source = VideoFrameSource(str(video_path))
+
+    expected = list(source.cycle(start + 9))[start:]
+    frames = list(source.cycle(9, start=start))
+
+    assert source.count() == 5
+    assert len(frames) == 9
+    assert all(np.array_equal(a, b) for a, b in zip(frames, expected))
@@ -0,0 +1,65 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+import pytest
+
+# `lipsync_pipeline` importa `model_registry` y `profiling` como módulos de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from lipsync_pipeline import LipSyncPipeline
+
+IMG_SIZE = 8
+CORE = ov.Core()
+
+
+def wav2lip_fusionado():
+    """
+    IR con las entradas y la salida del Wav2Lip fusionado: devuelve la cara más la media del mel.
+    """
+    face = ops.parameter([-1, IMG_SIZE, IMG_SIZE, 3], ov.Type.u8, name="face_sequences")
+    audio = ops.parameter([-1, 80, 16], ov.Type.f32, name="audio_sequences")
+    level = ops.reshape(ops.reduce_mean(audio, np.array([1, 2], dtype=np.int64), keep_dims=False), np.array([-1, 1, 1, 1], dtype=np.int64), False)
+    mouths = ops.convert(ops.add(ops.convert(face, ov.Type.f32), level), ov.Type.u8)
+    mouths.output(0).set_names({"mouths"})
+    return CORE.compile_model(ov.Model([mouths], [audio, face], "wav2lip_fused"), "CPU")
+
+
+def lote(n, mel_steps=16):
+    faces = np.full((n, IMG_SIZE, IMG_SIZE, 3), 10, dtype=np.uint8)
+    return faces, np.zeros((n, 80, mel_steps), dtype=np.float32), [None] * n, [None] * n
+
+
+def hilos_nuevos(antes):
+    return [t for t in threading.enumerate() if t not in antes and t.name != "tqdm_monitor" and not t.name.startswith("ThreadPoolExecutor")]
+
+
+def test_escribe_todos_los_lotes_en_orden():
+    escritos = []
+    pipeline = LipSyncPipeline(wav2lip_fusionado(), True, lambda mouths, frames, coords: escritos.append(len(mouths)), infer_jobs=2, queue_size=1)
+
+    report = pipeline.run([lote(4), lote(3), lote(2)], total=3)
+
+    assert escritos == [4, 3, 2]
+    assert report is not None
+
+
+def test_lote_erroneo_no_deja_hilos_vivos():
+    """
+    Verifica que, si un lote hace fallar la inferencia, `run` propaga el error y las etapas terminan.
+    """
+    lotes = [lote(4), lote(4, mel_steps=7)] + [lote(4) for _ in range(20)]
+    pipeline = LipSyncPipeline(wav2lip_fusionado(), True, lambda *args: None, infer_jobs=1, queue_size=1)
+    antes = set(threading.enumerate())
+
+    with pytest.raises(Exception):
+        pipeline.run(iter(lotes), total=len(lotes))
+
+    deadline = time.time() + 5
+    while hilos_nuevos(antes) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not hilos_nuevos(antes)
@@ -0,0 +1,127 @@
+import io
+import threading
+
+import numpy as np
+import pytest
+from scipy.signal import get_window, lfilter
+
+from src.mel_stream import IncrementalMel, iter_pcm_blocks, mel_basis, melspectrogram
+from src.mel_windows import MelWindows, StreamingMelWindows
+
+
+def wav2lip_melspectrogram(wav):
+    """
+    `audio.melspectrogram` de Wav2Lip en una sola pasada (STFT de librosa con `center=True`).
+    """
+    y = lfilter([1, -0.97], [1], wav)
+    frames = np.lib.stride_tricks.sliding_window_view(np.pad(y, 400, mode="reflect"), 800)[::200].T
+    D = np.fft.rfft(get_window("hann", 800, fftbins=True)[:, None] * frames, axis=0)
+    S = 20 * np.log10(np.maximum(np.exp(-100 / 20 * np.log(10)), np.dot(mel_basis(), np.abs(D)))) - 20
+    return np.clip((2 * 4.0) * ((S + 100) / 100) - 4, -4, 4)
+
+
+def push_in_blocks(wav, seed):
+    rng = np.random.default_rng(seed)
+    engine, columns, i = IncrementalMel(), [], 0
+    while i < len(wav):
+        size = int(rng.integers(1, 3000))
+        columns.append(engine.push(wav[i : i + size]))
+        i += size
+    columns.append(engine.finish())
+    return columns
+
+
+@pytest.mark.parametrize("n_samples", [1, 399, 400, 401, 800, 16000 * 3 + 37])
+def test_coincide_con_el_calculo_de_wav2lip(n_samples):
+    """
+    Verifica forma y valores frente al cálculo de Wav2Lip sobre el audio completo.
+    """
+    wav = (np.random.default_rng(0).standard_normal(n_samples) * 0.1).astype(np.float32)
+    mel = melspectrogram(wav)
+
+    assert mel.shape == (80, 1 + n_samples // 200)
+    np.testing.assert_allclose(mel, wav2lip_melspectrogram(wav), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_por_bloques_es_identico_bit_a_bit(seed):
+    """
+    Verifica que cualquier partición del audio en bloques da exactamente el mismo mel.
+    """
+    wav = (np.random.default_rng(100 + seed).standard_normal(16000 * 5 + seed * 77) * 0.1).astype(np.float32)
+    np.testing.assert_array_equal(np.concatenate(push_in_blocks(wav, seed), axis=1), melspectrogram(wav))
+
+
+def test_emite_columnas_antes_del_final():
+    """
+    Verifica que las columnas salen en cuanto llegan 400 muestras tras su centro.
+    """
+    engine = IncrementalMel()
+    assert engine.push(np.zeros(400, dtype=np.float32)).shape == (80, 0)
+    assert engine.push(np.zeros(1, dtype=np.float32)).shape == (80, 1)
+    assert engine.push(np.zeros(200, dtype=np.float32)).shape == (80, 1)
+    # Las 601 muestras dan 1 + 601 // 200 = 4 columnas en total
+    assert engine.finish().shape == (80, 2)
+
+
+def test_pcm_entero_se_escala_como_soundfile():
+    pcm = np.array([-32768, -1, 0, 1, 32767] * 200, dtype=np.int16)
+    np.testing.assert_array_equal(melspectrogram(pcm), melspectrogram(pcm.astype(np.float32) / 32768))
+
+
+def test_banco_de_filtros_igual_que_librosa():
+    librosa = pytest.importorskip("librosa")
+    np.testing.assert_array_equal(mel_basis(), librosa.filters.mel(sr=16000, n_fft=800, n_mels=80, fmin=55, fmax=7600))
+
+
+def test_ventanas_en_streaming_igual_que_mel_windows():
+    """
+    Verifica que `StreamingMelWindows`, alimentada desde otro hilo, da los mismos fragmentos y lotes que `MelWindows`.
+    """
+    wav = (np.random.default_rng(7).standard_normal(16000 * 4 + 123) * 0.1).astype(np.float32)
+    expected = MelWindows(melspectrogram(wav), 29.97)
+    windows = StreamingMelWindows(29.97)
+
+    def produce():
+        for columns in push_in_blocks(wav, 3):
+            windows.append(columns)
+        windows.close()
+
+    threading.Thread(target=produce).start()
+    batches = list(windows.batches(32))
+
+    assert [start for start, _ in batches] == list(range(0, len(expected), 32))
+    np.testing.assert_array_equal(np.concatenate([batch for _, batch in batches]), expected[0 : len(expected)])
+    assert len(windows) == len(expected)
+    for chunk, window in zip(expected, windows):
+        np.testing.assert_array_equal(window, chunk)
+
+
+def test_error_del_productor_llega_al_consumidor():
+    windows = StreamingMelWindows(25)
+    windows.append(np.zeros((80, 40)))
+    windows.close(error=OSError("TTS interrumpido"))
+    with pytest.raises(OSError):
+        list(windows)
+
+
+def test_audio_mas_corto_que_una_ventana():
+    windows = StreamingMelWindows(25)
+    windows.append(np.zeros((80, 10)))
+    windows.close()
+    with pytest.raises(ValueError):
+        len(windows)
+
+
+def test_lectura_de_pcm_con_lecturas_parciales():
+    """
+    Verifica que `iter_pcm_blocks` no parte muestras aunque el flujo devuelva un número impar de bytes.
+    """
+
+    class Trickle(io.BytesIO):
+        def read(self, n=-1):
+            return super().read(min(n, 7))
+
+    pcm = np.arange(-500, 500, dtype=np.int16)
+    blocks = list(iter_pcm_blocks(Trickle(pcm.tobytes()), block_samples=64))
+    np.testing.assert_array_equal(np.concatenate(blocks), pcm)
@@ -0,0 +1,77 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.mel_windows import MelWindows, mel_chunk_starts
+
+
+def legacy_mel_chunks(mel, fps, mel_step_size=16):
+    """
+    Bucle original de `ov_inference` para trocear el mel.
+    """
+    mel_chunks = []
+    mel_idx_multiplier = 80.0 / fps
+    i = 0
+    while 1:
+        start_idx = int(i * mel_idx_multiplier)
+        if start_idx + mel_step_size > len(mel[0]):
+            mel_chunks.append(mel[:, len(mel[0]) - mel_step_size :])
+            break
+        mel_chunks.append(mel[:, start_idx : start_idx + mel_step_size])
+        i += 1
+    return mel_chunks
+
+
+@pytest.mark.parametrize("fps", [25, 29.97, 30, 24, 23.976, 60, 12.5])
+@pytest.mark.parametrize("n_mel_frames", [16, 17, 801, 4003])
+def test_paridad_con_el_bucle_original(fps, n_mel_frames):
+    """
+    Verifica fragmento a fragmento que las ventanas coinciden con el bucle original, incluido el ajuste final.
+    """
+    mel = np.random.default_rng(0).standard_normal((80, n_mel_frames))
+    expected = legacy_mel_chunks(mel, fps)
+    windows = MelWindows(mel, fps)
+
+    assert len(windows) == len(expected)
+    for chunk, window in zip(expected, windows):
+        np.testing.assert_array_equal(window, chunk.astype(np.float32))
+
+
+def test_slice_es_un_lote_float32_contiguo():
+    """
+    Verifica que un slice devuelve el lote `(B, 80, 16)` float32 contiguo igual al apilado del bucle original.
+    """
+    mel = np.random.default_rng(1).standard_normal((80, 2000))
+    expected = np.stack(legacy_mel_chunks(mel, 25)[10:42]).astype(np.float32)
+    batch = MelWindows(mel, 25)[10:42]
+
+    assert batch.dtype == np.float32 and batch.flags.c_contiguous
+    np.testing.assert_array_equal(batch, expected)
+
+
+def test_las_ventanas_no_copian_el_mel():
+    """
+    Verifica que las ventanas son una vista sobre el mel y no una copia por fragmento.
+    """
+    windows = MelWindows(np.zeros((80, 1000)), 25)
+    assert np.shares_memory(windows[3], windows[4])
+
+
+def test_audio_mas_corto_que_una_ventana():
+    with pytest.raises(ValueError):
+        mel_chunk_starts(10, 25)
+
+
+def test_tramo_igual_que_el_slice_y_se_serializa_compacto():
+    """
+    Verifica que `shard` da los mismos fragmentos que el mel completo y que al serializarlo no se copia la vista.
+    """
+    mel_chunks = MelWindows(np.random.default_rng(3).standard_normal((80, 4003)), 29.97)
+    shard = mel_chunks.shard(700, 1300)
+    restored = pickle.loads(pickle.dumps(shard))
+
+    assert len(restored) == 600
+    np.testing.assert_array_equal(restored[0:600], mel_chunks[700:1300])
+    assert restored.mel.shape[1] < 600 * 80 / 29.97 + 16 + 1
+    assert len(pickle.dumps(shard)) < 2 * shard.mel.nbytes
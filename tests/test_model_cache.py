@@ -0,0 +1,87 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+
+# `model_cache` importa `cache_utils` como módulo de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from model_cache import ModelCache, blob_files
+from model_registry import ModelRegistry
+
+
+def guardar_modelo(path, scale):
+    x = ops.parameter([1, 3, 8, 8], ov.Type.f32, name="x")
+    ov.save_model(ov.Model([ops.multiply(x, np.float32(scale))], [x], "escala"), path)
+    return path
+
+
+def test_compilacion_en_frio_y_en_caliente(tmp_path):
+    """
+    Verifica que un `ov.Core` nuevo importa el blob que dejó la primera compilación.
+    """
+    model_path = guardar_modelo(tmp_path / "modelo.xml", 2.0)
+    cache = ModelCache(tmp_path / "cache")
+
+    cold = ModelRegistry(ov.Core(), model_cache=cache).get(model_path)
+    warm = ModelRegistry(ov.Core(), model_cache=cache).get(model_path)
+
+    assert cold.cache_state == "cold" and warm.cache_state == "warm"
+    assert warm.cache_dir == cold.cache_dir and blob_files(cold.cache_dir)
+    x = np.ones((1, 3, 8, 8), dtype=np.float32)
+    assert np.array_equal(warm(x)[0], cold(x)[0])
+
+
+def test_directorios_por_dispositivo_y_precision(tmp_path):
+    model_path = guardar_modelo(tmp_path / "modelo.xml", 2.0)
+    cache = ModelCache(tmp_path / "cache")
+
+    dirs = {cache.dir_for(model_path, "CPU"), cache.dir_for(model_path, "CPU", {"INFERENCE_PRECISION_HINT": "bf16"}), cache.dir_for(model_path, "GPU")}
+
+    assert len(dirs) == 3
+
+
+def test_invalida_al_cambiar_el_ir(tmp_path):
+    """
+    Verifica que los blobs de un IR modificado se borran y el siguiente arranque compila en frío.
+    """
+    model_path = guardar_modelo(tmp_path / "modelo.xml", 2.0)
+    cache = ModelCache(tmp_path / "cache")
+    old = ModelRegistry(ov.Core(), model_cache=cache).get(model_path)
+
+    guardar_modelo(tmp_path / "nuevo.xml", 3.0)
+    for suffix in (".xml", ".bin"):
+        shutil.copyfile(tmp_path / ("nuevo" + suffix), tmp_path / ("modelo" + suffix))
+    new = ModelRegistry(ov.Core(), model_cache=cache).get(model_path)
+
+    assert not old.cache_dir.exists() and new.cache_dir != old.cache_dir
+    assert new.cache_state == "cold"
+    assert np.all(new(np.ones((1, 3, 8, 8), dtype=np.float32))[0] == 3.0)
+    assert [row["dir"] for row in cache.stats()] == [new.cache_dir.name]
+
+
+def _pedir_directorios(cache_dir, model_dir, prefix):
+    cache = ModelCache(cache_dir)
+    for i in range(10):
+        cache.dir_for(Path(model_dir) / "modelo.xml", "{}{}".format(prefix, i))
+
+
+def test_indice_compartido_entre_procesos(tmp_path):
+    """
+    Verifica que varios procesos que piden directorios a la vez no pierden entradas del índice.
+    """
+    import multiprocessing
+
+    guardar_modelo(tmp_path / "modelo.xml", 2.0)
+    ctx = multiprocessing.get_context("spawn")
+    procesos = [ctx.Process(target=_pedir_directorios, args=(str(tmp_path / "cache"), str(tmp_path), prefix)) for prefix in ("a", "b", "c")]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+
+    assert all(p.exitcode == 0 for p in procesos)
+    assert len(ModelCache(tmp_path / "cache").stats()) == 30
@@ -0,0 +1,95 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+
+# `ov_wav2lip_helper` y `model_registry` importan sus dependencias como módulos de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+import model_registry
+from model_registry import ModelRegistry, pad_batch
+from model_variants import VariantCatalog, benchmark_variants, detection_hw, static_shapes
+from ov_wav2lip_helper import export_static_variants
+
+
+def guardar_detector(path):
+    # Como el detector: lote y resolución dinámicos
+    x = ops.parameter([-1, 3, -1, -1], ov.Type.f32, name="x")
+    ov.save_model(ov.Model([ops.multiply(x, np.float32(0.5))], [x], "detector"), path, compress_to_fp16=False)
+    return path
+
+
+def test_formas_estaticas():
+    x = ops.parameter([-1, -1, -1, 3], ov.Type.u8, name="x")
+    model = ov.Model([ops.convert(x, ov.Type.f32)], [x], "nhwc")
+
+    assert static_shapes(model, 16, (360, 640)) == {"x": [16, 360, 640, 3]}
+    assert detection_hw(720, 1280, 640) == (360, 640) and detection_hw(360, 640, 640) == (360, 640)
+
+
+def test_variante_estatica_rellena_el_ultimo_lote(tmp_path):
+    """
+    Verifica que una variante de lote 4 da lo mismo que el modelo dinámico con lotes de cualquier tamaño.
+    """
+    base = guardar_detector(tmp_path / "detector.xml")
+    paths = export_static_variants(base, [4], [(8, 8)], ["fp32", "fp16"])
+    registry = ModelRegistry(ov.Core())
+    dynamic, static = registry.get(base), registry.get(paths[0])
+    x = np.random.default_rng(0).random((6, 3, 8, 8), dtype=np.float32)
+
+    assert dynamic.static_batch is None and static.static_batch == 4
+    assert np.array_equal(static({"x": x})[0], dynamic({"x": x})[0])
+    assert np.array_equal(static({"x": x[:1]})[0], dynamic({"x": x[:1]})[0])
+    assert pad_batch({"x": x[:3]}, 4)["x"].shape == (4, 3, 8, 8)
+
+
+def test_catalogo_y_medidas(tmp_path):
+    base = guardar_detector(tmp_path / "detector.xml")
+    export_static_variants(base, [2, 4], [(8, 8)], ["fp16"])
+    # Reexportar sin cambios no reescribe los IR
+    mtimes = {p: p.stat().st_mtime_ns for p in (tmp_path / "variants").glob("*.xml")}
+    export_static_variants(base, [2, 4], [(8, 8)], ["fp16"])
+
+    rows = benchmark_variants(tmp_path, repeat=1)
+
+    assert mtimes == {p: p.stat().st_mtime_ns for p in (tmp_path / "variants").glob("*.xml")}
+    assert sorted((r["model"], r["static"]) for r in rows) == [
+        ("detector.xml", False),
+        ("detector.xml", False),
+        ("variants/detector_8x8_b2_fp16.xml", True),
+        ("variants/detector_8x8_b4_fp16.xml", True),
+    ]
+    assert len(VariantCatalog(tmp_path).benchmarks("CPU", "detector.xml")) == 4
+
+
+def test_espera_a_que_la_entrada_este_completa(tmp_path, monkeypatch):
+    """
+    Verifica que quien espera a otro hilo que compila no recibe la entrada antes de conocer `static_batch`.
+    """
+    paths = export_static_variants(guardar_detector(tmp_path / "detector.xml"), [4], [(8, 8)], ["fp32"])
+    calculando, seguir = threading.Event(), threading.Event()
+    original = model_registry.static_batch_size
+
+    def lento(compiled_model):
+        calculando.set()
+        seguir.wait()
+        return original(compiled_model)
+
+    monkeypatch.setattr(model_registry, "static_batch_size", lento)
+    registry = ModelRegistry(ov.Core())
+    owner = threading.Thread(target=registry.get, args=(paths[0],))
+    owner.start()
+    calculando.wait()
+    recibidas = []
+    waiter = threading.Thread(target=lambda: recibidas.append(registry.get(paths[0]).static_batch))
+    waiter.start()
+    waiter.join(0.2)
+    pendiente = waiter.is_alive()
+    seguir.set()
+    owner.join()
+    waiter.join()
+
+    assert pendiente and recibidas == [4]
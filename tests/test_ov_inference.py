@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+# `ov_inference` importa el resto de módulos de `src` como módulos de primer nivel
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from mel_stream import melspectrogram
+from mel_windows import MelWindows
+from ov_inference import wav_chunk_count
+
+
+@pytest.mark.parametrize("fps", [25, 29.97])
+@pytest.mark.parametrize("n_samples", [16000 * 3, 16000 * 3 + 199, 16000 * 3 + 200, 4321])
+def test_fragmentos_desde_la_cabecera(tmp_path, fps, n_samples):
+    """
+    Verifica que la cabecera del WAV basta para saber cuántos fragmentos dará el mel completo.
+    """
+    wav = (np.random.default_rng(0).standard_normal(n_samples) * 3000).astype(np.int16)
+    wavfile.write(tmp_path / "audio.wav", 16000, wav)
+
+    mel_chunks = MelWindows(melspectrogram(wav.astype(np.float32) / 32768.0), fps)
+
+    assert wav_chunk_count(tmp_path / "audio.wav", fps) == len(mel_chunks)
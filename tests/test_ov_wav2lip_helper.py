@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import openvino as ov
+import openvino.opset13 as ops
+
+# `ov_wav2lip_helper` y `ov_inference` importan sus dependencias como módulos de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ov_inference import batch_detect, batch_detect_u8, prepare_batch
+from ov_wav2lip_helper import convert_face_detection_u8, convert_wav2lip_fused
+from sfd_postprocess import batch_nms
+
+IMG_SIZE = 16
+
+
+def guardar_wav2lip(path):
+    """
+    IR con las entradas y la salida del Wav2Lip original (NCHW float): una convolución 1x1 de los
+    6 canales más la media del mel. La salida se sale un poco de [0, 1] para probar el recorte.
+    """
+    rng = np.random.default_rng(0)
+    face = ops.parameter([-1, 6, IMG_SIZE, IMG_SIZE], ov.Type.f32, name="face_sequences")
+    audio = ops.parameter([-1, 1, 80, 16], ov.Type.f32, name="audio_sequences")
+    weights = rng.normal(0.0, 4.0, (3, 6, 1, 1)).astype(np.float32)
+    conv = ops.convolution(face, ops.constant(weights), [1, 1], [0, 0], [0, 0], [1, 1])
+    level = ops.reduce_mean(audio, np.array([1, 2, 3], dtype=np.int64), keep_dims=True)
+    logits = ops.add(conv, ops.multiply(level, np.float32(0.5)))
+    prediction = ops.subtract(ops.multiply(ops.sigmoid(logits), np.float32(1.2)), np.float32(0.1))
+    ov.save_model(ov.Model([prediction], [audio, face], "wav2lip"), path, compress_to_fp16=False)
+    return path
+
+
+def guardar_s3fd(path):
+    """
+    IR con la entrada y las 12 salidas de S3FD: por cada stride, una media por bloques y
+    convoluciones 1x1 distintas por canal, así que el orden de canales y la media importan.
+    """
+    rng = np.random.default_rng(2)
+    x = ops.parameter([-1, 3, -1, -1], ov.Type.f32, name="x")
+    outputs = []
+    for i in range(6):
+        stride = 2 ** (i + 2)
+        pooled = ops.avg_pool(x, [stride, stride], [0, 0], [0, 0], [stride, stride], True)
+        cls_weights = np.zeros((2, 3, 1, 1), dtype=np.float32)
+        cls_weights[1, :, 0, 0] = [0.06, -0.03, 0.015]
+        reg_weights = rng.normal(0.0, 0.01, (4, 3, 1, 1)).astype(np.float32)
+        for weights in (cls_weights, reg_weights):
+            outputs.append(ops.convolution(pooled, ops.constant(weights), [1, 1], [0, 0], [0, 0], [1, 1]))
+    ov.save_model(ov.Model(outputs, [x], "s3fd"), path, compress_to_fp16=False)
+    return path
+
+
+def test_detector_u8_detecta_lo_mismo(tmp_path):
+    """
+    Verifica que `batch_detect_u8` sobre fotogramas BGR da las mismas detecciones que `batch_detect`
+    sobre los mismos fotogramas en RGB, como los recibe el detector original.
+    """
+    base = guardar_s3fd(tmp_path / "face_detection.xml")
+    u8_path = convert_face_detection_u8(base, tmp_path / "face_detection_u8.xml")
+    core = ov.Core()
+    net, net_u8 = core.compile_model(base, "CPU"), core.compile_model(u8_path, "CPU")
+    frames = np.random.default_rng(3).integers(0, 256, (3, 128, 192, 3), dtype=np.uint8)
+
+    bboxlists = batch_detect(net, frames[..., ::-1], device="cpu")
+    bboxlists_u8 = batch_detect_u8(net_u8, frames)
+
+    assert bboxlists.shape == bboxlists_u8.shape and len(bboxlists) > 0
+    np.testing.assert_allclose(bboxlists_u8, bboxlists, rtol=1e-5, atol=1e-3)
+    dets, counts = batch_nms(bboxlists, 0.3)
+    dets_u8, counts_u8 = batch_nms(bboxlists_u8, 0.3)
+    assert np.array_equal(counts_u8, counts)
+    np.testing.assert_allclose(dets_u8, dets, rtol=1e-5, atol=1e-3)
+    # Con los canales cambiados las detecciones ya no coinciden
+    swapped = batch_detect_u8(net_u8, np.ascontiguousarray(frames[..., ::-1]))
+    assert swapped.shape != bboxlists.shape or not np.allclose(swapped, bboxlists, rtol=1e-5, atol=1e-3)
+
+
+def test_wav2lip_fusionado_da_las_mismas_bocas(tmp_path):
+    """
+    Verifica que el IR fusionado da, byte a byte, las bocas del camino sin fusionar:
+    `prepare_batch`, IR original, `transpose(0, 2, 3, 1) * 255` y `astype(np.uint8)`.
+    """
+    base = guardar_wav2lip(tmp_path / "wav2lip.xml")
+    fused_path = convert_wav2lip_fused(base, tmp_path / "wav2lip_fused.xml", img_size=IMG_SIZE)
+    core = ov.Core()
+    fused, unfused = core.compile_model(fused_path, "CPU"), core.compile_model(base, "CPU")
+    rng = np.random.default_rng(1)
+    faces = rng.integers(0, 256, (4, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    mels = rng.normal(0.0, 1.0, (4, 80, 16)).astype(np.float32)
+
+    mouths = fused({"face_sequences": faces, "audio_sequences": mels})[0]
+    img_batch, mel_batch = prepare_batch(faces, mels, IMG_SIZE)
+    prediction = unfused(
+        {
+            "audio_sequences": np.ascontiguousarray(np.transpose(mel_batch, (0, 3, 1, 2)), dtype=np.float32),
+            "face_sequences": np.ascontiguousarray(np.transpose(img_batch, (0, 3, 1, 2)), dtype=np.float32),
+        }
+    )[0]
+    scaled = prediction.transpose(0, 2, 3, 1) * 255.0
+
+    assert mouths.dtype == np.uint8 and mouths.shape == faces.shape
+    in_range = (scaled >= 0) & (scaled < 256)
+    assert np.array_equal(mouths[in_range], scaled[in_range].astype(np.uint8))
+    # Fuera de rango, el grafo recorta en lugar de desbordar como `astype`
+    assert (scaled < 0).any() and (scaled >= 256).any()
+    assert np.all(mouths[scaled < 0] == 0) and np.all(mouths[scaled >= 256] == 255)
+
+
+def test_wav2lip_fusionado_enmascara_la_mitad_inferior(tmp_path):
+    """
+    Verifica que la mitad inferior de la cara solo llega al modelo por los canales de referencia.
+    """
+    base = guardar_wav2lip(tmp_path / "wav2lip.xml")
+    fused = ov.Core().compile_model(convert_wav2lip_fused(base, tmp_path / "wav2lip_fused.xml", img_size=IMG_SIZE), "CPU")
+    faces = np.full((1, IMG_SIZE, IMG_SIZE, 3), 200, dtype=np.uint8)
+    mels = np.zeros((1, 80, 16), dtype=np.float32)
+    # Sin máscara: las dos copias de la cara iguales, como si el enmascarado no se hiciera
+    unmasked = np.concatenate((faces, faces), axis=3).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    prediction = ov.Core().compile_model(base, "CPU")({"face_sequences": unmasked, "audio_sequences": mels[:, None]})[0]
+
+    mouths = fused({"face_sequences": faces, "audio_sequences": mels})[0]
+    expected = np.clip(np.floor(prediction.transpose(0, 2, 3, 1) * 255.0), 0, 255).astype(np.uint8)
+
+    half = IMG_SIZE // 2
+    assert np.array_equal(mouths[:, :half], expected[:, :half])
+    assert not np.array_equal(mouths[:, half:], expected[:, half:])
@@ -0,0 +1,165 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from src import profiling
+from src.profiling import Profiler
+
+
+@pytest.fixture
+def perfil_global(monkeypatch):
+    # `enable` toca el entorno y el perfilador del proceso; se restauran al terminar
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    profiler = profiling.get_profiler()
+    mode = profiler.mode
+    profiler.reset()
+    yield profiler
+    profiler.enable(mode)
+    profiler.reset()
+
+
+def test_desactivado_no_registra_nada(perfil_global):
+    """
+    Verifica que sin perfilado los tramos son el contexto vacío compartido y los iterables no se envuelven.
+    """
+    profiling.enable(None)
+    frames = [1, 2, 3]
+
+    with profiling.span("decode", 3) as s:
+        s.add_frames(1)
+    profiling.record("lipsync.infer", 0.5, 3)
+
+    assert profiling.span("otro") is s
+    assert profiling.profile_iter(frames, "decode") is frames
+    assert perfil_global.events() == [] and perfil_global.summary() == {}
+
+
+def test_tramos_por_hilo_en_traza_de_chrome():
+    """
+    Verifica que cada tramo es un evento completo ("X") en microsegundos con su hilo y sus fotogramas.
+    """
+    profiler = Profiler("time")
+    with profiler.span("face_detection.infer", frames=16):
+        pass
+    worker = threading.Thread(target=lambda: profiler.record("lipsync.infer", 0.25, 8), name="infer")
+    worker.start()
+    worker.join()
+
+    trace = json.loads(json.dumps(profiler.chrome_trace()))
+    events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    names = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+
+    assert [e["name"] for e in events] == ["face_detection.infer", "lipsync.infer"]
+    assert events[0]["cat"] == "face_detection" and events[0]["args"]["frames"] == 16
+    assert events[1]["dur"] == pytest.approx(250000, rel=1e-6)
+    assert events[1]["args"]["fps"] == pytest.approx(32.0, rel=1e-6)
+    assert events[0]["tid"] != events[1]["tid"] and "infer" in names
+
+
+def test_metricas_prometheus_acumuladas():
+    """
+    Verifica el resumen por etapa y su exposición en el formato de texto de Prometheus.
+    """
+    profiler = Profiler("time")
+    for _ in range(3):
+        profiler.record("encode", 0.5, 10)
+    profiler.record("mux", 0.2)
+
+    summary = profiler.summary()
+    text = profiler.prometheus_text()
+
+    assert list(summary) == ["encode", "mux"]
+    assert summary["encode"]["calls"] == 3 and summary["encode"]["frames"] == 30
+    assert summary["encode"]["fps"] == pytest.approx(20.0)
+    assert "# TYPE videoavatar_span_seconds_total counter" in text
+    assert 'videoavatar_span_frames_total{span="encode"} 30.0' in text
+    assert 'videoavatar_span_calls_total{span="mux"} 1.0' in text
+    assert "allocated_bytes" not in text
+
+
+def test_modo_memoria_registra_bytes():
+    """
+    Verifica que en modo "memory" cada tramo guarda la memoria que deja asignada.
+    """
+    profiler = Profiler("memory")
+    with profiler.span("batch_prep", 1):
+        kept = np.ones(1 << 20, dtype=np.uint8)
+
+    assert profiler.summary()["batch_prep"]["bytes"] >= kept.nbytes
+    assert profiler.chrome_trace()["traceEvents"][-1]["args"]["bytes"] >= kept.nbytes
+    assert "videoavatar_span_allocated_bytes_total" in profiler.prometheus_text()
+
+
+def test_exporta_y_limpia_la_traza(tmp_path):
+    """
+    Verifica que se escriben la traza y las métricas, y que `clear_trace` conserva los totales.
+    """
+    profiler = Profiler("time")
+    profiler.record("composite", 0.1, 4)
+
+    trace_path, metrics_path = profiler.export(tmp_path, tag="prueba")
+    profiler.clear_trace()
+
+    assert trace_path.name == "trace_prueba.json" and metrics_path.name == "videoavatar.prom"
+    assert len(json.loads(trace_path.read_text())["traceEvents"]) == 2
+    assert 'span="composite"' in metrics_path.read_text()
+    assert profiler.events() == [] and profiler.summary()["composite"]["calls"] == 1
+    assert profiler.export(tmp_path, tag="solo_traza", metrics=False)[1] is None
+
+
+def test_profile_iter_mide_cada_elemento_y_cierra(perfil_global):
+    """
+    Verifica que cada `next()` es un tramo de un fotograma y que cerrar el envoltorio cierra la fuente.
+    """
+    closed = []
+
+    def frames():
+        try:
+            yield from range(5)
+        finally:
+            closed.append(True)
+
+    profiling.enable("time")
+    wrapped = profiling.profile_iter(frames(), "decode")
+    first = [next(wrapped) for _ in range(3)]
+    wrapped.close()
+
+    assert first == [0, 1, 2] and closed == [True]
+    assert perfil_global.summary()["decode"]["frames"] == 3
+
+
+def test_profile_iter_no_cuenta_el_final(perfil_global):
+    """
+    Verifica que el `next()` que agota el iterador no se registra como un fotograma más.
+    """
+    profiling.enable("time")
+
+    assert list(profiling.profile_iter(range(5), "decode")) == [0, 1, 2, 3, 4]
+    summary = perfil_global.summary()["decode"]
+    assert summary["calls"] == 5 and summary["frames"] == 5
+
+
+def test_profile_job_exporta_aunque_falle(perfil_global, tmp_path, monkeypatch):
+    """
+    Verifica que un trabajo que falla exporta su traza y no deja tramos para el siguiente.
+    """
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path))
+    profiling.enable("time")
+
+    @profiling.profile_job("job")
+    def falla():
+        profiling.record("decode", 0.01, 1)
+        raise RuntimeError("render")
+
+    with pytest.raises(RuntimeError):
+        falla()
+
+    assert perfil_global.events() == []
+    assert list(tmp_path.glob("trace_*.json"))
+
+
+def test_modo_desconocido():
+    with pytest.raises(ValueError):
+        Profiler("cpu")
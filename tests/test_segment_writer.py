@@ -0,0 +1,71 @@
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+# `segment_writer` importa `cache_utils` y `video_encoder` como módulos de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from segment_writer import PLAYLIST_NAME, SegmentedWriter
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg no está disponible")
+
+
+def contar_fotogramas(path):
+    capture = cv2.VideoCapture(str(path))
+    n = 0
+    while capture.read()[0]:
+        n += 1
+    capture.release()
+    return n
+
+
+def test_segmentos_hls_y_lista(tmp_path):
+    """
+    Verifica el reparto en segmentos, lo que recibe `on_segment` y la lista `index.m3u8`, parcial y final.
+    """
+    wavfile.write(tmp_path / "audio.wav", 16000, np.zeros(16000 * 3, dtype=np.int16))
+    payloads, partial_playlists = [], []
+
+    def on_segment(segment):
+        payloads.append(segment)
+        partial_playlists.append((tmp_path / "hls" / PLAYLIST_NAME).read_text())
+
+    start = time.perf_counter()
+    with SegmentedWriter(tmp_path / "hls", 25, (64, 48), tmp_path / "audio.wav", 1.0, "hls", "fast", on_segment, start_time=start) as out:
+        for i in range(60):
+            out.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+    total = time.perf_counter() - start
+
+    assert [s["frames"] for s in payloads] == [25, 25, 10]
+    assert [s["index"] for s in payloads] == [0, 1, 2]
+    assert [s["start"] for s in payloads] == [0.0, 1.0, 2.0]
+    assert [s["duration"] for s in payloads] == [1.0, 1.0, 0.4]
+    assert [Path(s["path"]).name for s in payloads] == ["segment_00000.ts", "segment_00001.ts", "segment_00002.ts"]
+    assert [contar_fotogramas(s["path"]) for s in payloads] == [25, 25, 10]
+    assert payloads == out.segments and out.frames_written == 60
+
+    # Mientras se renderiza, la lista crece y no está cerrada
+    assert "#EXT-X-ENDLIST" not in partial_playlists[0] and partial_playlists[0].count("#EXTINF") == 1
+    lines = out.playlist_path.read_text().splitlines()
+    assert "#EXT-X-TARGETDURATION:1" in lines
+    assert [line for line in lines if line.startswith("#EXTINF")] == ["#EXTINF:1.000,", "#EXTINF:1.000,", "#EXTINF:0.400,"]
+    assert [line for line in lines if line.endswith(".ts")] == ["segment_00000.ts", "segment_00001.ts", "segment_00002.ts"]
+    assert lines[-1] == "#EXT-X-ENDLIST"
+
+    assert 0 < out.time_to_first_segment < payloads[-1]["ready_s"] <= total
+
+
+def test_segmentos_mp4_independientes(tmp_path):
+    out = SegmentedWriter(tmp_path / "mp4", 25, (64, 48), segment_seconds=0.4, segment_format="mp4")
+    for i in range(25):
+        out.write(np.full((48, 64, 3), i * 8, dtype=np.uint8))
+
+    assert out.close() == tmp_path / "mp4"
+    assert [contar_fotogramas(s["path"]) for s in out.segments] == [10, 10, 5]
+    assert not (tmp_path / "mp4" / PLAYLIST_NAME).exists()
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from src.sfd_postprocess import batch_nms, postprocess_batch
+
+torch = pytest.importorskip("torch")
+F = torch.nn.functional
+
+
+def _fake_outputs(batch, height, width, seed=0):
+    """
+    Genera salidas con la forma de S3FD: logits con algunas caras "plantadas" y regresiones aleatorias.
+    """
+    rng = np.random.default_rng(seed)
+    outputs = []
+    for i in range(6):
+        stride = 2 ** (i + 2)
+        fh, fw = height // stride, width // stride
+        ocls = rng.normal(0.0, 1.0, (batch, 2, fh, fw)).astype(np.float32)
+        ocls[:, 0] += 3.0
+        ocls[:, 1, fh // 2, fw // 2] += 8.0
+        oreg = rng.normal(0.0, 0.5, (batch, 4, fh, fw)).astype(np.float32)
+        outputs.extend([ocls, oreg])
+    return outputs
+
+
+def _reference_batch_detect(outputs):
+    """
+    Bucle original de `ov_inference.batch_detect`, conservado como referencia.
+    """
+    olist = [torch.Tensor(o) for o in outputs]
+    BB = olist[0].shape[0]
+    bboxlist = []
+    for i in range(len(olist) // 2):
+        olist[i * 2] = F.softmax(olist[i * 2], dim=1)
+    for i in range(len(olist) // 2):
+        ocls, oreg = olist[i * 2], olist[i * 2 + 1]
+        stride = 2 ** (i + 2)
+        poss = zip(*np.where(ocls[:, 1, :, :] > 0.05))
+        for Iindex, hindex, windex in poss:
+            axc, ayc = stride / 2 + windex * stride, stride / 2 + hindex * stride
+            score = ocls[:, 1, hindex, windex]
+            loc = oreg[:, :, hindex, windex].contiguous().view(BB, 1, 4)
+            priors = torch.Tensor([[axc / 1.0, ayc / 1.0, stride * 4 / 1.0, stride * 4 / 1.0]]).view(1, 1, 4)
+            boxes = torch.cat((priors[:, :, :2] + loc[:, :, :2] * 0.1 * priors[:, :, 2:], priors[:, :, 2:] * torch.exp(loc[:, :, 2:] * 0.2)), 2)
+            boxes[:, :, :2] -= boxes[:, :, 2:] / 2
+            boxes[:, :, 2:] += boxes[:, :, :2]
+            bboxlist.append(torch.cat([boxes[:, 0], score.unsqueeze(1)], 1).numpy())
+    bboxlist = np.array(bboxlist)
+    if 0 == len(bboxlist):
+        bboxlist = np.zeros((1, BB, 5))
+    return bboxlist
+
+
+def _nms(dets, thresh):
+    x1, y1, x2, y2, scores = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3], dets[:, 4]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1, yy1 = np.maximum(x1[i], x1[order[1:]]), np.maximum(y1[i], y1[order[1:]])
+        xx2, yy2 = np.minimum(x2[i], x2[order[1:]]), np.minimum(y2[i], y2[order[1:]])
+        w, h = np.maximum(0.0, xx2 - xx1 + 1), np.maximum(0.0, yy2 - yy1 + 1)
+        ovr = w * h / (areas[i] + areas[order[1:]] - w * h)
+        order = order[np.where(ovr <= thresh)[0] + 1]
+    return keep
+
+
+def _final_boxes(bboxlists):
+    finals = []
+    for i in range(bboxlists.shape[1]):
+        dets = bboxlists[:, i, :]
+        dets = dets[_nms(dets, 0.3)]
+        finals.append(dets[dets[:, -1] > 0.5])
+    return finals
+
+
+def test_candidatas_coinciden_con_bucle_original():
+    """
+    Verifica que cada fila única del bucle original aparece, con los mismos valores, en la versión vectorizada.
+    """
+    outputs = _fake_outputs(batch=4, height=256, width=192)
+    expected = np.unique(_reference_batch_detect(outputs).reshape(-1, 4 * 5), axis=0)
+    result = postprocess_batch(outputs)
+
+    assert result.shape[1:] == (4, 5)
+    result = result.reshape(-1, 4 * 5)
+    assert len(result) == len(expected), "El número de anclas candidatas no coincide."
+    order = np.lexsort(result.T[::-1])
+    np.testing.assert_allclose(result[order], expected, rtol=1e-5, atol=1e-4)
+
+
+def test_cajas_finales_identicas_tras_nms():
+    """
+    Verifica que, tras la NMS y el filtro de puntuación, las cajas por fotograma son las mismas que hoy.
+    """
+    outputs = _fake_outputs(batch=3, height=320, width=256, seed=1)
+    expected = _final_boxes(_reference_batch_detect(outputs))
+    result = _final_boxes(postprocess_batch(outputs))
+
+    for exp, res in zip(expected, result):
+        assert len(exp) > 0, "El fixture debe contener al menos una cara."
+        np.testing.assert_allclose(res, exp, rtol=1e-5, atol=1e-4)
+
+
+def test_sin_candidatas_devuelve_ceros():
+    """
+    Verifica que, sin anclas por encima del umbral, se devuelve el mismo array de ceros que antes.
+    """
+    outputs = _fake_outputs(batch=2, height=128, width=128)
+    for i in range(6):
+        outputs[i * 2][:, 0] = 20.0
+    result = postprocess_batch(outputs)
+
+    assert result.shape == (1, 2, 5)
+    assert not result.any()
+
+
+def test_batch_nms_equivale_a_nms_por_fotograma():
+    """
+    Verifica que la NMS por lotes conserva las mismas cajas, en el mismo orden, que `nms` fotograma a fotograma.
+    """
+    rng = np.random.default_rng(2)
+    centers = rng.uniform(50, 400, (40, 1, 2))
+    sizes = rng.uniform(20, 120, (40, 1, 2))
+    jitter = rng.normal(0, 8, (40, 6, 4))
+    boxes = np.concatenate([centers - sizes / 2, centers + sizes / 2], axis=2) + jitter
+    bboxlists = np.concatenate([boxes, rng.uniform(0, 1, (40, 6, 1))], axis=2).astype(np.float32)
+    bboxlists[:, 5, 4] = 0.1
+
+    dets, counts = batch_nms(bboxlists, 0.3)
+
+    assert dets.shape[0] == 6
+    assert counts[5] == 0
+    for i, expected in enumerate(_final_boxes(bboxlists)):
+        assert counts[i] == len(expected)
+        np.testing.assert_array_equal(dets[i, : counts[i]], expected)
+        assert not dets[i, counts[i] :].any(), "El relleno debe ser cero."
@@ -0,0 +1,62 @@
+import shutil
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from src.sharded_render import shard_cpus, shard_ranges, stitch_shards
+
+# `stitch_shards` importa `video_encoder` como módulo de primer nivel, igual que en `src`
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+
+@pytest.mark.parametrize("n_frames", [1, 127, 128, 1000, 12345])
+@pytest.mark.parametrize("n_shards", [1, 2, 3, 8])
+def test_tramos_contiguos_cubren_todos_los_fotogramas(n_frames, n_shards):
+    ranges = shard_ranges(n_frames, n_shards, min_frames=128)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == n_frames
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert len(ranges) <= n_shards
+    assert len(ranges) == 1 or min(b - a for a, b in ranges) >= 128
+
+
+def test_grupos_de_cpus_disjuntos():
+    groups = shard_cpus(list(range(10)), 4)
+
+    assert [len(g) for g in groups] == [3, 3, 2, 2]
+    assert sorted(sum(groups, [])) == list(range(10))
+    assert shard_cpus([0, 1], 3) == [[0], [1], [0]]
+
+
+def test_union_exacta_al_fotograma(tmp_path):
+    """
+    Verifica que la unión de tramos de longitudes distintas conserva todos los fotogramas, en orden, con el audio.
+    """
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg no está disponible")
+    from video_encoder import FFmpegPipeWriter
+
+    paths, index = [], 0
+    for i, n in enumerate([7, 12, 5]):
+        paths.append(tmp_path / "shard_{}.mp4".format(i))
+        with FFmpegPipeWriter(paths[-1], 25, (64, 48), temp_dir=tmp_path) as out:
+            for _ in range(n):
+                out.write(np.full((48, 64, 3), index * 10, dtype=np.uint8))
+                index += 1
+    wavfile.write(tmp_path / "audio.wav", 16000, np.zeros(16000, dtype=np.int16))
+
+    outfile = stitch_shards(paths, tmp_path / "audio.wav", tmp_path / "out.mp4", temp_dir=tmp_path)
+
+    capture = cv2.VideoCapture(str(outfile))
+    levels = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        levels.append(int(round(frame.mean() / 10)))
+    capture.release()
+    assert levels == list(range(24))
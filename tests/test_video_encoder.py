@@ -0,0 +1,82 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# `video_encoder` importa `profiling` como módulo de primer nivel; los fotogramas y el audio son los del benchmark del codificador
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT / "benchmarks"))
+
+from bench_encoder import synthetic_frames, synthetic_wav
+from video_encoder import FFmpegPipeWriter
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg no está disponible")
+
+SIZE = (320, 180)
+
+
+def codec_de_audio(path):
+    # Sin ffprobe: `ffmpeg -i` describe los flujos en stderr
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(path)], capture_output=True, text=True)
+    return [line.split("Audio: ")[1].split()[0].rstrip(",") for line in result.stderr.splitlines() if "Audio: " in line]
+
+
+def test_ffmpeg_que_termina_antes_lanza_error(tmp_path):
+    """
+    Verifica que, si ffmpeg se cierra nada más arrancar, escribir lanza un error en lugar de colgarse y no queda salida.
+    """
+    out = FFmpegPipeWriter(tmp_path / "out.mp4", 25, SIZE, tmp_path / "no_existe.wav", temp_dir=tmp_path)
+
+    with pytest.raises(RuntimeError, match="no_existe.wav"):
+        # El pipe admite unos cuantos fotogramas antes de romperse
+        for frame in synthetic_frames(2, *SIZE) * 100:
+            out.write(frame)
+
+    assert not (tmp_path / "out.mp4").exists()
+    assert not list(tmp_path.glob(".out.*"))
+
+
+def test_error_al_cerrar_lanza_error(tmp_path):
+    out = FFmpegPipeWriter(tmp_path / "out.mp4", 25, SIZE, tmp_path / "no_existe.wav", temp_dir=tmp_path)
+    # ffmpeg abre el audio después de leer el video de la entrada estándar: falla al cerrarla
+    out.write(synthetic_frames(1, *SIZE)[0])
+
+    with pytest.raises(RuntimeError, match="código"):
+        out.close()
+    assert not (tmp_path / "out.mp4").exists()
+
+
+def test_abort_no_deja_salida_parcial(tmp_path):
+    """
+    Verifica que un render abortado no deja nada en `outfile` ni sustituye al resultado anterior.
+    """
+    frames = synthetic_frames(10, *SIZE)
+    (tmp_path / "anterior.mp4").write_bytes(b"render anterior")
+
+    for name in ("out.mp4", "anterior.mp4"):
+        with pytest.raises(KeyboardInterrupt):
+            with FFmpegPipeWriter(tmp_path / name, 25, SIZE, temp_dir=tmp_path) as out:
+                for frame in frames:
+                    out.write(frame)
+                raise KeyboardInterrupt
+
+    assert not (tmp_path / "out.mp4").exists()
+    assert (tmp_path / "anterior.mp4").read_bytes() == b"render anterior"
+    assert not list(tmp_path.glob(".out.*")) and not list(tmp_path.glob(".anterior.*"))
+
+
+def test_copy_audio_mezcla_sin_recodificar(tmp_path):
+    synthetic_wav(tmp_path / "audio.wav", 1.0)
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", str(tmp_path / "audio.wav"), "-c:a", "libmp3lame", str(tmp_path / "audio.mp3")], check=True)
+    frames = synthetic_frames(25, *SIZE)
+
+    for name, copy_audio in (("copia.mp4", True), ("recodificado.mp4", False)):
+        with FFmpegPipeWriter(tmp_path / name, 25, SIZE, tmp_path / "audio.mp3", copy_audio=copy_audio, temp_dir=tmp_path) as out:
+            for frame in frames:
+                out.write(frame)
+
+    assert codec_de_audio(tmp_path / "copia.mp4") == ["mp3"]
+    assert codec_de_audio(tmp_path / "recodificado.mp4") == ["aac"]
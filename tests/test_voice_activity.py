@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.voice_activity import gate_batches, mel_level_db, speech_weights
+
+SPEECH = np.full((80, 16), 2.0, dtype=np.float32)
+SILENCE = np.full((80, 16), -4.0, dtype=np.float32)
+
+
+def test_nivel_del_mel_normalizado():
+    """
+    Verifica que los extremos de la normalización simétrica corresponden a -100 dB y 0 dB.
+    """
+    assert mel_level_db(SILENCE) == -100.0
+    assert mel_level_db(np.full((80, 16), 4.0)) == 0.0
+
+
+def test_pesos_con_fundido_y_pausas_cortas():
+    """
+    Verifica que los silencios largos se saltan con fundido a los lados y que las pausas cortas se tratan como voz.
+    """
+    chunks = [SPEECH] * 5 + [SILENCE] * 2 + [SPEECH] * 5 + [SILENCE] * 6 + [SPEECH] * 4
+    weights = speech_weights(chunks, threshold_db=-60, min_silence_frames=3, crossfade_frames=2)
+
+    # La pausa de 2 fotogramas no se salta
+    assert np.all(weights[5:7] > 0)
+    # El silencio de 6 fotogramas se salta por completo
+    assert np.all(weights[12:18] == 0)
+    # Fundido de 2 fotogramas a cada lado: 1/3, 2/3 y después boca completa
+    np.testing.assert_allclose(weights[9:12], [1.0, 2 / 3, 1 / 3], rtol=1e-6)
+    np.testing.assert_allclose(weights[18:22], [1 / 3, 2 / 3, 1.0, 1.0], rtol=1e-6)
+
+
+def test_sin_silencio_todo_a_uno():
+    """
+    Verifica que sin silencios todos los fotogramas pasan por el modelo con peso 1.
+    """
+    assert np.all(speech_weights([SPEECH] * 10) == 1.0)
+
+
+def test_gate_batches_quita_silencios():
+    """
+    Verifica que solo los fotogramas con peso > 0 llegan al modelo y que se conservan todos los fotogramas.
+    """
+    weights = np.array([1, 0, 0, 0.5, 0, 0], dtype=np.float32)
+    batches = [
+        (np.arange(3)[:, None], np.arange(3)[:, None], ["f0", "f1", "f2"], ["c0", "c1", "c2"]),
+        (np.arange(3, 6)[:, None], np.arange(3, 6)[:, None], ["f3", "f4", "f5"], ["c3", "c4", "c5"]),
+    ]
+    gated = list(gate_batches(batches, weights))
+
+    assert gated[0][0].ravel().tolist() == [0]
+    assert gated[1][0].ravel().tolist() == [3]
+    assert gated[1][2] == ["f3", "f4", "f5"]
+    assert gated[1][3] == [("c3", 0.5), ("c4", 0.0), ("c5", 0.0)]